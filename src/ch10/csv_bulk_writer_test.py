@@ -0,0 +1,157 @@
+"""Writing CSV files in bulk with `csv_bulk_writer`."""
+
+import csv
+import io
+from array import array
+from pathlib import Path
+from typing import Any, List, Sequence
+
+import pytest
+
+from csv_bulk_writer import BulkWriter, benchmark
+
+
+def csv_writer_output(rows: Sequence[Sequence[Any]], **fmtparams: Any) -> str:
+    """Return the text written by `csv.writer` for `rows`."""
+    output = io.StringIO(newline="")
+    csv.writer(output, **fmtparams).writerows(rows)
+    return output.getvalue()
+
+
+def bulk_writer_output(
+    rows: Sequence[Sequence[Any]], batch_size: int = 2, **fmtparams: Any
+) -> str:
+    """Return the text written by `BulkWriter` for `rows`."""
+    output = io.StringIO(newline="")
+    with BulkWriter(output, batch_size=batch_size, **fmtparams) as bulk_writer:
+        bulk_writer.writerows(rows)
+    return output.getvalue()
+
+
+ROWS: List[List[List[Any]]] = [
+    [["Office Supplies", "L", "5/2/2014", "1"], ["Cereal", "H", "4/18/2014", "2"]],
+    [["a", 1, 2.5, None, True], ["b", -1, 1e100, "", False]],
+    [["has,delimiter", "x"], ["y", "z"], ["p", "q"]],
+    [['has "quote"', "x"], ["line\nbreak", "carriage\rreturn"]],
+    [[""], ["a"], [], ["", ""]],
+    [["a", "b"], ["c"], ["d", "e", "f"]],
+]
+
+
+@pytest.mark.parametrize("rows", ROWS)
+@pytest.mark.parametrize(
+    "fmtparams",
+    [
+        {},
+        {"dialect": "excel-tab"},
+        {"dialect": "unix"},
+        {"quoting": csv.QUOTE_ALL},
+        {"quoting": csv.QUOTE_NONNUMERIC},
+        {"delimiter": ":", "quoting": csv.QUOTE_NONE, "escapechar": "\\"},
+    ],
+)
+def test_same_as_csv_writer(rows: List[List[Any]], fmtparams: Any) -> None:
+    """The output, or error, is identical to that of `csv.writer`."""
+    try:
+        expected = csv_writer_output(rows, **fmtparams)
+    except csv.Error as error:
+        with pytest.raises(csv.Error, match=str(error)):
+            bulk_writer_output(rows, **fmtparams)
+    else:
+        assert bulk_writer_output(rows, **fmtparams) == expected
+
+
+def test_quote_none_error() -> None:
+    """A field that needs escaping without an `escapechar` is rejected, as by `csv`."""
+    with pytest.raises(csv.Error):
+        bulk_writer_output([["a:b"]], delimiter=":", quoting=csv.QUOTE_NONE)
+
+
+def test_write_dialect(tmp_path: Path) -> None:
+    """Write a CSV file in the 'unixpasswd' dialect, as in `test_write_dialect()`."""
+    passwd_rows = [
+        ["bin", "x", "2", "2", "bin", "/bin", "/usr/sbin/nologin"],
+        ["hplip", "x", "117", "7", "HPLIP user,,,", "/var/run/hplip", "/bin/false"],
+    ]
+
+    csv.register_dialect("unixpasswd", delimiter=":", quoting=csv.QUOTE_NONE)
+    tmp_passwd_path = tmp_path.joinpath("csv_passwd")
+    with open(tmp_passwd_path, "w", newline="") as passwd_file:
+        with BulkWriter(passwd_file, "unixpasswd") as bulk_writer:
+            bulk_writer.writerows(passwd_rows)
+
+    csv.unregister_dialect("unixpasswd")
+
+    assert (
+        tmp_passwd_path.read_text()
+        == """\
+bin:x:2:2:bin:/bin:/usr/sbin/nologin
+hplip:x:117:7:HPLIP user,,,:/var/run/hplip:/bin/false
+"""
+    )
+
+
+def test_write_dicts() -> None:
+    """Write dictionaries, as in `test_write_csv_dict()`."""
+    fieldnames = ["Item Type", "Order Priority", "Order Date", "Order ID"]
+    csv_rows = [
+        {
+            "Item Type": "Office Supplies",
+            "Order Priority": "L",
+            "Order Date": "5/2/2014",
+            "Order ID": "1",
+        },
+        {"Item Type": "Cereal", "Order Priority": "H", "Order ID": 2},
+    ]
+
+    output = io.StringIO(newline="")
+    with BulkWriter(output) as bulk_writer:
+        bulk_writer.writerow(fieldnames)
+        bulk_writer.write_dicts(fieldnames, csv_rows, restval="?")
+
+    assert (
+        output.getvalue()
+        == """\
+Item Type,Order Priority,Order Date,Order ID\r
+Office Supplies,L,5/2/2014,1\r
+Cereal,H,?,2\r
+"""
+    )
+
+
+def test_write_columns() -> None:
+    """Write rows from column arrays."""
+    output = io.StringIO(newline="")
+    with BulkWriter(output, batch_size=2) as bulk_writer:
+        bulk_writer.write_columns(
+            [["a", "b,c", "d"], array("q", [1, 2, 3]), [None, 1.5, "x"]]
+        )
+
+    assert output.getvalue() == 'a,1,\r\n"b,c",2,1.5\r\nd,3,x\r\n'
+
+
+def test_buffering() -> None:
+    """Output is held in the buffer until it is full or flushed."""
+    output = io.StringIO(newline="")
+    bulk_writer = BulkWriter(output, buffer_size=10)
+
+    bulk_writer.writerow(["a", "b"])
+    assert output.getvalue() == ""
+
+    bulk_writer.writerow(["0123456789"])
+    assert output.getvalue() == "a,b\r\n0123456789\r\n"
+
+    bulk_writer.writerow(["c"])
+    bulk_writer.flush()
+    assert output.getvalue() == "a,b\r\n0123456789\r\nc\r\n"
+
+
+def test_benchmark() -> None:
+    """Run the benchmark on a few rows; all outputs are identical."""
+    assert set(benchmark(100)) == {
+        "DictWriter",
+        "writer",
+        "BulkWriter.write_dicts",
+        "BulkWriter.writerows",
+        "BulkWriter.write_columns",
+    }
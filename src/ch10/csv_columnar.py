@@ -0,0 +1,213 @@
+"""Load an orders CSV file into compact, typed columns using `array.array`.
+
+Instead of one `Order` object per row (see `test_read_csv_object()` in `csv_test.py`),
+each field is stored in its own homogeneous array:
+
+- 'Item Type': index into a table of distinct item types (`array("H")`)
+- 'Order Priority': small-int code (`array("b")`)
+- 'Order Date': days since 1970-01-01 (`array("l")`)
+- 'Order ID': 64-bit integer (`array("q")`)
+
+Whole-column operations such as filtering and counting then only touch the arrays they
+need. `OrderView` provides object-like access to a single row when that is wanted.
+
+Run as a script to compare memory use with the named tuple approach:
+
+    python csv_columnar.py --rows 1000000
+"""
+
+import argparse
+import tempfile
+import tracemalloc
+from array import array
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple, Union
+
+from csv_stream import ORDER_CONVERTERS, iter_rows, write_synthetic_orders
+
+PRIORITIES = ("L", "M", "H", "C")
+_PRIORITY_CODES = {priority: code for code, priority in enumerate(PRIORITIES)}
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+OrderTuple = Tuple[str, str, date, int]
+
+
+def to_epoch_day(value: str) -> int:
+    """Convert an 'Order Date' field, e.g. '5/2/2014', to days since 1970-01-01."""
+    month, day, year = value.split("/")
+    return date(int(year), int(month), int(day)).toordinal() - EPOCH_ORDINAL
+
+
+def from_epoch_day(epoch_day: int) -> date:
+    """Convert days since 1970-01-01 back to a `date`."""
+    return date.fromordinal(epoch_day + EPOCH_ORDINAL)
+
+
+class OrderView:
+    """A read-only view of one row of `OrderColumns`."""
+
+    __slots__ = ("_columns", "_index")
+
+    def __init__(self, columns: "OrderColumns", index: int) -> None:
+        self._columns = columns
+        self._index = index
+
+    @property
+    def item_type(self) -> str:
+        """'Item Type' field."""
+        return self._columns.item_types[self._columns.item_type_codes[self._index]]
+
+    @property
+    def priority(self) -> str:
+        """'Order Priority' field."""
+        return PRIORITIES[self._columns.priorities[self._index]]
+
+    @property
+    def date(self) -> date:
+        """'Order Date' field."""
+        return from_epoch_day(self._columns.dates[self._index])
+
+    @property
+    def id(self) -> int:
+        """'Order ID' field."""
+        return self._columns.ids[self._index]
+
+    def as_tuple(self) -> OrderTuple:
+        """Return the row as a tuple of decoded values."""
+        return (self.item_type, self.priority, self.date, self.id)
+
+    def __repr__(self) -> str:
+        return f"OrderView{self.as_tuple()!r}"
+
+
+class OrderColumns:
+    """Orders stored column by column."""
+
+    COLUMNS = ("item_type_codes", "priorities", "dates", "ids")
+
+    def __init__(self) -> None:
+        self.item_types: List[str] = []
+        self._item_type_codes: Dict[str, int] = {}
+        self.item_type_codes = array("H")
+        self.priorities = array("b")
+        self.dates = array("l")
+        self.ids = array("q")
+
+    def append(
+        self, item_type: str, priority: str, order_date: str, order_id: str
+    ) -> None:
+        """Append one row of raw CSV fields."""
+        code = self._item_type_codes.get(item_type)
+        if code is None:
+            code = self._item_type_codes[item_type] = len(self.item_types)
+            self.item_types.append(item_type)
+
+        self.item_type_codes.append(code)
+        self.priorities.append(_PRIORITY_CODES[priority])
+        self.dates.append(to_epoch_day(order_date))
+        self.ids.append(int(order_id))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> OrderView:
+        if not -len(self) <= index < len(self):
+            raise IndexError("order index out of range")
+        return OrderView(self, index % len(self))
+
+    def __iter__(self) -> Iterator[OrderView]:
+        return (OrderView(self, index) for index in range(len(self)))
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes used by the column buffers."""
+        return sum(
+            len(column) * column.itemsize
+            for column in (getattr(self, name) for name in self.COLUMNS)
+        )
+
+    def indexes_where(self, column: str, predicate: Callable[[Any], bool]) -> array:
+        """Return the indexes of rows whose encoded `column` satisfies `predicate`.
+
+        `column` is one of `COLUMNS`; use `priority_code()` and `to_epoch_day()` to
+        build predicates on encoded values.
+        """
+        values = getattr(self, column)
+        return array("q", (i for i, value in enumerate(values) if predicate(value)))
+
+    def count_by_priority(self) -> Dict[str, int]:
+        """Return the number of orders per 'Order Priority'."""
+        counts = Counter(self.priorities)
+        return {PRIORITIES[code]: count for code, count in sorted(counts.items())}
+
+    def count_by_item_type(self) -> Dict[str, int]:
+        """Return the number of orders per 'Item Type'."""
+        counts = Counter(self.item_type_codes)
+        return {self.item_types[code]: count for code, count in sorted(counts.items())}
+
+
+def priority_code(priority: str) -> int:
+    """Return the code used to store `priority` in `OrderColumns.priorities`."""
+    return _PRIORITY_CODES[priority]
+
+
+def load_orders(path: Union[str, Path]) -> OrderColumns:
+    """Load the orders CSV file at `path` into `OrderColumns`."""
+    columns = OrderColumns()
+    append = columns.append
+    for row in iter_rows(path):
+        append(*row)
+
+    return columns
+
+
+class Order(NamedTuple):
+    """Represents a row in a CSV file, as in `test_read_csv_object()`."""
+
+    item_type: str
+    priority: str
+    date: datetime
+    id: int
+
+
+def compare_memory(path: Union[str, Path]) -> Dict[str, float]:
+    """Measure the memory needed to hold the orders at `path` as columns and objects."""
+    tracemalloc.start()
+    try:
+        columns = load_orders(path)
+        columnar_bytes = tracemalloc.get_traced_memory()[0]
+        del columns
+
+        baseline = tracemalloc.get_traced_memory()[0]
+        orders = [Order(*row) for row in iter_rows(path, ORDER_CONVERTERS)]
+        object_bytes = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+
+    rows = len(orders)
+    return {
+        "rows": rows,
+        "columnar_bytes_per_row": columnar_bytes / rows if rows else 0.0,
+        "object_bytes_per_row": object_bytes / rows if rows else 0.0,
+    }
+
+
+def main() -> None:
+    """Run the memory comparison from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="csv_columnar", description="Compare columnar and per-row order storage"
+    )
+    parser.add_argument("-r", "--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        orders_path = Path(tmp_dir).joinpath("orders.csv")
+        write_synthetic_orders(orders_path, args.rows)
+        print(compare_memory(orders_path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Loading CSV orders into typed columns with `csv_columnar`."""
+
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from csv_columnar import (
+    compare_memory,
+    from_epoch_day,
+    load_orders,
+    priority_code,
+    to_epoch_day,
+)
+from csv_stream import write_synthetic_orders
+
+CSV_SAMPLE_PATH = Path(__file__).parent.joinpath("csv_sample1.csv")
+
+
+def test_epoch_day() -> None:
+    """Convert 'Order Date' fields to and from days since 1970-01-01."""
+    assert to_epoch_day("1/1/1970") == 0
+    assert to_epoch_day("1/2/1970") == 1
+    assert from_epoch_day(to_epoch_day("5/2/2014")) == date(2014, 5, 2)
+
+
+def test_load_orders() -> None:
+    """Load orders into columns, and read them back through row views."""
+    orders = load_orders(CSV_SAMPLE_PATH)
+
+    assert len(orders) == 2
+    assert list(orders.ids) == [1, 2]
+    assert orders.item_types == ["Office Supplies", "Cereal"]
+
+    order = orders[0]
+    assert order.item_type == "Office Supplies"
+    assert order.priority == "L"
+    assert order.date == date(2014, 5, 2)
+    assert order.id == 1
+    assert orders[-1].as_tuple() == ("Cereal", "H", date(2014, 4, 18), 2)
+    assert [order.id for order in orders] == [1, 2]
+
+    with pytest.raises(IndexError):
+        orders[2]
+
+
+def test_filter_aggregate(tmp_path: Path) -> None:
+    """Filter and aggregate over whole columns."""
+    orders_path = tmp_path.joinpath("orders.csv")
+    write_synthetic_orders(orders_path, 1000)
+    orders = load_orders(orders_path)
+
+    high = priority_code("H")
+    high_indexes = orders.indexes_where("priorities", lambda code: code == high)
+    assert all(orders[i].priority == "H" for i in high_indexes)
+    assert len(high_indexes) == orders.count_by_priority()["H"]
+
+    cutoff = to_epoch_day("1/1/2015")
+    recent = orders.indexes_where("dates", lambda day: day >= cutoff)
+    assert all(orders[i].date >= date(2015, 1, 1) for i in recent)
+
+    assert sum(orders.count_by_item_type().values()) == 1000
+
+
+def test_memory(tmp_path: Path) -> None:
+    """Columns use an order of magnitude less memory per row than named tuples."""
+    orders_path = tmp_path.joinpath("orders.csv")
+    write_synthetic_orders(orders_path, 3000)
+
+    orders = load_orders(orders_path)
+    row_size = sum(getattr(orders, name).itemsize for name in orders.COLUMNS)
+    assert orders.nbytes == 3000 * row_size
+
+    result = compare_memory(orders_path)
+    assert result["rows"] == 3000
+    assert result["columnar_bytes_per_row"] * 10 < result["object_bytes_per_row"]
@@ -0,0 +1,329 @@
+"""Parse a large CSV file on several cores by splitting it into byte ranges.
+
+A single `csv.reader` keeps one core busy. Here the file is split into shards:
+
+1. Target split offsets are spaced `shard_size` bytes apart.
+2. Each offset is moved forward to just after the next line terminator that is _not_
+   inside a quoted field. A newline is outside quotes when the number of quote
+   characters before it is even (an escaped `""` inside a field counts twice, so the
+   Excel dialect is handled correctly). Counting quotes uses `bytes.count()`, so this
+   sequential pass runs at close to disk speed. Dialects with an `escapechar`, or with
+   a `lineterminator` that does not end with `\n`, are rejected with `ValueError`.
+3. Each shard is read and parsed by a `csv.reader` in a worker process of a
+   `ProcessPoolExecutor`, and the result is sent back to the parent.
+
+Results are yielded in file order, or as soon as each shard is done. At most a few
+shards per worker are in flight at any time, so memory use is bounded by the shard size
+rather than the file size.
+
+Run as a script to benchmark scaling with the number of workers:
+
+    python csv_parallel.py --rows 10000000 --workers 1 2 4 8
+"""
+
+import argparse
+import csv
+import io
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from csv_stream import ORDER_CONVERTERS, Converter, Row, write_synthetic_orders
+
+T = TypeVar("T")
+
+DEFAULT_SHARD_SIZE = 32 * 1024 * 1024
+_READ_SIZE = 1024 * 1024
+
+
+def _quote_parity(
+    block: bytes, quote: Optional[bytes], start: int = 0, end: Optional[int] = None
+) -> bool:
+    """Return whether `block[start:end]` holds an odd number of `quote` characters."""
+    if quote is None:
+        return False
+    return block.count(quote, start, len(block) if end is None else end) % 2 == 1
+
+
+def _next_record_start(
+    csvfile: BinaryIO, pos: int, in_quotes: bool, quote: Optional[bytes]
+) -> int:
+    """Return the offset just after the first newline from `pos` that ends a record.
+
+    `in_quotes` tells whether `pos` lies inside a quoted field. Return the file size if
+    there is no such newline.
+    """
+    csvfile.seek(pos)
+    while True:
+        block = csvfile.read(_READ_SIZE)
+        if not block:
+            return pos
+
+        start = 0
+        while True:
+            newline = block.find(b"\n", start)
+            if newline == -1:
+                in_quotes ^= _quote_parity(block, quote, start)
+                pos += len(block)
+                break
+
+            in_quotes ^= _quote_parity(block, quote, start, newline)
+            if not in_quotes:
+                return pos + newline + 1
+            start = newline + 1
+
+
+def find_shards(
+    path: Union[str, Path],
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    skip_header: bool = True,
+    quotechar: Optional[str] = '"',
+) -> List[Tuple[int, int]]:
+    """Split the CSV file at `path` into `(start, end)` byte ranges of whole records.
+
+    Each range is about `shard_size` bytes long. If `skip_header` is true, the first
+    record is left out of all ranges. `quotechar` is `None` if fields are never quoted.
+    """
+    if shard_size < 1:
+        raise ValueError("shard_size must be >= 1")
+
+    quote = quotechar.encode() if quotechar else None
+    file_size = os.path.getsize(path)
+    shards: List[Tuple[int, int]] = []
+
+    with open(path, "rb") as csvfile:
+        start = _next_record_start(csvfile, 0, False, quote) if skip_header else 0
+
+        while start < file_size:
+            target = start + shard_size
+            if target >= file_size:
+                shards.append((start, file_size))
+                break
+
+            # Work out whether `target` is inside quotes by counting the quote
+            # characters between the start of the shard and `target`.
+            in_quotes = False
+            csvfile.seek(start)
+            remaining = shard_size
+            while remaining:
+                block = csvfile.read(min(remaining, _READ_SIZE))
+                in_quotes ^= _quote_parity(block, quote)
+                remaining -= len(block)
+
+            end = _next_record_start(csvfile, target, in_quotes, quote)
+            shards.append((start, end))
+            start = end
+
+    return shards
+
+
+def parse_shard(
+    path: Union[str, Path],
+    start: int,
+    end: int,
+    converters: Optional[Sequence[Optional[Converter]]] = None,
+    dialect: Union[str, csv.Dialect] = "excel",
+    encoding: str = "utf-8",
+    fmtparams: Optional[Dict[str, Any]] = None,
+) -> List[Row]:
+    """Parse the records between byte offsets `start` and `end` into tuples.
+
+    See `csv_stream.iter_rows()` for `converters`.
+    """
+    with open(path, "rb") as csvfile:
+        csvfile.seek(start)
+        data = csvfile.read(end - start).decode(encoding)
+
+    csv_reader = csv.reader(io.StringIO(data, newline=""), dialect, **(fmtparams or {}))
+    if converters is None:
+        return list(map(tuple, csv_reader))
+
+    conversions = [(i, conv) for i, conv in enumerate(converters) if conv]
+    rows: List[Row] = []
+    for row in csv_reader:
+        for i, conv in conversions:
+            row[i] = conv(row[i])
+        rows.append(tuple(row))
+
+    return rows
+
+
+def _process_shard(
+    func: Callable[[List[Row]], T],
+    path: Union[str, Path],
+    start: int,
+    end: int,
+    converters: Optional[Sequence[Optional[Converter]]],
+    dialect: Union[str, csv.Dialect],
+    encoding: str,
+    fmtparams: Optional[Dict[str, Any]],
+) -> T:
+    """Parse a shard and apply `func` to its rows, in a worker process."""
+    return func(parse_shard(path, start, end, converters, dialect, encoding, fmtparams))
+
+
+def map_shards(
+    func: Callable[[List[Row]], T],
+    path: Union[str, Path],
+    max_workers: Optional[int] = None,
+    ordered: bool = True,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    converters: Optional[Sequence[Optional[Converter]]] = None,
+    skip_header: bool = True,
+    dialect: Union[str, csv.Dialect] = "excel",
+    encoding: str = "utf-8",
+    **fmtparams: Any,
+) -> Iterator[T]:
+    """Yield `func(rows)` for the rows of each shard of the CSV file at `path`.
+
+    `func`, `converters` and `dialect` are sent to worker processes, so they must be
+    picklable, e.g. module-level functions and classes. A dialect registered by name in
+    the parent is not visible to workers started with the 'spawn' method; pass a
+    `Dialect` subclass or `fmtparams` instead.
+
+    If `ordered` is false, results are yielded as soon as each shard is done.
+
+    Raise `ValueError` if the dialect has an `escapechar`, since escaped quote
+    characters would be counted, or a `lineterminator` that does not end with `\n`,
+    since shards end after a `\n`.
+    """
+    resolved = csv.reader([], dialect, **fmtparams).dialect
+    if resolved.escapechar is not None:
+        raise ValueError("dialects with an escapechar are not supported")
+    if not resolved.lineterminator.endswith("\n"):
+        raise ValueError(r"line terminators must end with \n")
+    quotechar = None if resolved.quoting == csv.QUOTE_NONE else resolved.quotechar
+    shards = deque(find_shards(path, shard_size, skip_header, quotechar))
+    max_workers = max_workers or os.cpu_count() or 1
+    window = 2 * max_workers
+
+    with ProcessPoolExecutor(max_workers) as executor:
+
+        def submit() -> "Future[T]":
+            start, end = shards.popleft()
+            return executor.submit(
+                _process_shard,
+                func,
+                path,
+                start,
+                end,
+                converters,
+                dialect,
+                encoding,
+                fmtparams,
+            )
+
+        if ordered:
+            in_order: Deque["Future[T]"] = deque()
+            while shards or in_order:
+                while shards and len(in_order) < window:
+                    in_order.append(submit())
+                yield in_order.popleft().result()
+        else:
+            pending: Set["Future[T]"] = set()
+            while shards or pending:
+                while shards and len(pending) < window:
+                    pending.add(submit())
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+def iter_shards(
+    path: Union[str, Path], max_workers: Optional[int] = None, **kwargs: Any
+) -> Iterator[List[Row]]:
+    """Yield the rows of the CSV file at `path`, one list per shard.
+
+    See `map_shards()` for the remaining parameters.
+    """
+    return map_shards(list, path, max_workers, **kwargs)
+
+
+def iter_rows(
+    path: Union[str, Path], max_workers: Optional[int] = None, **kwargs: Any
+) -> Iterator[Row]:
+    """Yield the rows of the CSV file at `path`, parsed in parallel.
+
+    See `map_shards()` for the remaining parameters.
+    """
+    for rows in iter_shards(path, max_workers, **kwargs):
+        yield from rows
+
+
+def benchmark(
+    path: Union[str, Path],
+    workers: Sequence[int],
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> Dict[int, Dict[str, float]]:
+    """Parse the orders file at `path` with each number of `workers`.
+
+    Each shard is reduced to its row count in the worker, so that the time measured is
+    that of parsing rather than that of sending rows back to the parent.
+    """
+    results: Dict[int, Dict[str, float]] = {}
+    for max_workers in workers:
+        start = time.perf_counter()
+        rows = sum(
+            map_shards(
+                len,
+                path,
+                max_workers,
+                ordered=False,
+                shard_size=shard_size,
+                converters=ORDER_CONVERTERS,
+            )
+        )
+        elapsed = time.perf_counter() - start
+        results[max_workers] = {
+            "rows": rows,
+            "seconds": elapsed,
+            "rows_per_second": rows / elapsed if elapsed else 0.0,
+        }
+
+    base = results[workers[0]]["seconds"]
+    for result in results.values():
+        result["speedup"] = base / result["seconds"] if result["seconds"] else 0.0
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="csv_parallel", description="Benchmark parallel CSV parsing"
+    )
+    parser.add_argument("-r", "--rows", type=int, default=10_000_000)
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("-s", "--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        orders_path = Path(tmp_dir).joinpath("orders.csv")
+        write_synthetic_orders(orders_path, args.rows)
+        print(f"{os.path.getsize(orders_path)} bytes")
+        for max_workers, result in benchmark(
+            orders_path, args.workers, args.shard_size
+        ).items():
+            print(max_workers, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Parsing CSV files in parallel with `csv_parallel`."""
+
+import csv
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+import csv_stream
+from csv_parallel import benchmark, find_shards, iter_rows, iter_shards, map_shards
+from csv_stream import ORDER_CONVERTERS, write_synthetic_orders
+
+CSV_PASSWD_PATH = Path(__file__).parent.joinpath("csv_passwd")
+
+
+@pytest.fixture(name="orders_path")
+def fixture_orders_path(tmp_path: Path) -> Path:
+    """Write a small synthetic orders file."""
+    orders_path = tmp_path.joinpath("orders.csv")
+    write_synthetic_orders(orders_path, 500)
+    return orders_path
+
+
+@pytest.fixture(name="quoted_path")
+def fixture_quoted_path(tmp_path: Path) -> Path:
+    """Write a CSV file with quoted fields containing newlines and quotes."""
+    quoted_path = tmp_path.joinpath("quoted.csv")
+    with open(quoted_path, "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(["id", "comment"])
+        csv_writer.writerows(
+            [i, f'line 1\nline "2"\r\nline 3 of {i}' if i % 3 else "plain"]
+            for i in range(100)
+        )
+    return quoted_path
+
+
+def test_find_shards(orders_path: Path) -> None:
+    """Shards cover the file after the header without gaps or overlaps."""
+    shards = find_shards(orders_path, 1000)
+
+    assert len(shards) > 1
+    assert shards[0][0] == len("Item Type,Order Priority,Order Date,Order ID\r\n")
+    assert shards[-1][1] == orders_path.stat().st_size
+    assert all(prev[1] == shard[0] for prev, shard in zip(shards, shards[1:]))
+
+
+def test_find_shards_quoted(quoted_path: Path) -> None:
+    """Shards never end inside a quoted field."""
+    data = quoted_path.read_bytes()
+
+    for shard_size in (1, 7, 50, 1000):
+        for start, end in find_shards(quoted_path, shard_size):
+            # A shard ends in a record when it has balanced quotes.
+            assert data.count(b'"', start, end) % 2 == 0
+            assert data[end - 1:end] == b"\n"
+
+
+def test_iter_rows_ordered(orders_path: Path) -> None:
+    """Rows parsed in parallel are the same, in the same order, as sequentially."""
+    assert list(
+        iter_rows(orders_path, 2, shard_size=1000, converters=ORDER_CONVERTERS)
+    ) == list(csv_stream.iter_rows(orders_path, ORDER_CONVERTERS))
+
+
+def test_iter_rows_unordered(quoted_path: Path) -> None:
+    """Rows parsed in parallel without ordering are the same rows as sequentially."""
+    rows = iter_rows(quoted_path, 2, ordered=False, shard_size=100)
+
+    assert Counter(rows) == Counter(csv_stream.iter_rows(quoted_path))
+
+
+def test_iter_shards_dialect() -> None:
+    """Parse using formatting parameters instead of a registered dialect."""
+    shards = list(
+        iter_shards(
+            CSV_PASSWD_PATH,
+            1,
+            shard_size=10,
+            skip_header=False,
+            delimiter=":",
+            quoting=csv.QUOTE_NONE,
+        )
+    )
+
+    assert len(shards) == 2
+    assert shards[1] == [
+        (
+            "hplip",
+            "x",
+            "117",
+            "7",
+            "HPLIP system user,,,",
+            "/var/run/hplip",
+            "/bin/false",
+        )
+    ]
+
+
+def test_map_shards(orders_path: Path) -> None:
+    """Reduce each shard in the worker processes."""
+    assert sum(map_shards(len, orders_path, 2, shard_size=1000)) == 500
+
+
+@pytest.mark.parametrize(
+    "fmtparams", [{"escapechar": "\\"}, {"lineterminator": "\r"}]
+)
+def test_map_shards_unsupported_dialect(
+    orders_path: Path, fmtparams: Dict[str, Any]
+) -> None:
+    """Dialects whose records cannot be found by counting quotes are rejected."""
+    with pytest.raises(ValueError):
+        next(map_shards(len, orders_path, 2, shard_size=1000, **fmtparams))
+
+
+def test_find_shards_invalid_size(orders_path: Path) -> None:
+    """A shard size below 1 is rejected."""
+    with pytest.raises(ValueError):
+        find_shards(orders_path, 0)
+
+
+def test_benchmark(orders_path: Path) -> None:
+    """Run the benchmark on a small file."""
+    results = benchmark(orders_path, [1, 2], 1000)
+
+    assert results[1]["rows"] == results[2]["rows"] == 500
+    assert results[1]["speedup"] == 1.0
@@ -0,0 +1,258 @@
+"""Cache the dialect, field names and column types detected for CSV files.
+
+Detecting the format of a CSV file with `csv.Sniffer` and inferring column types means
+reading and analysing a sample of the file. When the same files are loaded again and
+again, `SchemaCache` remembers the result, and can save it to a JSON file to be reused
+by later runs.
+
+A cached entry is used only while the file is unchanged, i.e. while all of these still
+match the values recorded when the entry was created:
+
+- the file size
+- the file modification time (in nanoseconds)
+- a hash of the first `sample_size` bytes, the part of the file that was analysed
+
+Otherwise the entry is dropped and the schema is detected again. Entries are kept per
+file and per `detect_schema()` options: the same file detected with other options, e.g.
+another encoding, has a separate entry.
+"""
+
+import codecs
+import csv
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Type, Union
+
+from date_parser import get_parser
+
+DEFAULT_SAMPLE_SIZE = 64 * 1024
+DEFAULT_DATE_FORMATS = ("%m/%d/%Y", "%Y-%m-%d")
+
+DIALECT_ATTRIBUTES = (
+    "delimiter",
+    "quotechar",
+    "escapechar",
+    "doublequote",
+    "skipinitialspace",
+    "lineterminator",
+    "quoting",
+)
+
+
+class CsvSchema(NamedTuple):
+    """The format and contents detected for a CSV file."""
+
+    dialect: Dict[str, Any]
+    has_header: bool
+    fieldnames: Optional[List[str]]
+    column_types: List[str]
+
+    def to_dialect(self) -> Type[csv.Dialect]:
+        """Return a `Dialect` subclass with the detected formatting parameters."""
+        return type("CachedDialect", (csv.Dialect,), dict(self.dialect))
+
+    def register_dialect(self, name: str) -> None:
+        """Register the detected dialect under `name`."""
+        csv.register_dialect(name, **self.dialect)
+
+
+def _infer_type(values: Sequence[str], date_formats: Sequence[str]) -> str:
+    """Return 'int', 'float', a date format, or 'str' as the type of `values`."""
+    values = [value for value in values if value != ""]
+    if not values:
+        return "str"
+
+    for type_name, convert in (("int", int), ("float", float)):
+        try:
+            for value in values:
+                convert(value)
+        except ValueError:
+            continue
+        return type_name
+
+    for date_format in date_formats:
+        parse = get_parser(date_format)
+        try:
+            for value in values:
+                parse(value)
+        except ValueError:
+            continue
+        return date_format
+
+    return "str"
+
+
+def _read_sample(path: Union[str, Path], sample_size: int) -> bytes:
+    """Read the first `sample_size` bytes of the file at `path`."""
+    with open(path, "rb") as csvfile:
+        return csvfile.read(sample_size)
+
+
+def _hash(sample: bytes) -> str:
+    return hashlib.sha1(sample).hexdigest()
+
+
+def detect_schema(
+    path: Union[str, Path],
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+    has_header: Optional[bool] = None,
+    date_formats: Sequence[str] = DEFAULT_DATE_FORMATS,
+    encoding: str = "utf-8",
+) -> CsvSchema:
+    """Detect the schema of the CSV file at `path` from its first `sample_size` bytes.
+
+    `has_header` overrides the guess made by `csv.Sniffer.has_header()`.
+    """
+    return _detect_sample(
+        _read_sample(path, sample_size), sample_size, has_header, date_formats, encoding
+    )
+
+
+def _detect_sample(
+    raw_sample: bytes,
+    sample_size: int,
+    has_header: Optional[bool],
+    date_formats: Sequence[str],
+    encoding: str,
+) -> CsvSchema:
+    sample = raw_sample.decode(encoding, errors="ignore")
+    if len(raw_sample) == sample_size and "\n" in sample:
+        # Leave out the last, probably incomplete, line.
+        sample = sample[: sample.rindex("\n") + 1]
+
+    sniffer = csv.Sniffer()
+    sniffed = sniffer.sniff(sample)
+    dialect = {name: getattr(sniffed, name) for name in DIALECT_ATTRIBUTES}
+    if has_header is None:
+        has_header = sniffer.has_header(sample)
+
+    # Not split into lines, which would split quoted fields with line breaks.
+    rows = list(csv.reader(io.StringIO(sample, newline=""), **dialect))
+    fieldnames = rows.pop(0) if has_header and rows else None
+    width = max(map(len, rows), default=len(fieldnames or []))
+    columns = [[row[i] for row in rows if i < len(row)] for i in range(width)]
+
+    return CsvSchema(
+        dialect=dialect,
+        has_header=has_header,
+        fieldnames=fieldnames,
+        column_types=[_infer_type(column, date_formats) for column in columns],
+    )
+
+
+class SchemaCache:
+    """Detect CSV schemas, caching the results per file.
+
+    `hits`, `misses` and `invalidations` (misses where an outdated entry was dropped)
+    count the calls to `get()`.
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[Union[str, Path]] = None,
+        sample_size: int = DEFAULT_SAMPLE_SIZE,
+    ) -> None:
+        """Create a cache, loading entries from `cache_path` if it exists."""
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.sample_size = sample_size
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        if self.cache_path and self.cache_path.exists():
+            with open(self.cache_path) as cache_file:
+                self.entries = json.load(cache_file)
+
+    @staticmethod
+    def _key(
+        path: Union[str, Path],
+        has_header: Optional[bool],
+        date_formats: Sequence[str],
+        encoding: str,
+    ) -> str:
+        # A JSON array, so that entries can be saved with their key.
+        return json.dumps(
+            [
+                str(Path(path).resolve()),
+                has_header,
+                list(date_formats),
+                codecs.lookup(encoding).name,
+            ]
+        )
+
+    def _sample_hash(self, path: Union[str, Path]) -> str:
+        return _hash(_read_sample(path, self.sample_size))
+
+    def get(
+        self,
+        path: Union[str, Path],
+        has_header: Optional[bool] = None,
+        date_formats: Sequence[str] = DEFAULT_DATE_FORMATS,
+        encoding: str = "utf-8",
+    ) -> CsvSchema:
+        """Return the schema of the CSV file at `path`, detecting it if needed.
+
+        The arguments are passed to `detect_schema()` on a cache miss.
+        """
+        key = self._key(path, has_header, date_formats, encoding)
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            stat = os.stat(path)
+            if (
+                entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns
+                and entry["sample_hash"] == self._sample_hash(path)
+            ):
+                self.hits += 1
+                return CsvSchema(**entry["schema"])
+
+            self.invalidations += 1
+            del self.entries[key]
+
+        self.misses += 1
+        # The sample analysed is the one hashed, and the file is checked after reading
+        # it, so that the entry does not record a file older than the schema.
+        raw_sample = _read_sample(path, self.sample_size)
+        schema = _detect_sample(
+            raw_sample, self.sample_size, has_header, date_formats, encoding
+        )
+        stat = os.stat(path)
+        self.entries[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sample_hash": _hash(raw_sample),
+            "schema": schema._asdict(),
+        }
+        return schema
+
+    def invalidate(self, path: Union[str, Path]) -> None:
+        """Drop the entries for the file at `path`, if any."""
+        resolved = str(Path(path).resolve())
+        for key in [key for key in self.entries if json.loads(key)[0] == resolved]:
+            del self.entries[key]
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        self.entries.clear()
+
+    def save(self) -> None:
+        """Save the entries to `cache_path`."""
+        if self.cache_path is None:
+            raise ValueError("no cache_path to save to")
+
+        with open(self.cache_path, "w") as cache_file:
+            json.dump(self.entries, cache_file, indent=2)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters, and the number of entries."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "entries": len(self.entries),
+        }
@@ -0,0 +1,143 @@
+"""Caching detected CSV schemas with `csv_schema_cache`."""
+
+import csv
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from csv_schema_cache import SchemaCache, detect_schema
+
+CSV_SAMPLE_PATH = Path(__file__).parent.joinpath("csv_sample1.csv")
+CSV_PASSWD_PATH = Path(__file__).parent.joinpath("csv_passwd")
+
+
+@pytest.fixture(name="orders_path")
+def fixture_orders_path(tmp_path: Path) -> Path:
+    """Copy `csv_sample1.csv` so that it can be modified."""
+    return Path(shutil.copy(CSV_SAMPLE_PATH, tmp_path.joinpath("orders.csv")))
+
+
+def test_detect_schema() -> None:
+    """Detect the dialect, field names and column types of a CSV file."""
+    schema = detect_schema(CSV_SAMPLE_PATH)
+
+    assert schema.dialect["delimiter"] == ","
+    assert schema.has_header
+    assert schema.fieldnames == [
+        "Item Type",
+        "Order Priority",
+        "Order Date",
+        "Order ID",
+    ]
+    assert schema.column_types == ["str", "str", "%m/%d/%Y", "int"]
+
+
+def test_detect_schema_dialect() -> None:
+    """Detect a 'unixpasswd'-like dialect, and read the file with it."""
+    schema = detect_schema(CSV_PASSWD_PATH, has_header=False)
+
+    assert schema.dialect["delimiter"] == ":"
+    assert schema.fieldnames is None
+    assert schema.column_types == ["str", "str", "int", "int", "str", "str", "str"]
+
+    schema.register_dialect("cached")
+    try:
+        with open(CSV_PASSWD_PATH, newline="") as passwd_file:
+            rows = list(csv.reader(passwd_file, "cached"))
+    finally:
+        csv.unregister_dialect("cached")
+
+    with open(CSV_PASSWD_PATH, newline="") as passwd_file:
+        assert list(csv.reader(passwd_file, schema.to_dialect())) == rows
+    assert rows[1][4] == "HPLIP system user,,,"
+
+
+def test_cache_hit(orders_path: Path) -> None:
+    """A schema is detected once, then served from the cache."""
+    cache = SchemaCache()
+
+    schema = cache.get(orders_path)
+    assert cache.get(orders_path) == schema
+    assert cache.stats() == {"hits": 1, "misses": 1, "invalidations": 0, "entries": 1}
+
+
+def test_cache_invalidation(orders_path: Path) -> None:
+    """Entries are dropped when the file changes."""
+    cache = SchemaCache()
+    cache.get(orders_path)
+
+    # Same size and modification time, different contents.
+    stat = orders_path.stat()
+    orders_path.write_bytes(orders_path.read_bytes().replace(b"Cereal", b"Cereaf"))
+    os.utime(orders_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    cache.get(orders_path)
+
+    # Different size.
+    with open(orders_path, "a", newline="") as csvfile:
+        csv.writer(csvfile).writerow(["Snacks", "M", "1/1/2020", "3"])
+    cache.get(orders_path)
+
+    assert cache.stats() == {"hits": 0, "misses": 3, "invalidations": 2, "entries": 1}
+
+    cache.invalidate(orders_path)
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_options(orders_path: Path) -> None:
+    """Entries are kept per `detect_schema()` options."""
+    cache = SchemaCache()
+
+    assert cache.get(orders_path).fieldnames is not None
+    assert cache.get(orders_path, has_header=False).fieldnames is None
+    assert cache.get(orders_path, date_formats=[]).column_types[2] == "str"
+    # The same options, with an equivalent name of the encoding.
+    cache.get(orders_path, encoding="UTF8")
+    assert cache.stats() == {"hits": 1, "misses": 3, "invalidations": 0, "entries": 3}
+
+    cache.invalidate(orders_path)
+    assert cache.stats()["entries"] == 0
+
+
+def test_detect_schema_multibyte(tmp_path: Path) -> None:
+    """Leave out the incomplete last line of a sample with multibyte characters."""
+    path = tmp_path.joinpath("multibyte.csv")
+    path.write_bytes("name,price\ncafé,1\nthé,2\ntea,1e5".encode())
+
+    schema = detect_schema(path, path.stat().st_size + 1, has_header=True)
+    assert schema.column_types == ["str", "float"]
+
+    # "tea,1e" is left out.
+    schema = detect_schema(path, path.stat().st_size - 1, has_header=True)
+    assert schema.column_types == ["str", "int"]
+
+
+def test_detect_schema_multiline(tmp_path: Path) -> None:
+    """Keep the line breaks of quoted fields, and only split rows on line breaks."""
+    path = tmp_path.joinpath("multiline.csv")
+    path.write_text('name,code,count\na,"1\n2",1\nb\u2028c,3,2\n')
+
+    schema = detect_schema(path, has_header=True)
+    assert schema.column_types == ["str", "str", "int"]
+
+
+def test_cache_persistence(orders_path: Path, tmp_path: Path) -> None:
+    """Entries saved to a file are reused by a new cache."""
+    cache_path = tmp_path.joinpath("schemas.json")
+    cache = SchemaCache(cache_path)
+    schema = cache.get(orders_path)
+    cache.save()
+
+    new_cache = SchemaCache(cache_path)
+    assert new_cache.get(orders_path) == schema
+    assert new_cache.stats()["hits"] == 1
+
+    new_cache.clear()
+    assert new_cache.stats()["entries"] == 0
+
+
+def test_save_without_path() -> None:
+    """A cache without a file cannot be saved."""
+    with pytest.raises(ValueError):
+        SchemaCache().save()
@@ -0,0 +1,180 @@
+"""Stream rows from large CSV files using constant memory.
+
+`csv.reader` is already lazy; memory only grows when the rows are collected, e.g. with
+`list(csv_reader)`. The functions here never hold more than one chunk of rows at a
+time, and optionally convert each field to a typed value as it is read.
+
+Run as a script to benchmark reading a synthetic orders file shaped like
+`csv_sample1.csv`:
+
+    python csv_stream.py --rows 10000000
+"""
+
+import argparse
+import csv
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from date_parser import get_parser
+
+Converter = Callable[[str], Any]
+Row = Tuple[Any, ...]
+
+DEFAULT_CHUNK_SIZE = 65536
+
+ORDER_FIELDNAMES = ["Item Type", "Order Priority", "Order Date", "Order ID"]
+
+
+_parse_order_date = get_parser("%m/%d/%Y")
+
+
+def parse_order_date(value: str) -> datetime:
+    """Parse an 'Order Date' field, e.g. '5/2/2014'."""
+    return _parse_order_date(value)
+
+
+ORDER_CONVERTERS: List[Optional[Converter]] = [None, None, parse_order_date, int]
+
+
+def read_header(
+    path: Union[str, Path], dialect: Union[str, csv.Dialect] = "excel", **fmtparams: Any
+) -> List[str]:
+    """Return the first row of the CSV file at `path`."""
+    with open(path, newline="") as csvfile:
+        return next(csv.reader(csvfile, dialect, **fmtparams), [])
+
+
+def iter_rows(
+    path: Union[str, Path],
+    converters: Optional[Sequence[Optional[Converter]]] = None,
+    skip_header: bool = True,
+    dialect: Union[str, csv.Dialect] = "excel",
+    **fmtparams: Any,
+) -> Iterator[Row]:
+    """Yield each row of the CSV file at `path` as a tuple.
+
+    If `converters` is given, the field at position `i` is passed through
+    `converters[i]`; a `None` converter leaves the field as a `str`.
+    """
+    with open(path, newline="") as csvfile:
+        csv_reader = csv.reader(csvfile, dialect, **fmtparams)
+        if skip_header:
+            next(csv_reader, None)
+
+        if converters is None:
+            yield from map(tuple, csv_reader)
+            return
+
+        # Only convert the fields that need it; the rest are passed through as is.
+        conversions = [(i, conv) for i, conv in enumerate(converters) if conv]
+        for row in csv_reader:
+            for i, conv in conversions:
+                row[i] = conv(row[i])
+            yield tuple(row)
+
+
+def iter_chunks(
+    path: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    converters: Optional[Sequence[Optional[Converter]]] = None,
+    skip_header: bool = True,
+    dialect: Union[str, csv.Dialect] = "excel",
+    **fmtparams: Any,
+) -> Iterator[List[Row]]:
+    """Yield lists of at most `chunk_size` rows from the CSV file at `path`.
+
+    See `iter_rows()` for the remaining parameters.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be >= 1")
+
+    rows = iter_rows(path, converters, skip_header, dialect, **fmtparams)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def random_date(rand: random.Random) -> str:
+    """Return a random 'Order Date' field value."""
+    return f"{rand.randint(1, 12)}/{rand.randint(1, 28)}/{rand.randint(2010, 2020)}"
+
+
+def write_synthetic_orders(path: Union[str, Path], rows: int, seed: int = 0) -> None:
+    """Write an orders CSV file with `rows` data rows, shaped like `csv_sample1.csv`."""
+    rand = random.Random(seed)
+    item_types = ["Office Supplies", "Cereal", "Baby Food", "Clothes", "Snacks"]
+    priorities = ["L", "M", "H", "C"]
+
+    with open(path, "w", newline="") as csvfile:
+        csv_writer = csv.writer(csvfile)
+        csv_writer.writerow(ORDER_FIELDNAMES)
+        csv_writer.writerows(
+            (
+                rand.choice(item_types),
+                rand.choice(priorities),
+                random_date(rand),
+                order_id,
+            )
+            for order_id in range(1, rows + 1)
+        )
+
+
+def peak_rss_kib() -> int:
+    """Return the peak resident set size of this process (KiB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark(
+    path: Union[str, Path], chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, float]:
+    """Read the orders file at `path` in chunks, and report rows/s and peak RSS."""
+    rows = 0
+    start = time.perf_counter()
+    for chunk in iter_chunks(path, chunk_size, ORDER_CONVERTERS):
+        rows += len(chunk)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+        "peak_rss_kib": peak_rss_kib(),
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="csv_stream", description="Benchmark streaming CSV ingestion"
+    )
+    parser.add_argument("-r", "--rows", type=int, default=10_000_000)
+    parser.add_argument("-c", "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        orders_path = Path(tmp_dir).joinpath("orders.csv")
+        write_synthetic_orders(orders_path, args.rows)
+        print(f"peak RSS before reading: {peak_rss_kib()} KiB")
+        print(benchmark(orders_path, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Streaming CSV rows with `csv_stream`."""
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from csv_stream import (
+    ORDER_CONVERTERS,
+    benchmark,
+    iter_chunks,
+    iter_rows,
+    read_header,
+    write_synthetic_orders,
+)
+
+CSV_SAMPLE_PATH = Path(__file__).parent.joinpath("csv_sample1.csv")
+
+
+def test_read_header() -> None:
+    """Read only the header row."""
+    assert read_header(CSV_SAMPLE_PATH) == [
+        "Item Type",
+        "Order Priority",
+        "Order Date",
+        "Order ID",
+    ]
+
+
+def test_iter_rows() -> None:
+    """Stream rows as tuples of strings."""
+    rows = iter_rows(CSV_SAMPLE_PATH)
+
+    assert next(rows) == ("Office Supplies", "L", "5/2/2014", "1")
+    assert next(rows) == ("Cereal", "H", "4/18/2014", "2")
+    assert next(rows, None) is None
+
+
+def test_iter_rows_typed() -> None:
+    """Stream rows with fields converted to typed values."""
+    assert list(iter_rows(CSV_SAMPLE_PATH, ORDER_CONVERTERS)) == [
+        ("Office Supplies", "L", datetime(2014, 5, 2), 1),
+        ("Cereal", "H", datetime(2014, 4, 18), 2),
+    ]
+
+
+def test_iter_rows_with_header() -> None:
+    """Stream all rows, including the header row."""
+    rows = list(iter_rows(CSV_SAMPLE_PATH, skip_header=False))
+
+    assert len(rows) == 3
+    assert rows[0] == ("Item Type", "Order Priority", "Order Date", "Order ID")
+
+
+def test_iter_chunks(tmp_path: Path) -> None:
+    """Stream rows in chunks of a fixed size, with a smaller last chunk."""
+    orders_path = tmp_path.joinpath("orders.csv")
+    write_synthetic_orders(orders_path, 10)
+
+    chunks = list(iter_chunks(orders_path, 4, ORDER_CONVERTERS))
+
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert [row[3] for chunk in chunks for row in chunk] == list(range(1, 11))
+
+
+def test_iter_chunks_invalid_size() -> None:
+    """A chunk size below 1 is rejected."""
+    with pytest.raises(ValueError):
+        next(iter_chunks(CSV_SAMPLE_PATH, 0))
+
+
+def test_benchmark(tmp_path: Path) -> None:
+    """Run the benchmark on a small synthetic file."""
+    orders_path = tmp_path.joinpath("orders.csv")
+    write_synthetic_orders(orders_path, 100)
+
+    result = benchmark(orders_path, 16)
+
+    assert result["rows"] == 100
+    assert result["peak_rss_kib"] > 0
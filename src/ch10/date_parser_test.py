@@ -0,0 +1,93 @@
+"""Parsing dates with `date_parser`."""
+
+from datetime import date, datetime
+
+import pytest
+
+from date_parser import DateParser, benchmark, compile_format, get_parser
+
+
+@pytest.mark.parametrize(
+    "fmt, value",
+    [
+        ("%m/%d/%Y", "5/2/2014"),
+        ("%m/%d/%Y", "12/31/1999"),
+        ("%Y-%m-%d", "2020-07-08"),
+        ("%d/%m/%y", "15/7/20"),
+        ("%d/%m/%y", "15/7/70"),
+        ("%Y-%m-%d %H:%M:%S", "2020-07-08 13:10:05"),
+        ("%Y%m%d", "20200708"),
+        ("%d/%m/%y %H:%M %z", "15/7/20 12:00 +0200"),
+        ("%Y%m%d", "2020718"),
+        ("%d/%m/%Y", " 2/5/2014"),
+        ("%Y-%m-%d %H:%M", "2020-07-08  13:10"),
+        ("%d.%m.%Y %H:%M", "2.5.2014 9:5"),
+    ],
+)
+def test_same_as_strptime(fmt: str, value: str) -> None:
+    """Compiled parsers return the same `datetime` as `strptime()`."""
+    assert compile_format(fmt)(value) == datetime.strptime(value, fmt)
+
+
+@pytest.mark.parametrize(
+    "fmt, value",
+    [
+        ("%m/%d/%Y", "5/2/14"),
+        ("%m/%d/%Y", "5-2-2014"),
+        ("%m/%d/%Y", "13/2/2014"),
+        ("%Y-%m-%d", "2020-07"),
+        ("%Y-%m-%d", "2020-07-08x"),
+        ("%Y-%m-%d %H:%M", "2020-07-08 1:2:3"),
+        ("%Y%m%d", "20201301"),
+        ("%d/%m/%Y", " 2/ 5/2014"),
+        ("%Y-%m-%d%", "2020-07-08"),
+        ("%Y-%m-%d%", "2020-07-08%"),
+    ],
+)
+def test_invalid(fmt: str, value: str) -> None:
+    """Strings that do not match the format are rejected, as with `strptime()`."""
+    with pytest.raises(ValueError):
+        datetime.strptime(value, fmt)
+    with pytest.raises(ValueError):
+        compile_format(fmt)(value)
+
+
+def test_cache() -> None:
+    """Repeated date strings are served from the cache."""
+    parser = DateParser("%Y-%m-%d", cache_size=2)
+
+    assert parser.parse_date("2020-07-08") == date(2020, 7, 8)
+    assert parser("2020-07-08") == datetime(2020, 7, 8)
+    parser("2020-07-11")
+    parser("2020-07-12")
+
+    cache_info = parser.cache_info()
+    assert cache_info is not None
+    assert (cache_info.hits, cache_info.misses, cache_info.currsize) == (1, 3, 2)
+
+    parser.cache_clear()
+    assert parser.cache_info().currsize == 0  # type: ignore
+
+
+def test_no_cache() -> None:
+    """A cache size of 0 disables the cache."""
+    parser = DateParser("%Y-%m-%d", cache_size=0)
+
+    assert parser("2020-07-08") == datetime(2020, 7, 8)
+    assert parser.cache_info() is None
+
+
+def test_get_parser() -> None:
+    """Parsers are shared per format."""
+    assert get_parser("%m/%d/%Y") is get_parser("%m/%d/%Y")
+
+
+def test_benchmark() -> None:
+    """Run the benchmark on a few dates."""
+    results = benchmark(100, 10)
+
+    assert set(results) == {"%m/%d/%Y", "%Y-%m-%d", "%d/%m/%y %H:%M %z"}
+    assert all(
+        set(timings) == {"strptime", "compiled", "compiled_cached"}
+        for timings in results.values()
+    )
@@ -7,6 +7,8 @@ from xml.dom import minidom
 
 import pytest
 
+from xml_compare import find_difference
+
 
 def test_parse_string_pretty_print() -> None:
     """Parse XML from a string.
@@ -79,20 +81,12 @@ XMLType = Union[str, ET.Element, ET.ElementTree]
 
 
 def assert_xml_equal(actual: XMLType, expected: XMLType) -> None:
-    """Assert that the XML canonical forms of `expected` and `actual` are equal."""
-
-    def to_string(xml_data: XMLType) -> str:
-        if isinstance(xml_data, str):
-            return xml_data
-
-        if isinstance(xml_data, ET.ElementTree):
-            xml_data = xml_data.getroot()
+    """Assert that `expected` and `actual` are equal, as their XML canonical forms are.
 
-        return ET.tostring(xml_data, encoding="unicode")
-
-    assert ET.canonicalize(to_string(actual), strip_text=True) == ET.canonicalize(
-        to_string(expected), strip_text=True
-    )
+    See `xml_compare.find_difference()`.
+    """
+    difference = find_difference(actual, expected)
+    assert difference is None, difference
 
 
 def test_modify() -> None:
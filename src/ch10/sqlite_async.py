@@ -0,0 +1,291 @@
+"""Use SQLite from `asyncio` code without blocking the event loop.
+
+`sqlite3` calls block until the database has answered. Called from a coroutine, they
+block the event loop, and every other task with it. `AsyncDatabase` runs them in
+worker threads instead, and coroutines `await` the results:
+
+- writes run on a single writer connection, in a thread of its own, so that they are
+  serialised as SQLite requires
+- reads run on a pool of reader connections, in a pool of threads of the same size;
+  with write-ahead logging, they are not blocked by the writer
+- `async for row in db.query(...)` runs on a connection and in a thread of its own,
+  held until iteration ends, so that reads made while iterating do not wait for it
+- `async with db.transaction()` groups statements on the writer connection into a
+  transaction, committed at the end of the block, or rolled back if it raises, like
+  `with conn:`; a statement run outside such a block is committed on its own
+
+Readers only see committed changes, from their own connections, so the database must be
+a file rather than `:memory:`.
+"""
+
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from pathlib import Path
+from types import TracebackType
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from sqlite_pool import DEFAULT_PRAGMAS, ConnectionPool, apply_pragmas
+
+T = TypeVar("T")
+Parameters = Union[Sequence[Any], Mapping[str, Any]]
+RowFactory = Optional[Callable[[sqlite3.Cursor, Any], Any]]
+
+DEFAULT_READERS = 4
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Result(NamedTuple):
+    """The outcome of a statement."""
+
+    rows: List[Any]
+    rowcount: int
+    lastrowid: Optional[int]
+
+
+def _execute(conn: sqlite3.Connection, sql: str, parameters: Parameters) -> Result:
+    cursor = conn.execute(sql, parameters)
+    try:
+        return Result(cursor.fetchall(), cursor.rowcount, cursor.lastrowid)
+    finally:
+        cursor.close()
+
+
+def _executemany(
+    conn: sqlite3.Connection, sql: str, seq_of_parameters: Iterable[Parameters]
+) -> Result:
+    cursor = conn.executemany(sql, seq_of_parameters)
+    try:
+        return Result([], cursor.rowcount, cursor.lastrowid)
+    finally:
+        cursor.close()
+
+
+def _executescript(conn: sqlite3.Connection, script: str) -> Result:
+    conn.executescript(script).close()
+    return Result([], -1, None)
+
+
+def _committed(conn: sqlite3.Connection, func: Callable[..., T], *args: Any) -> T:
+    """Call `func` in a transaction of its own."""
+    with conn:
+        return func(conn, *args)
+
+
+class Transaction:
+    """Statements run in a transaction on the writer connection."""
+
+    def __init__(self, database: "AsyncDatabase") -> None:
+        self._database = database
+
+    async def execute(self, sql: str, parameters: Parameters = ()) -> Result:
+        """Run one statement."""
+        return await self._database._write(_execute, sql, parameters)
+
+    async def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Parameters]
+    ) -> Result:
+        """Run one statement for each set of parameters."""
+        return await self._database._write(_executemany, sql, seq_of_parameters)
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether there are uncommitted changes."""
+        writer = self._database._writer
+        return writer is not None and writer.in_transaction
+
+
+class AsyncDatabase:
+    """Run statements on a SQLite database in worker threads.
+
+    `connect_kwargs` are passed to `sqlite3.connect()`, and `pragmas` are applied to
+    every connection.
+    """
+
+    def __init__(
+        self,
+        database: Union[str, Path],
+        readers: int = DEFAULT_READERS,
+        pragmas: Mapping[str, Union[str, int]] = DEFAULT_PRAGMAS,
+        row_factory: RowFactory = None,
+        **connect_kwargs: Any,
+    ) -> None:
+        self.database = database
+        self.pragmas = dict(pragmas)
+        self.row_factory = row_factory
+        self.connect_kwargs = connect_kwargs
+        # Created in the writer thread, when first needed.
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_executor = ThreadPoolExecutor(1, thread_name_prefix="sqlite-writer")
+        self._read_executor = ThreadPoolExecutor(
+            readers, thread_name_prefix="sqlite-reader"
+        )
+        self._pool = ConnectionPool(database, readers, pragmas, **connect_kwargs)
+        # Created when first needed, in the event loop that uses it.
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    def _lock(self) -> asyncio.Lock:
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    def _connect(self, **kwargs: Any) -> sqlite3.Connection:
+        conn: sqlite3.Connection = sqlite3.connect(
+            self.database, **self.connect_kwargs, **kwargs
+        )
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def _call_writer(self, func: Callable[..., T], *args: Any) -> T:
+        if self._writer is None:
+            self._writer = self._connect(check_same_thread=False)
+        self._writer.row_factory = self.row_factory
+        return func(self._writer, *args)
+
+    async def _write(self, func: Callable[..., T], *args: Any) -> T:
+        """Call `func(writer connection, *args)` in the writer thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._write_executor, partial(self._call_writer, func, *args)
+        )
+
+    def _call_reader(self, func: Callable[..., T], *args: Any) -> T:
+        with self._pool.connection() as conn:
+            conn.row_factory = self.row_factory
+            return func(conn, *args)
+
+    async def _read(self, func: Callable[..., T], *args: Any) -> T:
+        """Call `func(reader connection, *args)` in a reader thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._read_executor, partial(self._call_reader, func, *args)
+        )
+
+    async def execute(self, sql: str, parameters: Parameters = ()) -> Result:
+        """Run one statement on the writer connection, and commit it.
+
+        If the statement fails, its changes are rolled back.
+        """
+        async with self._lock():
+            return await self._write(_committed, _execute, sql, parameters)
+
+    async def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Parameters]
+    ) -> Result:
+        """Run one statement for each set of parameters, and commit them together."""
+        async with self._lock():
+            return await self._write(_committed, _executemany, sql, seq_of_parameters)
+
+    async def executescript(self, script: str) -> None:
+        """Run an SQL script, e.g. to create a schema, on the writer connection."""
+        async with self._lock():
+            await self._write(_executescript, script)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Transaction]:
+        """Run the statements of a `with` block in one transaction.
+
+        Other writes wait until the transaction is committed, at the end of the block,
+        or rolled back, if the block raises an exception, or if committing fails, e.g.
+        on a deferred foreign key violation. Inside the block, use the methods of the
+        `Transaction`: those of the database would wait too.
+        """
+        async with self._lock():
+            try:
+                yield Transaction(self)
+                await self._write(sqlite3.Connection.commit)
+            except BaseException:
+                await self._write(sqlite3.Connection.rollback)
+                raise
+
+    async def fetchall(self, sql: str, parameters: Parameters = ()) -> List[Any]:
+        """Run a query on a reader connection, and return all its rows."""
+        return (await self._read(_execute, sql, parameters)).rows
+
+    async def fetchone(self, sql: str, parameters: Parameters = ()) -> Any:
+        """Run a query on a reader connection, and return its first row, or `None`."""
+        rows = await self.fetchall(sql, parameters)
+        return rows[0] if rows else None
+
+    async def query(
+        self,
+        sql: str,
+        parameters: Parameters = (),
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> AsyncIterator[Any]:
+        """Run a query on a connection of its own, and iterate over its rows.
+
+        Rows are fetched `batch_size` at a time, in a thread of their own. The
+        connection and the thread are held until iteration ends: taking them from the
+        readers would leave none for reads made while iterating, which would then wait
+        forever for the iterations to end.
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(1, thread_name_prefix="sqlite-query")
+
+        def run(func: Callable[..., T], *args: Any) -> "asyncio.Future[T]":
+            return loop.run_in_executor(executor, partial(func, *args))
+
+        try:
+            conn = await run(self._connect)
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        try:
+            conn.row_factory = self.row_factory
+            cursor = await run(conn.execute, sql, parameters)
+            try:
+                while True:
+                    rows = await run(cursor.fetchmany, batch_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield row
+            finally:
+                await run(cursor.close)
+        finally:
+            try:
+                await run(conn.close)
+            finally:
+                executor.shutdown(wait=False)
+
+    def _shutdown(self) -> None:
+        self._write_executor.shutdown()
+        self._read_executor.shutdown()
+        self._pool.close()
+
+    async def close(self) -> None:
+        """Wait for running statements, then close all connections.
+
+        An open transaction is rolled back.
+        """
+        async with self._lock():
+            if self._writer is not None:
+                await self._write(sqlite3.Connection.close)
+        await asyncio.get_running_loop().run_in_executor(None, self._shutdown)
+
+    async def __aenter__(self) -> "AsyncDatabase":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.close()
@@ -0,0 +1,206 @@
+"""Using SQLite from `asyncio` code with `sqlite_async`."""
+
+import asyncio
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from sqlite_async import AsyncDatabase
+from sqlite_pool import INSERT_QUERY, TASKS_SCHEMA, generate_tasks
+
+
+@pytest.fixture(name="db_path")
+def fixture_db_path(tmp_path: Path) -> Path:
+    """Return the path of a database to create."""
+    return tmp_path.joinpath("tasks.db")
+
+
+async def create(db_path: Path) -> AsyncDatabase:
+    """Open a database with an empty `tasks` table."""
+    db = AsyncDatabase(db_path, readers=2)
+    await db.executescript(TASKS_SCHEMA)
+    return db
+
+
+def test_execute_commit(db_path: Path) -> None:
+    """A statement outside a transaction is committed on its own."""
+
+    async def run() -> None:
+        async with await create(db_path) as db:
+            result = await db.execute(
+                "insert into tasks (details, deadline) values (?, ?);",
+                ("Task 1", "2020-07-11"),
+            )
+            assert (result.rowcount, result.lastrowid) == (1, 1)
+
+            # Committed: visible from reader connections.
+            assert await db.fetchone("select * from tasks;") == (
+                1,
+                1,
+                "Task 1",
+                "2020-07-11",
+            )
+
+            with pytest.raises(sqlite3.OperationalError):
+                await db.execute("insert into tasks (nothing) values (1)")
+
+    asyncio.run(run())
+
+
+def test_transaction_commit(db_path: Path) -> None:
+    """Statements in a transaction are committed at the end of the block."""
+
+    async def run() -> None:
+        async with await create(db_path) as db:
+            async with db.transaction() as transaction:
+                await transaction.execute(
+                    "insert into tasks (details, deadline) values (:det, :dline);",
+                    {"det": "Task 1", "dline": "2020-07-11"},
+                )
+                await transaction.executemany(INSERT_QUERY, generate_tasks(2))
+                # Still in transaction, not committed yet.
+                assert transaction.in_transaction
+                assert await db.fetchall("select * from tasks") == []
+
+                # Changes are visible in the transaction.
+                result = await transaction.execute("select count(*) from tasks")
+                assert result.rows == [(3,)]
+
+            assert not transaction.in_transaction
+            assert await db.fetchone("select count(*) from tasks") == (3,)
+
+    asyncio.run(run())
+
+
+def test_transaction_rollback(db_path: Path) -> None:
+    """Statements in a transaction are rolled back if the block raises."""
+
+    async def run() -> None:
+        async with await create(db_path) as db:
+            with pytest.raises(RuntimeError):
+                async with db.transaction() as transaction:
+                    await transaction.execute(
+                        "insert into tasks (details, deadline) values (?, ?);",
+                        ("Task 1", "2020-07-11"),
+                    )
+                    assert transaction.in_transaction
+                    raise RuntimeError
+
+            assert not transaction.in_transaction
+            assert await db.fetchone("select * from tasks") is None
+
+    asyncio.run(run())
+
+
+def test_transaction_commit_error(db_path: Path) -> None:
+    """A transaction is rolled back if it cannot be committed."""
+
+    async def run() -> None:
+        async with AsyncDatabase(
+            db_path, pragmas={"foreign_keys": "on"}, readers=1
+        ) as db:
+            await db.executescript(
+                """
+                create table parents (id integer primary key);
+                create table children (
+                    id integer primary key,
+                    parent_id integer references parents (id)
+                        deferrable initially deferred
+                );
+                """
+            )
+            with pytest.raises(sqlite3.IntegrityError):
+                async with db.transaction() as transaction:
+                    await transaction.execute(
+                        "insert into children (parent_id) values (1)"
+                    )
+
+            assert not transaction.in_transaction
+            await db.execute("insert into parents (id) values (2)")
+            assert await db.fetchall("select * from children") == []
+            assert await db.fetchall("select * from parents") == [(2,)]
+
+    asyncio.run(run())
+
+
+def test_query(db_path: Path) -> None:
+    """Iterate over the rows of a query, fetched in batches."""
+
+    async def run() -> None:
+        async with await create(db_path) as db:
+            await db.executemany(INSERT_QUERY, generate_tasks(25))
+            db.row_factory = sqlite3.Row
+
+            details = [
+                row["details"]
+                async for row in db.query(
+                    "select * from tasks where priority > ? order by id",
+                    (0,),
+                    batch_size=10,
+                )
+            ]
+            assert details == [f"Task {i + 1}" for i in range(25)]
+
+            # Stopping early releases the connection.
+            for _ in range(3):
+                async for _ in db.query("select * from tasks"):
+                    break
+            assert tuple(await db.fetchone("select count(*) from tasks")) == (25,)
+
+    asyncio.run(run())
+
+
+def test_query_nested_reads(db_path: Path) -> None:
+    """Read while iterating over queries, as many as there are readers."""
+
+    async def run() -> None:
+        async with await create(db_path) as db:
+            await db.executemany(INSERT_QUERY, generate_tasks(5))
+
+            async def iterate() -> int:
+                count = 0
+                async for row in db.query("select id from tasks", batch_size=1):
+                    await db.fetchone("select * from tasks where id = ?", row)
+                    count += 1
+                return count
+
+            counts = await asyncio.wait_for(
+                asyncio.gather(*[iterate() for _ in range(3)]), 20
+            )
+            assert counts == [5, 5, 5]
+
+    asyncio.run(run())
+
+
+def test_concurrency(db_path: Path) -> None:
+    """Concurrent readers and writers do not block the event loop."""
+
+    async def run() -> None:
+        async with await create(db_path) as db:
+            ticks = 0
+            done = False
+
+            async def tick() -> None:
+                nonlocal ticks
+                while not done:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            async def write(seed: int) -> None:
+                for task in generate_tasks(20, seed):
+                    await db.execute(INSERT_QUERY, task)
+
+            async def read() -> None:
+                for _ in range(20):
+                    await db.fetchall("select * from tasks")
+
+            ticker = asyncio.ensure_future(tick())
+            await asyncio.gather(write(0), write(1), read(), read(), read())
+            done = True
+            await ticker
+
+            assert ticks > 0
+            assert await db.fetchone("select count(*) from tasks") == (40,)
+
+    asyncio.run(run())
@@ -0,0 +1,196 @@
+"""Load many rows into a SQLite table quickly.
+
+Each committed transaction is written to disk, so committing after every row makes
+loading bound by disk syncs. A single `executemany()` in one transaction is much
+faster, but needs all rows loaded before anything is committed, and a failure loses
+everything. `bulk_insert()` streams rows from any iterable, and commits them in
+batches of a configurable size.
+
+Every index on a table is updated for each inserted row. Dropping the indexes before
+a large load, and creating them again afterwards, builds each index in one pass over
+the sorted data instead.
+
+Run as a script to compare with a commit per row and with a single `executemany()`:
+
+    python sqlite_bulk_load.py --rows 1000000
+"""
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Sequence
+
+from sqlite_pool import INSERT_QUERY, Task, create_tasks_schema, generate_tasks
+
+DEFAULT_BATCH_SIZE = 50_000
+TASK_COLUMNS = ("priority", "details", "deadline")
+
+
+class LoadStats(NamedTuple):
+    """The result of a load."""
+
+    rows: int
+    batches: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        """The number of rows loaded per second."""
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name for use in an SQL statement."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def drop_indexes(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Drop the indexes of `table`, and return the SQL statements to create them again.
+
+    Unique indexes are kept, whether created for `primary key` and `unique`
+    constraints, which cannot be dropped, or with `create unique index`: without them,
+    duplicate rows would be inserted, and the index could not be created again.
+    """
+    unique = {
+        row[1]
+        for row in conn.execute(f"pragma index_list({quote_identifier(table)})")
+        if row[2]
+    }
+    rows = [
+        (name, sql)
+        for name, sql in conn.execute(
+            "select name, sql from sqlite_master"
+            " where type = 'index' and tbl_name = ? and sql is not null",
+            (table,),
+        )
+        if name not in unique
+    ]
+    with conn:
+        for name, _ in rows:
+            conn.execute(f"drop index {quote_identifier(name)}")
+    return [sql for _, sql in rows]
+
+
+def create_indexes(conn: sqlite3.Connection, statements: Iterable[str]) -> None:
+    """Create indexes from the statements returned by `drop_indexes()`."""
+    with conn:
+        for statement in statements:
+            conn.execute(statement)
+
+
+def bulk_insert(
+    conn: sqlite3.Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    rebuild_indexes: bool = False,
+) -> LoadStats:
+    """Insert `rows` into `columns` of `table`, committing every `batch_size` rows.
+
+    With `rebuild_indexes`, the indexes of `table` are dropped before the load and
+    created again afterwards, even if the load fails. If it fails, the batches already
+    committed stay committed.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+
+    statement = (
+        f"insert into {quote_identifier(table)}"
+        f" ({', '.join(map(quote_identifier, columns))})"
+        f" values ({', '.join('?' * len(columns))})"
+    )
+    start = time.perf_counter()
+    index_statements = drop_indexes(conn, table) if rebuild_indexes else []
+    loaded = batches = 0
+    try:
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            with conn:
+                conn.executemany(statement, batch)
+            loaded += len(batch)
+            batches += 1
+    finally:
+        create_indexes(conn, index_statements)
+
+    return LoadStats(loaded, batches, time.perf_counter() - start)
+
+
+def load_tasks(
+    conn: sqlite3.Connection, tasks: Iterable[Task], **kwargs: Any
+) -> LoadStats:
+    """Insert `(priority, details, deadline)` `tasks` into the `tasks` table.
+
+    `kwargs` are passed to `bulk_insert()`.
+    """
+    return bulk_insert(conn, "tasks", TASK_COLUMNS, tasks, **kwargs)
+
+
+def _load_per_row(conn: sqlite3.Connection, rows: int) -> None:
+    for task in generate_tasks(rows):
+        conn.execute(INSERT_QUERY, task)
+        conn.commit()
+
+
+def _load_executemany(conn: sqlite3.Connection, rows: int) -> None:
+    with conn:
+        conn.executemany(INSERT_QUERY, generate_tasks(rows))
+
+
+def _load_bulk(conn: sqlite3.Connection, rows: int) -> None:
+    load_tasks(conn, generate_tasks(rows), rebuild_indexes=True)
+
+
+def benchmark(rows: int, per_row_limit: int = 10_000) -> Dict[str, float]:
+    """Load `rows` tasks into a `tasks` table with an index on `deadline`.
+
+    Report the rows per second for a commit per row (limited to `per_row_limit` rows,
+    as it is very slow), a single `executemany()`, and `bulk_insert()`.
+    """
+    loaders = [
+        ("execute + commit per row", _load_per_row, min(rows, per_row_limit)),
+        ("executemany", _load_executemany, rows),
+        ("bulk_insert", _load_bulk, rows),
+    ]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, (name, load, count) in enumerate(loaders):
+            conn = sqlite3.connect(Path(tmp_dir).joinpath(f"tasks{i}.db"))
+            try:
+                create_tasks_schema(conn)
+                with conn:
+                    conn.execute("create index tasks_deadline on tasks (deadline)")
+
+                start = time.perf_counter()
+                load(conn, count)
+                seconds = time.perf_counter() - start
+
+                if conn.execute("select count(*) from tasks").fetchone() != (count,):
+                    raise AssertionError(f"{name}: rows missing")
+            finally:
+                conn.close()
+            results[name] = count / seconds
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="sqlite_bulk_load", description="Compare ways to load the tasks table"
+    )
+    parser.add_argument("-r", "--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    for name, rows_per_second in benchmark(args.rows).items():
+        print(f"{name}: {rows_per_second:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Loading many rows into SQLite with `sqlite_bulk_load`."""
+
+import sqlite3
+from typing import Generator, Iterator, List
+
+import pytest
+
+from sqlite_bulk_load import benchmark, bulk_insert, load_tasks
+from sqlite_pool import Task, create_tasks_schema, generate_tasks
+
+
+@pytest.fixture(name="conn")
+def fixture_conn() -> Generator[sqlite3.Connection, None, None]:
+    """Connect to an in-memory database with an indexed `tasks` table."""
+    conn = sqlite3.connect(":memory:")
+    create_tasks_schema(conn)
+    with conn:
+        conn.execute("create index tasks_deadline on tasks (deadline)")
+
+    yield conn
+
+    conn.close()
+
+
+def index_names(conn: sqlite3.Connection) -> List[str]:
+    """Return the names of the indexes in the database."""
+    return [
+        name
+        for name, in conn.execute(
+            "select name from sqlite_master where type = 'index' order by name"
+        )
+    ]
+
+
+def test_load_tasks(conn: sqlite3.Connection) -> None:
+    """Load rows in batches, each committed in its own transaction."""
+    stats = load_tasks(conn, generate_tasks(1050), batch_size=100)
+
+    assert (stats.rows, stats.batches) == (1050, 11)
+    assert stats.rows_per_second > 0
+    assert not conn.in_transaction
+    assert conn.execute("select count(*), max(id) from tasks").fetchone() == (
+        1050,
+        1050,
+    )
+    assert conn.execute("select * from tasks where id = 1").fetchone() == (
+        1,
+        *next(generate_tasks(1)),
+    )
+
+
+def test_rebuild_indexes(conn: sqlite3.Connection) -> None:
+    """Indexes are dropped during the load, and created again afterwards."""
+    assert index_names(conn) == ["tasks_deadline"]
+
+    def tasks() -> Iterator[Task]:
+        assert index_names(conn) == []
+        yield from generate_tasks(10)
+
+    load_tasks(conn, tasks(), rebuild_indexes=True)
+
+    assert index_names(conn) == ["tasks_deadline"]
+    plan = conn.execute(
+        "explain query plan select * from tasks where deadline = '2020-01-01'"
+    ).fetchall()
+    assert "tasks_deadline" in plan[0][-1]
+
+
+def test_failed_load(conn: sqlite3.Connection) -> None:
+    """Batches committed before a failure are kept, and indexes are rebuilt."""
+    rows = [(1, "Task", "2020-01-01")] * 5 + [(1, "Task")]
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        load_tasks(conn, rows, batch_size=5, rebuild_indexes=True)
+
+    assert conn.execute("select count(*) from tasks").fetchone() == (5,)
+    assert index_names(conn) == ["tasks_deadline"]
+
+
+def test_unique_index() -> None:
+    """Unique indexes are kept during the load, and reject duplicates."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("create table t (a)")
+        conn.execute("create unique index t_a on t (a)")
+
+        with pytest.raises(sqlite3.IntegrityError):
+            bulk_insert(conn, "t", ["a"], [(1,), (1,)], rebuild_indexes=True)
+
+        assert conn.execute("select count(*) from t").fetchone() == (0,)
+        assert conn.execute("pragma index_list(t)").fetchall()[0][1:3] == ("t_a", 1)
+    finally:
+        conn.close()
+
+
+def test_quoted_names() -> None:
+    """Table and column names are quoted."""
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute('create table "order items" ("item ""type""", "order")')
+        stats = bulk_insert(conn, "order items", ['item "type"', "order"], [("a", 1)])
+
+        assert stats.rows == 1
+        assert conn.execute('select * from "order items"').fetchall() == [("a", 1)]
+    finally:
+        conn.close()
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few rows."""
+    results = benchmark(200, per_row_limit=20)
+
+    assert set(results) == {"execute + commit per row", "executemany", "bulk_insert"}
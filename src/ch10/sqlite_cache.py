@@ -0,0 +1,325 @@
+"""Cache the results of SQLite queries, and drop them when their tables change.
+
+Dashboards run the same queries, e.g. `select * from tasks order by priority`, over
+and over, while the tables they read rarely change. `QueryCache` keeps the rows of
+queries, keyed on their SQL and parameters, in front of a connection:
+
+- the tables a statement reads and writes are found once per SQL string, with an
+  authorizer callback (`Connection.set_authorizer()`), which SQLite calls for each
+  table and column while preparing the statement; this covers views, subqueries,
+  triggers and foreign key actions, without parsing SQL
+- statements run through the cache drop the cached results of the tables they write;
+  schema changes drop everything
+- commits by other connections are detected with `pragma data_version`, and drop
+  everything
+- results are not cached while the connection is in a transaction, since a rollback
+  would make them stale, nor if they have more than `max_rows` rows
+- the least recently used results are evicted beyond `maxsize` queries
+
+Run as a script to compare with uncached queries:
+
+    python sqlite_cache.py --rows 10000 --queries 10000
+"""
+
+import argparse
+import sqlite3
+import time
+from collections import OrderedDict
+from itertools import chain
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from sqlite_bulk_load import load_tasks
+from sqlite_pool import INSERT_QUERY, create_tasks_schema, generate_tasks
+
+Parameters = Union[Sequence[Any], Mapping[str, Any]]
+Key = Tuple[str, Hashable]
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_MAX_ROWS = 100_000
+
+_WRITE_ACTIONS = {sqlite3.SQLITE_INSERT, sqlite3.SQLITE_UPDATE, sqlite3.SQLITE_DELETE}
+# Actions that neither write rows nor change the schema.
+_OTHER_ACTIONS = {
+    sqlite3.SQLITE_READ,
+    sqlite3.SQLITE_SELECT,
+    sqlite3.SQLITE_FUNCTION,
+    sqlite3.SQLITE_RECURSIVE,
+    sqlite3.SQLITE_TRANSACTION,
+    sqlite3.SQLITE_SAVEPOINT,
+}
+
+
+class CacheStats(NamedTuple):
+    """The counters of a `QueryCache`."""
+
+    hits: int
+    misses: int
+    evictions: int
+    invalidations: int
+    size: int
+
+
+class Tables(NamedTuple):
+    """The tables a statement reads and writes."""
+
+    reads: FrozenSet[str]
+    writes: FrozenSet[str]
+    changes_schema: bool
+
+
+def _key(sql: str, parameters: Parameters) -> Key:
+    # With their types: `1`, `1.0` and `True` are equal, but give different results,
+    # e.g. `select ? / 2` or `select typeof(?)`.
+    if isinstance(parameters, Mapping):
+        return sql, tuple(
+            (name, type(value), value) for name, value in sorted(parameters.items())
+        )
+    return sql, tuple((type(value), value) for value in parameters)
+
+
+class QueryCache:
+    """Run statements on `conn`, caching the rows returned by queries.
+
+    The cache installs its own authorizer on `conn`. Writes made on `conn` without
+    going through the cache are not detected: call `invalidate()` after them. Rows are
+    returned as built by the row factory of `conn`, shared between calls.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        maxsize: int = DEFAULT_MAXSIZE,
+        max_rows: int = DEFAULT_MAX_ROWS,
+    ) -> None:
+        self.conn = conn
+        self.maxsize = maxsize
+        self.max_rows = max_rows
+        # The rows of each query, and the tables it reads.
+        self._results: "OrderedDict[Key, Tuple[Tuple[Any, ...], FrozenSet[str]]]" = (
+            OrderedDict()
+        )
+        self._keys_by_table: Dict[str, Set[Key]] = {}
+        self._tables: Dict[str, Tables] = {}
+        self._recording: Optional[List[Tuple[int, Optional[str]]]] = None
+        self._data_version = self._read_data_version()
+        self._hits = self._misses = self._evictions = self._invalidations = 0
+        conn.set_authorizer(self._authorize)
+
+    def _authorize(
+        self,
+        action: int,
+        arg1: Optional[str],
+        arg2: Optional[str],
+        database: Optional[str],
+        trigger: Optional[str],
+    ) -> int:
+        if self._recording is not None:
+            self._recording.append((action, arg1))
+        return sqlite3.SQLITE_OK
+
+    def tables(self, sql: str, parameters: Parameters = ()) -> Tables:
+        """Return the tables read and written by `sql`."""
+        tables = self._tables.get(sql)
+        if tables is None:
+            # Preparing `explain` compiles the statement, calling the authorizer,
+            # without running it.
+            self._recording = []
+            try:
+                self.conn.execute(f"explain {sql}", parameters).close()
+                actions = self._recording
+            finally:
+                self._recording = None
+            tables = self._tables[sql] = Tables(
+                frozenset(
+                    name.lower()
+                    for action, name in actions
+                    if action == sqlite3.SQLITE_READ and name
+                ),
+                frozenset(
+                    name.lower()
+                    for action, name in actions
+                    if action in _WRITE_ACTIONS and name
+                ),
+                any(
+                    action not in _WRITE_ACTIONS and action not in _OTHER_ACTIONS
+                    for action, _ in actions
+                ),
+            )
+        return tables
+
+    def _read_data_version(self) -> int:
+        version: int = self.conn.execute("pragma data_version").fetchone()[0]
+        return version
+
+    def fetchall(self, sql: str, parameters: Parameters = ()) -> List[Any]:
+        """Return all the rows of a query, from the cache if possible.
+
+        Statements that write are run with `execute()`, and not cached.
+        """
+        data_version = self._read_data_version()
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self.invalidate()
+
+        key = _key(sql, parameters)
+        cached = self._results.get(key)
+        if cached is not None:
+            self._results.move_to_end(key)
+            self._hits += 1
+            return list(cached[0])
+
+        self._misses += 1
+        tables = self.tables(sql, parameters)
+        if tables.writes or tables.changes_schema:
+            return self.execute(sql, parameters).fetchall()
+
+        result = self.conn.execute(sql, parameters).fetchall()
+        if not self.conn.in_transaction and len(result) <= self.max_rows:
+            self._store(key, tuple(result), tables.reads)
+        return result
+
+    def _store(self, key: Key, rows: Tuple[Any, ...], tables: FrozenSet[str]) -> None:
+        self._results[key] = rows, tables
+        for table in tables:
+            self._keys_by_table.setdefault(table, set()).add(key)
+        while len(self._results) > self.maxsize:
+            self._discard(next(iter(self._results)))
+            self._evictions += 1
+
+    def _discard(self, key: Key) -> None:
+        _, tables = self._results.pop(key)
+        for table in tables:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def execute(self, sql: str, parameters: Parameters = ()) -> sqlite3.Cursor:
+        """Run a statement, dropping the cached results of the tables it writes."""
+        tables = self.tables(sql, parameters)
+        cursor = self.conn.execute(sql, parameters)
+        self._invalidate_for(tables)
+        return cursor
+
+    def executemany(
+        self, sql: str, seq_of_parameters: Iterable[Parameters]
+    ) -> sqlite3.Cursor:
+        """Run a statement for each set of parameters, then drop cached results."""
+        seq_of_parameters = iter(seq_of_parameters)
+        first = next(seq_of_parameters, None)
+        if first is None:
+            return self.conn.cursor()
+        tables = self.tables(sql, first)
+        cursor = self.conn.executemany(sql, chain([first], seq_of_parameters))
+        self._invalidate_for(tables)
+        return cursor
+
+    def _invalidate_for(self, tables: Tables) -> None:
+        if tables.changes_schema:
+            # The SQL strings might now refer to other tables, or not compile.
+            self._tables.clear()
+            self.invalidate()
+        elif tables.writes:
+            self.invalidate(tables.writes)
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> None:
+        """Drop the cached results reading `tables`, or all results."""
+        if tables is None:
+            self._invalidations += len(self._results)
+            self._results.clear()
+            self._keys_by_table.clear()
+            return
+        for table in tables:
+            for key in self._keys_by_table.pop(table.lower(), ()):
+                if key in self._results:
+                    self._discard(key)
+                    self._invalidations += 1
+
+    def stats(self) -> CacheStats:
+        """Return the counters of the cache."""
+        return CacheStats(
+            self._hits,
+            self._misses,
+            self._evictions,
+            self._invalidations,
+            len(self._results),
+        )
+
+
+DASHBOARD_QUERIES = (
+    "select * from tasks order by priority",
+    "select priority, count(*) from tasks group by priority",
+    "select * from tasks where deadline < ? order by deadline limit 10",
+)
+
+
+def benchmark(rows: int, queries: int, write_every: int = 100) -> Dict[str, Any]:
+    """Run dashboard queries on `rows` tasks, writing a task every `write_every`.
+
+    Report the queries per second, with and without the cache, and the cache counters.
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        create_tasks_schema(conn)
+        load_tasks(conn, generate_tasks(rows))
+        tasks = generate_tasks(queries)
+        parameters: List[Sequence[Any]] = [(), (), ("2020-07-15",)]
+
+        start = time.perf_counter()
+        for i in range(queries):
+            if i % write_every == 0:
+                with conn:
+                    conn.execute(INSERT_QUERY, next(tasks))
+            query = i % len(DASHBOARD_QUERIES)
+            conn.execute(DASHBOARD_QUERIES[query], parameters[query]).fetchall()
+        results: Dict[str, Any] = {
+            "uncached": queries / (time.perf_counter() - start)
+        }
+
+        cache = QueryCache(conn)
+        start = time.perf_counter()
+        for i in range(queries):
+            if i % write_every == 0:
+                with conn:
+                    cache.execute(INSERT_QUERY, next(tasks))
+            query = i % len(DASHBOARD_QUERIES)
+            cache.fetchall(DASHBOARD_QUERIES[query], parameters[query])
+        results["cached"] = queries / (time.perf_counter() - start)
+        results["stats"] = cache.stats()
+    finally:
+        conn.close()
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="sqlite_cache", description="Compare cached and uncached queries"
+    )
+    parser.add_argument("-r", "--rows", type=int, default=10_000)
+    parser.add_argument("-q", "--queries", type=int, default=10_000)
+    parser.add_argument("-w", "--write-every", type=int, default=100)
+    args = parser.parse_args()
+
+    results = benchmark(args.rows, args.queries, args.write_every)
+    print(f"uncached: {results['uncached']:.0f} queries/s")
+    print(f"cached: {results['cached']:.0f} queries/s")
+    print(results["stats"])
+
+
+if __name__ == "__main__":
+    main()
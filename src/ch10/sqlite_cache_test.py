@@ -0,0 +1,157 @@
+"""Caching SQLite query results with `sqlite_cache`."""
+
+import sqlite3
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+from sqlite_cache import CacheStats, QueryCache, Tables, benchmark
+from sqlite_pool import INSERT_QUERY, create_tasks_schema, generate_tasks
+
+
+@pytest.fixture(name="conn")
+def fixture_conn(tmp_path: Path) -> Generator[sqlite3.Connection, None, None]:
+    """Connect to a database with tasks, a log of new tasks, and a view."""
+    conn = sqlite3.connect(tmp_path.joinpath("tasks.db"))
+    create_tasks_schema(conn)
+    with conn:
+        conn.executemany(INSERT_QUERY, generate_tasks(3))
+        conn.executescript(
+            """
+            create table log (task_id integer);
+            create trigger log_task after insert on tasks
+            begin
+                insert into log values (new.id);
+            end;
+            create view urgent as select * from tasks where priority > 1;
+            """
+        )
+
+    yield conn
+
+    conn.close()
+
+
+def test_tables(conn: sqlite3.Connection) -> None:
+    """Find the tables of statements, through views and triggers."""
+    cache = QueryCache(conn)
+
+    assert cache.tables("select * from urgent") == Tables(
+        frozenset({"tasks", "urgent"}), frozenset(), False
+    )
+    assert cache.tables(INSERT_QUERY, (1, "Task", "2020-07-11")) == Tables(
+        frozenset({"tasks"}), frozenset({"tasks", "log"}), False
+    )
+    assert cache.tables("create index tasks_priority on tasks (priority)")[2]
+    # Not run.
+    query = "select * from sqlite_master where name = 'tasks_priority'"
+    assert conn.execute(query).fetchone() is None
+
+
+def test_hits_and_invalidation(conn: sqlite3.Connection) -> None:
+    """Writes drop the results of the tables they touch, and only those."""
+    cache = QueryCache(conn)
+    query = "select id from tasks where priority >= ? order by id"
+
+    assert cache.fetchall(query, (1,)) == [(1,), (2,), (3,)]
+    assert cache.fetchall(query, (1,)) == [(1,), (2,), (3,)]
+    assert cache.fetchall(query, (2,)) == conn.execute(query, (2,)).fetchall()
+    assert cache.fetchall("select * from log") == []
+    assert cache.stats() == CacheStats(1, 3, 0, 0, 3)
+
+    # Returned lists can be changed without changing the cache.
+    cache.fetchall(query, (1,)).clear()
+    assert cache.fetchall(query, (1,)) == [(1,), (2,), (3,)]
+
+    with conn:
+        cache.execute("update tasks set priority = 1")
+    assert cache.stats().invalidations == 2
+    assert cache.fetchall("select count(*) from log") == [(0,)]
+    assert cache.stats().misses == 4
+
+    # The trigger writes to `log` too.
+    with conn:
+        cache.executemany(INSERT_QUERY, generate_tasks(2, seed=1))
+    assert cache.fetchall("select count(*) from log") == [(2,)]
+    assert cache.fetchall(query, (1,)) == [(i,) for i in range(1, 6)]
+
+
+def test_parameter_types(conn: sqlite3.Connection) -> None:
+    """Equal parameters of different types are cached separately."""
+    cache = QueryCache(conn)
+    query = "select typeof(?), ? / 2"
+
+    assert cache.fetchall(query, (1, 1)) == [("integer", 0)]
+    assert cache.fetchall(query, (1.0, 1.0)) == [("real", 0.5)]
+    assert cache.fetchall(query, (True, True)) == [("integer", 0)]
+    assert cache.fetchall("select typeof(:value)", {"value": 1.0}) == [("real",)]
+    assert cache.fetchall("select typeof(:value)", {"value": 1}) == [("integer",)]
+    assert cache.stats().hits == 0
+
+
+def test_transactions(conn: sqlite3.Connection) -> None:
+    """Results read in a transaction are not cached, as it may be rolled back."""
+    cache = QueryCache(conn)
+    cache.execute("delete from tasks")
+    assert conn.in_transaction
+    assert cache.fetchall("select count(*) from tasks") == [(0,)]
+
+    conn.rollback()
+    assert cache.fetchall("select count(*) from tasks") == [(3,)]
+    assert cache.stats().size == 1
+
+
+def test_other_connections(conn: sqlite3.Connection, tmp_path: Path) -> None:
+    """Commits by other connections drop all results."""
+    cache = QueryCache(conn)
+    assert cache.fetchall("select count(*) from tasks") == [(3,)]
+
+    other = sqlite3.connect(tmp_path.joinpath("tasks.db"))
+    try:
+        with other:
+            other.execute("delete from tasks")
+    finally:
+        other.close()
+
+    assert cache.fetchall("select count(*) from tasks") == [(0,)]
+
+
+def test_schema_change(conn: sqlite3.Connection) -> None:
+    """Schema changes drop all results."""
+    cache = QueryCache(conn)
+    cache.fetchall("select * from tasks")
+    cache.fetchall("select * from log")
+
+    cache.execute("drop view urgent")
+    assert cache.stats().size == 0
+
+
+def test_eviction(conn: sqlite3.Connection) -> None:
+    """Evict the least recently used results, and skip large ones."""
+    cache = QueryCache(conn, maxsize=2, max_rows=2)
+    query = "select id from tasks where id = ?"
+
+    cache.fetchall(query, (1,))
+    cache.fetchall(query, (2,))
+    cache.fetchall(query, (1,))
+    cache.fetchall(query, (3,))
+    assert cache.stats() == CacheStats(1, 3, 1, 0, 2)
+    cache.fetchall(query, (1,))
+    assert cache.stats().hits == 2
+
+    cache.fetchall("select * from tasks")
+    assert cache.stats().size == 2
+
+    # Evicted results are not counted as invalidated.
+    with conn:
+        cache.execute("delete from tasks where id = 2")
+    assert cache.stats() == CacheStats(2, 4, 1, 2, 0)
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few rows."""
+    results = benchmark(100, 100, write_every=10)
+
+    assert set(results) == {"uncached", "cached", "stats"}
+    assert results["stats"].hits > results["stats"].misses
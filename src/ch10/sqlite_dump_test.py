@@ -0,0 +1,158 @@
+"""Dumping, restoring and backing up SQLite databases with `sqlite_dump`."""
+
+import sqlite3
+from pathlib import Path
+from typing import Generator, List, Tuple
+
+import pytest
+
+from sqlite_bulk_load import load_tasks
+from sqlite_dump import backup, benchmark, dump, restore
+from sqlite_pool import create_tasks_schema, generate_tasks
+
+
+@pytest.fixture(name="source")
+def fixture_source(tmp_path: Path) -> Generator[sqlite3.Connection, None, None]:
+    """Connect to a database with tasks, an index, a view and a blob table."""
+    conn = sqlite3.connect(tmp_path.joinpath("source.db"))
+    create_tasks_schema(conn)
+    load_tasks(conn, generate_tasks(250))
+    with conn:
+        conn.execute("insert into tasks (details) values ('Task, \"quoted\"\nline')")
+        conn.execute("create index tasks_deadline on tasks (deadline)")
+        conn.execute("create view urgent as select * from tasks where priority > 5")
+        conn.execute(
+            "create table files (id integer primary key autoincrement, data blob)"
+        )
+        conn.executemany(
+            "insert into files (data) values (?)", [(b"\x00\x01",), (None,)]
+        )
+        # Deleted rows leave a gap in autoincrement ids.
+        conn.execute("insert into files (data) values (x'ff')")
+        conn.execute("delete from files where id = 3")
+
+    yield conn
+
+    conn.close()
+
+
+def contents(conn: sqlite3.Connection) -> Tuple[List[Tuple[str, str]], ...]:
+    """Return the schema and rows of a database."""
+    return (
+        conn.execute("select name, sql from sqlite_master order by name").fetchall(),
+        conn.execute("select * from tasks order by id").fetchall(),
+        conn.execute("select * from files order by id").fetchall(),
+        conn.execute("select * from sqlite_sequence").fetchall(),
+    )
+
+
+def test_binary_round_trip(source: sqlite3.Connection, tmp_path: Path) -> None:
+    """A binary dump keeps values, types, schema and autoincrement counters."""
+    stats = dump(source, tmp_path.joinpath("dump"), batch_size=100)
+    assert stats.rows == 253
+    assert not source.in_transaction
+
+    target = sqlite3.connect(":memory:")
+    assert restore(target, tmp_path.joinpath("dump"), batch_size=100).rows == 253
+
+    assert contents(target) == contents(source)
+    query = "select count(*) from urgent"
+    assert target.execute(query).fetchone() == source.execute(query).fetchone()
+    # The next id follows the deleted row, not the last one left.
+    with target:
+        assert target.execute("insert into files (data) values (null)").lastrowid == 4
+
+
+def test_csv_round_trip(source: sqlite3.Connection, tmp_path: Path) -> None:
+    """A CSV dump keeps text; column affinity converts numbers back."""
+    with pytest.raises(ValueError, match="blobs"):
+        dump(source, tmp_path.joinpath("dump"), "csv")
+    assert not tmp_path.joinpath("dump", "0.csv").exists()
+    with source:
+        source.execute("update files set data = 'Text' where data is not null")
+
+    dump(source, tmp_path.joinpath("dump"), "csv")
+    assert Path(tmp_path.joinpath("dump", "0.csv")).read_text().startswith("1,")
+
+    target = sqlite3.connect(":memory:")
+    restore(target, tmp_path.joinpath("dump"))
+
+    assert target.execute("select * from tasks order by id").fetchall() == (
+        source.execute("select * from tasks order by id").fetchall()
+    )
+    # `NULL`s stay `NULL`s.
+    assert target.execute("select data from files order by id").fetchall() == [
+        ("Text",),
+        (None,),
+    ]
+
+
+@pytest.mark.parametrize("dump_format", ["binary", "csv"])
+def test_schema(dump_format: str, tmp_path: Path) -> None:
+    """Generated columns are computed again, and only `sqlite_` tables are left out."""
+    source = sqlite3.connect(":memory:")
+    source.executescript(
+        """
+        create table sqliteXtable (
+            a integer, b integer as (a * 2), c integer as (a + 1) stored, d text
+        );
+        insert into sqliteXtable (a, d) values (1, 'One'), (2, 'Two');
+        """
+    )
+    dump(source, tmp_path.joinpath("dump"), dump_format)
+
+    target = sqlite3.connect(":memory:")
+    assert restore(target, tmp_path.joinpath("dump")).rows == 2
+    assert target.execute("select * from sqliteXtable").fetchall() == [
+        (1, 2, 2, "One"),
+        (2, 4, 3, "Two"),
+    ]
+
+
+def test_dump_errors(source: sqlite3.Connection, tmp_path: Path) -> None:
+    """Unknown formats and open transactions are rejected."""
+    with pytest.raises(ValueError):
+        dump(source, tmp_path.joinpath("dump"), "sql")
+
+    source.execute("insert into tasks (details) values ('Task')")
+    with pytest.raises(ValueError):
+        dump(source, tmp_path.joinpath("dump"))
+    source.rollback()
+
+
+def test_backup(source: sqlite3.Connection, tmp_path: Path) -> None:
+    """Copy a live database a few pages at a time."""
+    steps = []
+    stats = backup(
+        source,
+        tmp_path.joinpath("backup.db"),
+        pages=1,
+        progress=lambda status, remaining, total: steps.append(remaining),
+    )
+    assert stats.bytes > 0
+    assert len(steps) > 1 and steps[-1] == 0
+
+    target = sqlite3.connect(tmp_path.joinpath("backup.db"))
+    try:
+        assert contents(target) == contents(source)
+    finally:
+        target.close()
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few rows."""
+    results = benchmark(1000)
+
+    assert set(results) == {
+        "iterdump: dump",
+        "iterdump: restore",
+        "csv: dump",
+        "csv: restore",
+        "binary: dump",
+        "binary: restore",
+        "backup",
+        "database",
+    }
+    assert all(
+        stats.rows == 1000 for name, stats in results.items() if name != "backup"
+    )
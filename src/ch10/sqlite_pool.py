@@ -0,0 +1,354 @@
+"""Reuse SQLite connections across threads with a connection pool.
+
+Opening a connection per request means opening the database file, reading its schema
+and applying the connection settings each time, and throws away the statements
+compiled by the connection. `ConnectionPool` keeps connections open instead: a thread
+checks a connection out, uses it, and returns it to the pool.
+
+Each connection is set up once, when it is created:
+
+- `PRAGMA`s, e.g. write-ahead logging (WAL) so that readers do not block the writer and
+  the writer does not block readers
+- `cached_statements`, the number of compiled statements that `sqlite3` keeps per
+  connection, so that repeated queries are not compiled again
+
+The examples use the `tasks` table of `sqlite3_test.py`.
+
+Run as a script to compare with a connection per request, with 4 reader threads and
+1 writer thread:
+
+    python sqlite_pool.py --readers 4
+"""
+
+import argparse
+import queue
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+TASKS_SCHEMA = """\
+create table tasks(
+    id integer primary key autoincrement not null,
+    priority integer default 1,
+    details text,
+    deadline date
+);"""
+
+DEFAULT_PRAGMAS: Mapping[str, Union[str, int]] = {
+    "journal_mode": "wal",
+    # In WAL mode, committed transactions survive an application crash, but the last
+    # ones may be lost on power loss.
+    "synchronous": "normal",
+    # Negative values are in KiB: 64 MiB.
+    "cache_size": -64 * 1024,
+    "mmap_size": 256 * 1024 * 1024,
+}
+DEFAULT_CACHED_STATEMENTS = 256
+
+Task = Tuple[int, str, str]
+
+
+def create_tasks_schema(conn: sqlite3.Connection) -> None:
+    """Create the `tasks` table."""
+    with conn:
+        conn.executescript(TASKS_SCHEMA)
+
+
+def generate_tasks(count: int, seed: int = 0) -> Iterator[Task]:
+    """Generate `count` `(priority, details, deadline)` rows for the `tasks` table."""
+    rand = random.Random(seed)
+    start = date(2020, 1, 1)
+    for i in range(count):
+        deadline = start + timedelta(days=rand.randrange(3650))
+        yield rand.randint(1, 5), f"Task {i + 1}", deadline.isoformat()
+
+
+def apply_pragmas(
+    conn: sqlite3.Connection, pragmas: Mapping[str, Union[str, int]]
+) -> None:
+    """Apply `pragmas` to `conn`."""
+    for name, value in pragmas.items():
+        conn.execute(f"pragma {name} = {value}")
+
+
+class ConnectionPool:
+    """A pool of up to `size` connections to `database`.
+
+    `connect_kwargs` are passed to `sqlite3.connect()`. Connections are created as
+    needed, and can be used from any thread, but by only one thread at a time: use
+    `connection()` to check one out. Closing the pool makes threads waiting for a
+    connection raise `ValueError`.
+
+    An in-memory database cannot be shared by several connections: use a file, or a
+    shared-cache URI such as `"file:tasks?mode=memory&cache=shared"` with `uri=True`.
+    """
+
+    def __init__(
+        self,
+        database: Union[str, Path],
+        size: int = 8,
+        pragmas: Mapping[str, Union[str, int]] = DEFAULT_PRAGMAS,
+        cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+        timeout: float = 5.0,
+        **connect_kwargs: Any,
+    ) -> None:
+        if size < 1:
+            raise ValueError("size must be at least 1")
+
+        self.database = database
+        self.size = size
+        self.pragmas = dict(pragmas)
+        self.cached_statements = cached_statements
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+        # Last in, first out, so that recently used connections, with warm caches, are
+        # reused first.
+        # `None` wakes up a thread waiting for a connection when the pool is closed, or
+        # when creating a connection failed.
+        self._idle: "queue.LifoQueue[Optional[sqlite3.Connection]]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._waiting = 0
+        self.created = 0
+        self.checkouts = 0
+        self.waits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn: sqlite3.Connection = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            **self.connect_kwargs,
+        )
+        apply_pragmas(conn, self.pragmas)
+        return conn
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """Check out a connection, waiting up to `timeout` seconds for one if all are
+        in use.
+
+        Raise `queue.Empty` on timeout, and `ValueError` if the pool is closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self.checkouts += 1
+        waited = False
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise ValueError("the pool is closed")
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = None
+                if conn is not None:
+                    return conn
+                create = self.created < self.size
+                if create:
+                    self.created += 1
+                else:
+                    if not waited:
+                        self.waits += 1
+                        waited = True
+                    self._waiting += 1
+
+            if create:
+                try:
+                    return self._connect()
+                except BaseException:
+                    with self._lock:
+                        self.created -= 1
+                        # Wake up a waiting thread, to create a connection instead.
+                        if self._waiting:
+                            self._idle.put(None)
+                    raise
+            if deadline is not None:
+                timeout = max(0.0, deadline - time.monotonic())
+            try:
+                conn = self._idle.get(timeout=timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if conn is not None:
+                return conn
+            # Woken up by `close()`, or by a failed connection: check again.
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a checked out connection to the pool.
+
+        A transaction left open is rolled back.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(
+        self, timeout: Optional[float] = None
+    ) -> Iterator[sqlite3.Connection]:
+        """Check out a connection for the duration of a `with` block."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self) -> None:
+        """Close the idle connections, and wake up the threads waiting for one.
+
+        Checked out connections are closed when released.
+        """
+        with self._lock:
+            self._closed = True
+            waiting = self._waiting
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                conn.close()
+        for _ in range(waiting):
+            self._idle.put(None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of connections created, checkouts, and checkouts that
+        had to wait for a connection to be released.
+        """
+        return {
+            "created": self.created,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+        }
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+READ_QUERY = "select id, priority, details, deadline from tasks where id = ?"
+INSERT_QUERY = "insert into tasks (priority, details, deadline) values (?, ?, ?)"
+
+
+def _run_workload(
+    connection: Callable[[], ContextManager[sqlite3.Connection]],
+    readers: int,
+    reads: int,
+    writes: int,
+    tasks: int,
+) -> float:
+    """Run `readers` threads doing `reads` reads each, and one thread doing `writes`
+    single-row inserts, each in its own transaction. Return the seconds taken.
+    """
+    errors: List[BaseException] = []
+
+    def read(seed: int) -> None:
+        rand = random.Random(seed)
+        try:
+            for _ in range(reads):
+                with connection() as conn:
+                    conn.execute(READ_QUERY, (rand.randint(1, tasks),)).fetchone()
+        except Exception as exc:
+            errors.append(exc)
+
+    def write() -> None:
+        try:
+            for task in generate_tasks(writes, seed=1):
+                with connection() as conn:
+                    with conn:
+                        conn.execute(INSERT_QUERY, task)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+    threads.append(threading.Thread(target=write))
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    return seconds
+
+
+def benchmark(
+    readers: int = 4, reads: int = 2000, writes: int = 500, tasks: int = 10_000
+) -> Dict[str, float]:
+    """Run the same workload on connections per request and on a pool.
+
+    Report the operations per second of each.
+    """
+    results = {}
+    operations = readers * reads + writes
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = Path(tmp_dir).joinpath("tasks.db")
+        conn = sqlite3.connect(db_path)
+        # Outside of a transaction, or the journal mode is not changed.
+        apply_pragmas(conn, {"journal_mode": "wal"})
+        create_tasks_schema(conn)
+        with conn:
+            conn.executemany(INSERT_QUERY, generate_tasks(tasks))
+        conn.close()
+
+        @contextmanager
+        def per_request() -> Iterator[sqlite3.Connection]:
+            conn = sqlite3.connect(db_path, timeout=5.0)
+            try:
+                apply_pragmas(conn, DEFAULT_PRAGMAS)
+                yield conn
+            finally:
+                conn.close()
+
+        seconds = _run_workload(per_request, readers, reads, writes, tasks)
+        results["connect per request"] = operations / seconds
+
+        with ConnectionPool(db_path, size=readers + 1) as pool:
+            seconds = _run_workload(pool.connection, readers, reads, writes, tasks)
+        results["ConnectionPool"] = operations / seconds
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="sqlite_pool", description="Compare a pool with a connection per request"
+    )
+    parser.add_argument("-r", "--readers", type=int, default=4)
+    parser.add_argument("-n", "--reads", type=int, default=2000)
+    parser.add_argument("-w", "--writes", type=int, default=500)
+    args = parser.parse_args()
+
+    for name, ops in benchmark(args.readers, args.reads, args.writes).items():
+        print(f"{name}: {ops:.0f} operations/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Reusing SQLite connections with `sqlite_pool`."""
+
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from sqlite_pool import (
+    INSERT_QUERY,
+    ConnectionPool,
+    benchmark,
+    create_tasks_schema,
+    generate_tasks,
+)
+
+
+@pytest.fixture(name="db_path")
+def fixture_db_path(tmp_path: Path) -> Path:
+    """Create a database with a `tasks` table of 100 rows."""
+    db_path = tmp_path.joinpath("tasks.db")
+    conn = sqlite3.connect(db_path)
+    try:
+        create_tasks_schema(conn)
+        with conn:
+            conn.executemany(INSERT_QUERY, generate_tasks(100))
+    finally:
+        conn.close()
+    return db_path
+
+
+def test_pragmas(db_path: Path) -> None:
+    """PRAGMAs are applied to each new connection."""
+    with ConnectionPool(db_path, cached_statements=16) as pool:
+        with pool.connection() as conn:
+            assert conn.execute("pragma journal_mode").fetchone() == ("wal",)
+            # NORMAL
+            assert conn.execute("pragma synchronous").fetchone() == (1,)
+            assert conn.execute("pragma cache_size").fetchone() == (-64 * 1024,)
+            assert conn.execute("select count(*) from tasks").fetchone() == (100,)
+
+
+def test_reuse(db_path: Path) -> None:
+    """Released connections are reused."""
+    with ConnectionPool(db_path, size=2) as pool:
+        with pool.connection() as conn:
+            first = conn
+        with pool.connection() as conn:
+            assert conn is first
+            with pool.connection() as other:
+                assert other is not first
+
+        assert pool.stats() == {"created": 2, "checkouts": 3, "waits": 0}
+
+
+def test_rollback_on_release(db_path: Path) -> None:
+    """An open transaction is rolled back when its connection is released."""
+    with ConnectionPool(db_path, size=1) as pool:
+        with pool.connection() as conn:
+            conn.execute("delete from tasks")
+            assert conn.in_transaction
+
+        with pool.connection() as conn:
+            assert not conn.in_transaction
+            assert conn.execute("select count(*) from tasks").fetchone() == (100,)
+
+
+def test_wait(db_path: Path) -> None:
+    """When all connections are in use, wait for one to be released."""
+    with ConnectionPool(db_path, size=1) as pool:
+        conn = pool.acquire()
+        with pytest.raises(queue.Empty):
+            pool.acquire(timeout=0.01)
+
+        timer = threading.Timer(0.05, pool.release, (conn,))
+        timer.start()
+        assert pool.acquire(timeout=5) is conn
+        timer.join()
+        pool.release(conn)
+
+        assert pool.stats() == {"created": 1, "checkouts": 3, "waits": 2}
+
+
+def test_close(db_path: Path) -> None:
+    """Connections are closed with the pool."""
+    pool = ConnectionPool(db_path)
+    idle = pool.acquire()
+    in_use = pool.acquire()
+    pool.release(idle)
+
+    pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        idle.execute("select 1")
+
+    pool.release(in_use)
+    with pytest.raises(sqlite3.ProgrammingError):
+        in_use.execute("select 1")
+    with pytest.raises(ValueError):
+        pool.acquire()
+
+
+def test_close_waiting(db_path: Path) -> None:
+    """Threads waiting for a connection are woken up when the pool is closed."""
+    pool = ConnectionPool(db_path, size=1)
+    conn = pool.acquire()
+    errors = []
+
+    def acquire() -> None:
+        try:
+            pool.acquire()
+        except ValueError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=acquire) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    while pool.stats()["waits"] < 2:
+        time.sleep(0.01)
+    pool.close()
+    for thread in threads:
+        thread.join(5)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(errors) == 2
+    pool.release(conn)
+
+
+def test_connect_error_waiting(db_path: Path) -> None:
+    """Threads waiting for a connection create it when creating one failed."""
+    pool = ConnectionPool(db_path, size=1)
+    connect = pool._connect
+    connecting = threading.Event()
+    fail = threading.Event()
+
+    def failing_connect() -> sqlite3.Connection:
+        pool._connect = connect  # type: ignore[method-assign]
+        connecting.set()
+        fail.wait(5)
+        raise sqlite3.OperationalError("unable to open database file")
+
+    pool._connect = failing_connect  # type: ignore[method-assign]
+    errors = []
+    connections = []
+
+    def acquire() -> None:
+        try:
+            connections.append(pool.acquire(timeout=5))
+        except sqlite3.OperationalError as exc:
+            errors.append(exc)
+
+    failing = threading.Thread(target=acquire)
+    failing.start()
+    connecting.wait(5)
+    waiting = threading.Thread(target=acquire)
+    waiting.start()
+    while pool.stats()["waits"] < 1:
+        time.sleep(0.01)
+    fail.set()
+    for thread in (failing, waiting):
+        thread.join(5)
+
+    assert len(errors) == 1
+    assert len(connections) == 1
+    assert pool.stats()["created"] == 1
+    pool.release(connections[0])
+    pool.close()
+
+
+def test_threads(db_path: Path) -> None:
+    """Readers and a writer share the pool."""
+    with ConnectionPool(db_path, size=3) as pool:
+
+        def write() -> None:
+            for task in generate_tasks(50, seed=1):
+                with pool.connection() as conn, conn:
+                    conn.execute(INSERT_QUERY, task)
+
+        counts = []
+
+        def read() -> None:
+            for _ in range(50):
+                with pool.connection() as conn:
+                    counts.append(conn.execute("select count(*) from tasks").fetchone())
+
+        threads = [threading.Thread(target=target) for target in (write, read, read)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(counts) == 100
+        assert all(100 <= count <= 150 for count, in counts)
+        with pool.connection() as conn:
+            assert conn.execute("select count(*) from tasks").fetchone() == (150,)
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with small numbers."""
+    results = benchmark(readers=2, reads=20, writes=5, tasks=100)
+
+    assert set(results) == {"connect per request", "ConnectionPool"}
@@ -0,0 +1,241 @@
+"""Build SQLite rows as named tuples, or as columns, with little work per row.
+
+A row factory is called once per row, so any work it repeats for every row adds up:
+a hand-written factory such as `task_factory()` in `sqlite3_test.py` looks up its
+fields by position and calls `strptime()` on every row.
+
+`RowFactory` instead builds a constructor once per query, from
+`cursor.description`:
+
+- rows become named tuples (generated, or a given `NamedTuple` class, whose fields are
+  matched to columns by name)
+- values of columns with a converter are converted, except `NULL`s; the constructor
+  is generated as Python source, so that there is no loop over columns per row
+- `date_converter()` parses dates with `date_parser`, and caches the results, since
+  the same dates tend to repeat across rows
+
+`fetch_columns()` skips row objects altogether, fetching rows with `fetchmany()` into
+a list or an `array.array` per column.
+
+Run as a script to compare with `sqlite3.Row` and `task_factory()`:
+
+    python sqlite_rows.py --rows 5000000
+"""
+
+import argparse
+import sqlite3
+import time
+from array import array
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    MutableSequence,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from date_parser import DEFAULT_CACHE_SIZE, get_parser
+from sqlite_bulk_load import load_tasks
+from sqlite_pool import create_tasks_schema, generate_tasks
+
+Converter = Callable[[Any], Any]
+Description = Tuple[Tuple[Any, ...], ...]
+
+
+def date_converter(fmt: str = "%Y-%m-%d") -> Converter:
+    """Return a function that parses strings in `fmt` into `date`s, with a cache."""
+    parse = get_parser(fmt).parse_uncached
+
+    @lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+    def convert(value: str) -> date:
+        return parse(value).date()
+
+    return convert
+
+
+class RowFactory:
+    """A `row_factory` that returns named tuples, converting some of their values.
+
+    `row_class` is a `NamedTuple` class whose fields must all be columns of the query;
+    by default, a named tuple class is generated for each set of columns. `converters`
+    maps column names to functions converting their values.
+    """
+
+    def __init__(
+        self,
+        row_class: Optional[Type[Tuple[Any, ...]]] = None,
+        converters: Optional[Mapping[str, Converter]] = None,
+    ) -> None:
+        self.row_class = row_class
+        self.converters = dict(converters or {})
+        self._constructors: Dict[Tuple[str, ...], Callable[[Tuple[Any, ...]], Any]] = {}
+        # The last description and its constructor, in one attribute, so that a
+        # factory shared by connections in several threads never pairs them wrongly.
+        self._last: Tuple[Optional[Description], Callable[[Tuple[Any, ...]], Any]] = (
+            None,
+            tuple,
+        )
+
+    def __call__(self, cursor: sqlite3.Cursor, row: Tuple[Any, ...]) -> Any:
+        # A cursor keeps the same description object until the next query.
+        description = cursor.description
+        last = self._last
+        if description is not last[0]:
+            names = tuple(column[0] for column in description)
+            construct = self._constructors.get(names)
+            if construct is None:
+                construct = self._constructors[names] = self.build(names)
+            last = self._last = (description, construct)
+        return last[1](row)
+
+    def build(self, names: Sequence[str]) -> Callable[[Tuple[Any, ...]], Any]:
+        """Return a function converting rows with columns `names` into row objects."""
+        if self.row_class is None:
+            # Names that are not valid field names, e.g. `count(*)`, are renamed.
+            row_class: Type[Tuple[Any, ...]] = namedtuple(  # type: ignore
+                "Row", names, rename=True
+            )
+            positions = list(range(len(names)))
+        else:
+            row_class = self.row_class
+            fields: Sequence[str] = getattr(row_class, "_fields")
+            missing = set(fields) - set(names)
+            if missing:
+                raise ValueError(f"columns missing for fields {sorted(missing)}")
+            positions = [names.index(field) for field in fields]
+
+        if positions == list(range(len(names))) and not any(
+            name in self.converters for name in names
+        ):
+            return lambda row: tuple.__new__(row_class, row)
+
+        namespace: Dict[str, Any] = {"new": tuple.__new__, "row_class": row_class}
+        args = []
+        for position in positions:
+            value = f"row[{position}]"
+            converter = self.converters.get(names[position])
+            if converter is not None:
+                namespace[f"convert{position}"] = converter
+                value = f"(None if {value} is None else convert{position}({value}))"
+            args.append(value)
+        source = f"def construct(row):\n    return new(row_class, ({', '.join(args)},))"
+        exec(source, namespace)
+        return namespace["construct"]
+
+
+def fetch_columns(
+    cursor: sqlite3.Cursor,
+    batch_size: int = 10_000,
+    typecodes: Optional[Mapping[str, str]] = None,
+    converters: Optional[Mapping[str, Converter]] = None,
+) -> Dict[str, MutableSequence[Any]]:
+    """Fetch the remaining rows of `cursor` into a sequence per column, by name.
+
+    Columns named in `typecodes` are fetched into an `array.array` of that type code,
+    and must not contain `NULL`s; others into a list. Values of columns named in
+    `converters` are converted, except `NULL`s.
+    """
+    typecodes = typecodes or {}
+    converters = converters or {}
+    names = [column[0] for column in cursor.description]
+    columns: List[MutableSequence[Any]] = [
+        array(typecodes[name]) if name in typecodes else [] for name in names
+    ]
+    convert = [converters.get(name) for name in names]
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for column, values, converter in zip(columns, zip(*rows), convert):
+            if converter is None:
+                column.extend(values)
+            elif None not in values:
+                column.extend(map(converter, values))
+            else:
+                column.extend(
+                    [None if value is None else converter(value) for value in values]
+                )
+
+    return dict(zip(names, columns))
+
+
+class Task(NamedTuple):
+    """A task stored as a row in the database, as in `sqlite3_test.py`."""
+
+    id: int
+    priority: int
+    details: str
+    deadline: date
+
+
+def task_factory(cursor: sqlite3.Cursor, row: Tuple[int, int, str, str]) -> Task:
+    """Create `Task` objects out of rows, as in `sqlite3_test.py`."""
+    return Task(row[0], row[1], row[2], datetime.strptime(row[3], "%Y-%m-%d").date())
+
+
+def benchmark(rows: int) -> Dict[str, float]:
+    """Fetch `rows` rows of the `tasks` table in different ways.
+
+    Report the rows per second of each.
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        create_tasks_schema(conn)
+        load_tasks(conn, generate_tasks(rows))
+        query = "select id, priority, details, deadline from tasks"
+
+        factories: Dict[str, Any] = {
+            "tuple": None,
+            "sqlite3.Row": sqlite3.Row,
+            "task_factory": task_factory,
+            "RowFactory": RowFactory(converters={"deadline": date_converter()}),
+            "RowFactory(Task)": RowFactory(
+                Task, converters={"deadline": date_converter()}
+            ),
+        }
+        results = {}
+        for name, factory in factories.items():
+            conn.row_factory = factory
+            start = time.perf_counter()
+            for _ in conn.execute(query):
+                pass
+            results[name] = rows / (time.perf_counter() - start)
+
+        conn.row_factory = None
+        start = time.perf_counter()
+        fetch_columns(
+            conn.execute(query),
+            typecodes={"id": "q", "priority": "b"},
+            converters={"deadline": date_converter()},
+        )
+        results["fetch_columns"] = rows / (time.perf_counter() - start)
+    finally:
+        conn.close()
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="sqlite_rows", description="Compare ways to build rows from a query"
+    )
+    parser.add_argument("-r", "--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    for name, rows_per_second in benchmark(args.rows).items():
+        print(f"{name}: {rows_per_second:.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Building rows from SQLite queries with `sqlite_rows`."""
+
+import sqlite3
+from array import array
+from datetime import date
+from typing import Generator
+
+import pytest
+
+from sqlite_pool import create_tasks_schema
+from sqlite_rows import (
+    RowFactory,
+    Task,
+    benchmark,
+    date_converter,
+    fetch_columns,
+    task_factory,
+)
+
+
+@pytest.fixture(name="conn")
+def fixture_conn() -> Generator[sqlite3.Connection, None, None]:
+    """Connect to an in-memory database, with the rows of `sqlite3_test.py`."""
+    conn = sqlite3.connect(":memory:")
+    create_tasks_schema(conn)
+    with conn:
+        conn.executemany(
+            "insert into tasks (priority, details, deadline) values (?, ?, ?);",
+            [(2, "Task 1", "2020-07-08"), (1, "Task 2", "2020-07-11")],
+        )
+
+    yield conn
+
+    conn.close()
+
+
+def test_date_converter() -> None:
+    """Parse and cache dates."""
+    convert = date_converter()
+
+    assert convert("2020-07-08") == date(2020, 7, 8)
+    assert convert("2020-07-08") is convert("2020-07-08")
+    assert date_converter("%m/%d/%Y")("7/8/2020") == date(2020, 7, 8)
+
+
+def test_generated_rows(conn: sqlite3.Connection) -> None:
+    """Generate a named tuple class per set of columns."""
+    conn.row_factory = RowFactory(converters={"deadline": date_converter()})
+
+    row = conn.execute("select * from tasks").fetchone()
+    assert row == (1, 2, "Task 1", date(2020, 7, 8))
+    assert (row.id, row.priority, row.details) == (1, 2, "Task 1")
+
+    row = conn.execute("select details, count(*) from tasks").fetchone()
+    assert row._fields == ("details", "_1")
+    assert row.details == "Task 1"
+
+
+def test_row_class(conn: sqlite3.Connection) -> None:
+    """Match the fields of a `NamedTuple` to columns by name."""
+    conn.row_factory = RowFactory(Task, {"deadline": date_converter()})
+
+    tasks = conn.execute("select * from tasks").fetchall()
+    assert tasks == [
+        Task(1, 2, "Task 1", date(2020, 7, 8)),
+        Task(2, 1, "Task 2", date(2020, 7, 11)),
+    ]
+    assert isinstance(tasks[0], Task)
+    conn.row_factory = task_factory
+    assert conn.execute("select * from tasks").fetchall() == tasks
+
+    conn.row_factory = RowFactory(Task, {"deadline": date_converter()})
+    task = conn.execute(
+        "select deadline, details, null as extra, priority, id from tasks"
+    ).fetchone()
+    assert task == Task(1, 2, "Task 1", date(2020, 7, 8))
+
+    with pytest.raises(ValueError):
+        conn.execute("select id, details from tasks").fetchone()
+
+
+def test_nulls_not_converted(conn: sqlite3.Connection) -> None:
+    """Converters are not applied to `NULL`s."""
+    with conn:
+        conn.execute("insert into tasks (details) values ('Task 3')")
+    conn.row_factory = RowFactory(Task, {"deadline": date_converter()})
+
+    task = conn.execute("select * from tasks where id = 3").fetchone()
+    assert task == Task(3, 1, "Task 3", None)  # type: ignore
+
+
+def test_fetch_columns(conn: sqlite3.Connection) -> None:
+    """Fetch rows into a sequence per column."""
+    with conn:
+        conn.execute("insert into tasks (details) values ('Task 3')")
+    cursor = conn.execute("select * from tasks")
+
+    columns = fetch_columns(
+        cursor,
+        batch_size=2,
+        typecodes={"id": "q", "priority": "b"},
+        converters={"deadline": date_converter()},
+    )
+    assert columns == {
+        "id": array("q", [1, 2, 3]),
+        "priority": array("b", [2, 1, 1]),
+        "details": ["Task 1", "Task 2", "Task 3"],
+        "deadline": [date(2020, 7, 8), date(2020, 7, 11), None],
+    }
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few rows."""
+    results = benchmark(100)
+
+    assert set(results) == {
+        "tuple",
+        "sqlite3.Row",
+        "task_factory",
+        "RowFactory",
+        "RowFactory(Task)",
+        "fetch_columns",
+    }
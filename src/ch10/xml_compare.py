@@ -0,0 +1,289 @@
+"""Compare XML documents structurally, reporting where they first differ.
+
+Comparing the canonical forms from `ET.canonicalize()` tells whether two documents are
+equal, but builds both canonical forms as strings, and does not say where they differ.
+`find_difference()` instead walks both documents in lockstep, as a stream of `"start"`
+and `"end"` events, and stops at the first difference:
+
+- element tags must be equal (namespaces are compared by URI, not prefix)
+- attributes must be equal, in any order
+- text, and the tail text following each child, must be equal; with `strip_text`, as
+  in `ET.canonicalize(strip_text=True)`, leading and trailing whitespace is ignored
+- comments and processing instructions are ignored
+
+Documents given as XML text or files are parsed incrementally with `ET.iterparse()`,
+and elements are discarded once compared, so memory use depends on the depth of the
+documents, not their size.
+
+Run as a script to compare with `ET.canonicalize()` on generated documents:
+
+    python xml_compare.py --countries 400000
+"""
+
+import argparse
+import copy
+import io
+import shutil
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from contextlib import ExitStack
+from itertools import zip_longest
+from pathlib import Path
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from xml_stream import write_countries
+
+XMLSource = Union[str, Path, IO[bytes], ET.Element, ET.ElementTree]
+Event = Tuple[str, ET.Element]
+
+# Dropped by `ET.iterparse()`, and so ignored in existing trees too.
+_SKIPPED_TAGS: Tuple[object, ...] = (ET.Comment, ET.ProcessingInstruction)
+
+
+def _without_comments(elem: ET.Element) -> ET.Element:
+    """Return `elem`, or if it has comment or processing instruction children, a
+    shallow copy without them, with the text following them moved to the previous
+    text or tail.
+    """
+    if not any(child.tag in _SKIPPED_TAGS for child in elem):
+        return elem
+
+    view = copy.copy(elem)
+    kept: List[ET.Element] = []
+    for child in elem:
+        if child.tag not in _SKIPPED_TAGS:
+            kept.append(copy.copy(child))
+        elif child.tail and kept:
+            kept[-1].tail = (kept[-1].tail or "") + child.tail
+        elif child.tail:
+            view.text = (view.text or "") + child.tail
+    view[:] = kept
+    return view
+
+
+def _tree_events(root: ET.Element) -> Iterator[Event]:
+    """Yield `"start"` and `"end"` events for the elements of an existing tree."""
+    root = _without_comments(root)
+    yield "start", root
+    stack = [(root, iter(root))]
+    while stack:
+        elem, children = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            yield "end", elem
+        else:
+            child = _without_comments(child)
+            yield "start", child
+            stack.append((child, iter(child)))
+
+
+def _events(source: XMLSource, stack: ExitStack) -> Tuple[Iterator[Event], bool]:
+    """Return the events of `source`, and whether its elements can be discarded.
+
+    Files opened here are closed by `stack`.
+    """
+    if isinstance(source, ET.ElementTree):
+        root = source.getroot()
+        if root is None:
+            raise ValueError("the ElementTree has no root element")
+        return _tree_events(root), False
+    if isinstance(source, ET.Element):
+        return _tree_events(source), False
+
+    xml_file: Union[IO[str], IO[bytes]]
+    if isinstance(source, str):
+        xml_file = io.StringIO(source)
+    elif isinstance(source, Path):
+        xml_file = stack.enter_context(open(source, "rb"))
+    else:
+        xml_file = source
+    return ET.iterparse(xml_file, events=("start", "end")), True
+
+
+def _strip(text: Optional[str]) -> str:
+    return text.strip() if text else ""
+
+
+def _keep(text: Optional[str]) -> str:
+    return text or ""
+
+
+def _describe(event: Optional[str], elem: Optional[ET.Element]) -> str:
+    """Describe an event, for differences in the number of children."""
+    if event == "start" and elem is not None:
+        return f"<{elem.tag}>"
+    return "none left" if event == "end" else "end of document"
+
+
+def find_difference(
+    actual: XMLSource, expected: XMLSource, strip_text: bool = True
+) -> Optional[str]:
+    """Return a description of the first difference between two documents, or `None`.
+
+    Each document is XML text, a `Path` or binary file to parse, or an existing
+    `Element` or `ElementTree`. Existing trees are not modified.
+    """
+    normalise: Callable[[Optional[str]], str] = _strip if strip_text else _keep
+
+    with ExitStack() as stack:
+        actual_events, actual_discard = _events(actual, stack)
+        expected_events, expected_discard = _events(expected, stack)
+
+        # Path segments of the open elements.
+        path: List[str] = []
+        # Children started so far in each open element, by tag, and in total (`None`).
+        counts: List[Dict[object, int]] = [{}]
+        # The open `(actual, expected)` elements.
+        parents: List[Tuple[ET.Element, ET.Element]] = []
+        # The last ended child of each open element, and its path segment: its tail is
+        # only complete once the next sibling, or the parent, has been parsed.
+        previous: List[Optional[Tuple[ET.Element, ET.Element, str]]] = [None]
+
+        def where(segment: Optional[str] = None) -> str:
+            return "/" + "/".join(path if segment is None else path + [segment])
+
+        def compare_tail(
+            parent: Optional[Tuple[ET.Element, ET.Element]]
+        ) -> Optional[str]:
+            """Compare the tails of the last ended children, then discard them."""
+            last = previous[-1]
+            if last is None or parent is None:
+                return None
+
+            actual_child, expected_child, segment = last
+            actual_tail = normalise(actual_child.tail)
+            expected_tail = normalise(expected_child.tail)
+            if actual_tail != expected_tail:
+                return f"{where(segment)}: tail {actual_tail!r} != {expected_tail!r}"
+
+            if actual_discard:
+                parent[0].remove(actual_child)
+            if expected_discard:
+                parent[1].remove(expected_child)
+            return None
+
+        for (actual_event, actual_elem), (expected_event, expected_elem) in zip_longest(
+            actual_events, expected_events, fillvalue=(None, None)
+        ):
+            if actual_event != expected_event:
+                return (
+                    f"{where()}: children {_describe(actual_event, actual_elem)}"
+                    f" != {_describe(expected_event, expected_elem)}"
+                )
+            # The same event, so neither document has ended.
+            assert actual_elem is not None and expected_elem is not None
+
+            if actual_event == "start":
+                count = counts[-1]
+                position = count[None] = count.get(None, 0) + 1
+                if actual_elem.tag != expected_elem.tag:
+                    return (
+                        f"{where(f'*[{position}]')}: tag"
+                        f" {actual_elem.tag!r} != {expected_elem.tag!r}"
+                    )
+
+                tag = actual_elem.tag
+                number = count[tag] = count.get(tag, 0) + 1
+                path.append(f"{tag}[{number}]")
+                if actual_elem.attrib != expected_elem.attrib:
+                    return (
+                        f"{where()}: attributes"
+                        f" {actual_elem.attrib!r} != {expected_elem.attrib!r}"
+                    )
+
+                counts.append({})
+                parents.append((actual_elem, expected_elem))
+                previous.append(None)
+                continue
+
+            actual_text = normalise(actual_elem.text)
+            expected_text = normalise(expected_elem.text)
+            if actual_text != expected_text:
+                return f"{where()}: text {actual_text!r} != {expected_text!r}"
+
+            # The last child of the element that has just ended.
+            difference = compare_tail(parents.pop())
+            if difference:
+                return difference
+
+            previous.pop()
+            counts.pop()
+            segment = path.pop()
+            # The previous sibling of the element that has just ended.
+            difference = compare_tail(parents[-1] if parents else None)
+            if difference:
+                return difference
+            previous[-1] = (actual_elem, expected_elem, segment)
+
+    return None
+
+
+def assert_xml_equal(
+    actual: XMLSource, expected: XMLSource, strip_text: bool = True
+) -> None:
+    """Raise `AssertionError`, describing the first difference, if documents differ."""
+    difference = find_difference(actual, expected, strip_text)
+    if difference is not None:
+        raise AssertionError(difference)
+
+
+def _canonical_equal(actual: Path, expected: Path) -> bool:
+    return ET.canonicalize(from_file=actual, strip_text=True) == ET.canonicalize(
+        from_file=expected, strip_text=True
+    )
+
+
+def _structural_equal(actual: Path, expected: Path) -> bool:
+    return find_difference(actual, expected) is None
+
+
+def benchmark(countries: int) -> Dict[str, Dict[str, float]]:
+    """Compare two copies of a document with `countries` `country` elements.
+
+    Report the seconds taken and the peak memory allocated, using `ET.canonicalize()`
+    and using `find_difference()`.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        actual = Path(tmp_dir).joinpath("actual.xml")
+        write_countries(actual, countries)
+        expected = Path(shutil.copy(actual, Path(tmp_dir).joinpath("expected.xml")))
+
+        for name, equal in [
+            ("canonicalize", _canonical_equal),
+            ("find_difference", _structural_equal),
+        ]:
+            start = time.perf_counter()
+            if not equal(actual, expected):
+                raise AssertionError(f"{name}: documents differ")
+            seconds = time.perf_counter() - start
+
+            # Tracing slows allocations down, so measure memory in a separate run.
+            tracemalloc.start()
+            equal(actual, expected)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = {"seconds": seconds, "peak_mib": peak / 1024 / 1024}
+
+        results["document"] = {"mib": actual.stat().st_size / 1024 / 1024}
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="xml_compare", description="Compare find_difference with canonicalize"
+    )
+    parser.add_argument("-c", "--countries", type=int, default=400_000)
+    args = parser.parse_args()
+
+    for name, result in benchmark(args.countries).items():
+        print(name, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Comparing XML documents with `xml_compare`."""
+
+import io
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from xml_compare import assert_xml_equal, benchmark, find_difference
+
+SAMPLE_PATH = Path(__file__).parent.joinpath("elementtree_sample1.xml")
+
+EXPECTED = """\
+<data>
+    <country name="Liechtenstein" rank="1">
+        <year>2008</year>
+        <neighbor name="Austria" direction="E" />
+    </country>
+    <country name="Panama" rank="68">
+        <year>2011</year>
+        Text <b>in</b> between
+    </country>
+</data>"""
+
+
+def test_equal_sources(tmp_path: Path) -> None:
+    """Documents can be XML text, files, or existing trees."""
+    xml_path = tmp_path.joinpath("sample.xml")
+    xml_path.write_text(EXPECTED)
+    tree = ET.parse(xml_path)
+
+    assert find_difference(EXPECTED, EXPECTED) is None
+    assert find_difference(xml_path, EXPECTED) is None
+    assert find_difference(tree, xml_path) is None
+    assert find_difference(tree.getroot(), io.BytesIO(EXPECTED.encode())) is None
+    assert find_difference(ET.parse(SAMPLE_PATH), SAMPLE_PATH) is None
+
+    # Existing trees are not modified.
+    assert ET.tostring(tree.getroot(), encoding="unicode") == EXPECTED
+
+
+def test_equal_ignoring_format() -> None:
+    """Attribute order, and whitespace around text with `strip_text`, do not matter."""
+    compact = (
+        '<data><country rank="1" name="Liechtenstein"><year> 2008 </year>'
+        '<neighbor direction="E" name="Austria"/></country>'
+        '<country rank="68" name="Panama"><year>2011</year>Text<b>in</b>between'
+        "</country></data>"
+    )
+
+    assert find_difference(compact, EXPECTED) is None
+    assert find_difference(compact, EXPECTED, strip_text=False) == (
+        "/data[1]/country[1]/year[1]: text ' 2008 ' != '2008'"
+    )
+
+
+def test_comments_ignored() -> None:
+    """Comments are ignored, as by `ET.canonicalize()` by default."""
+    root = ET.XML("<data><a/>one<b/>three</data>")
+    root.insert(1, ET.Comment("comment"))
+    root[1].tail = " two "
+    root.insert(0, ET.Comment("first"))
+    root[0].tail = "zero"
+
+    assert (
+        find_difference(root, "<data>zero<!-- --><a/>one two <b/>three</data>", False)
+        is None
+    )
+    assert [child.tag for child in root] == [ET.Comment, "a", ET.Comment, "b"]
+
+
+@pytest.mark.parametrize(
+    "actual,difference",
+    [
+        (
+            EXPECTED.replace("Liechtenstein", "Monaco"),
+            "/data[1]/country[1]: attributes {'name': 'Monaco', 'rank': '1'}"
+            " != {'name': 'Liechtenstein', 'rank': '1'}",
+        ),
+        (
+            EXPECTED.replace("<year>2011</year>", "<year>2012</year>"),
+            "/data[1]/country[2]/year[1]: text '2012' != '2011'",
+        ),
+        (
+            EXPECTED.replace("<b>", "<i>").replace("</b>", "</i>"),
+            "/data[1]/country[2]/*[2]: tag 'i' != 'b'",
+        ),
+        (
+            EXPECTED.replace("between", "and"),
+            "/data[1]/country[2]/b[1]: tail 'and' != 'between'",
+        ),
+        (
+            EXPECTED.replace("Text", "Some text"),
+            "/data[1]/country[2]/year[1]: tail 'Some text' != 'Text'",
+        ),
+        (
+            EXPECTED.replace('<neighbor name="Austria" direction="E" />', ""),
+            "/data[1]/country[1]: children none left != <neighbor>",
+        ),
+        (
+            EXPECTED.replace("<year>2008</year>", "<year>2008</year><year/>"),
+            "/data[1]/country[1]/*[2]: tag 'year' != 'neighbor'",
+        ),
+    ],
+)
+def test_differences(actual: str, difference: Optional[str]) -> None:
+    """Report the path to the first difference."""
+    assert find_difference(actual, EXPECTED) == difference
+    assert find_difference(ET.XML(actual), ET.XML(EXPECTED)) == difference
+
+
+def test_assert_xml_equal() -> None:
+    """Raise `AssertionError` describing the difference."""
+    assert_xml_equal(EXPECTED, ET.XML(EXPECTED))
+
+    with pytest.raises(AssertionError, match="text '2012' != '2011'"):
+        assert_xml_equal(EXPECTED.replace("2011", "2012"), EXPECTED)
+
+
+def test_benchmark() -> None:
+    """Both approaches find generated documents equal."""
+    results = benchmark(2000)
+
+    assert results["find_difference"]["peak_mib"] < results["canonicalize"]["peak_mib"]
@@ -0,0 +1,231 @@
+"""Look up elements of a parsed XML tree by tag and attribute without scanning it.
+
+`findall("country")` and `find("country[@name='Panama']")` walk the tree on every call,
+and `ElementTree` elements do not know their parent. `ElementIndex` walks the tree once
+and builds:
+
+- tag -> elements
+- (tag, attribute name, attribute value) -> elements
+- element -> parent
+
+Lookups are then dictionary lookups. The index stays correct as long as the tree is
+modified through the index: `append()`, `insert()`, `remove()` and `set()` update both
+the tree and the index. `remove_neighbors()`, `insert_country()` and `append_country()`
+are the modifications of `elementtree_test.test_modify()` done that way.
+
+Elements are listed in the order in which they were added to the index, which is
+document order until elements are inserted.
+
+Run as a script to compare lookups with `find()` on a generated tree:
+
+    python xml_index.py --elements 1000000
+"""
+
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, Collection, Dict, Hashable, List, Optional, Tuple, Union
+
+AttributeKey = Tuple[str, str, str]
+
+
+class ElementIndex:
+    """An index of the elements of a tree.
+
+    Only the attributes named in `attributes` are indexed, or all attributes if it is
+    `None`.
+    """
+
+    def __init__(
+        self,
+        tree: Union[ET.Element, ET.ElementTree],
+        attributes: Optional[Collection[str]] = None,
+    ) -> None:
+        self.root = tree.getroot() if isinstance(tree, ET.ElementTree) else tree
+        self.attributes = None if attributes is None else frozenset(attributes)
+        # Dictionaries with `None` values are used as insertion-ordered sets.
+        self._by_tag: Dict[str, Dict[ET.Element, None]] = {}
+        self._by_attribute: Dict[AttributeKey, Dict[ET.Element, None]] = {}
+        self._parents: Dict[ET.Element, ET.Element] = {}
+
+        self._add(self.root, None)
+
+    def _indexed_attributes(self, elem: ET.Element) -> List[Tuple[str, str]]:
+        if self.attributes is None:
+            return list(elem.items())
+        return [item for item in elem.items() if item[0] in self.attributes]
+
+    def _add(self, elem: ET.Element, parent: Optional[ET.Element]) -> None:
+        """Index `elem` and its descendants, `elem` being a child of `parent`."""
+        if parent is not None:
+            self._parents[elem] = parent
+
+        by_tag = self._by_tag
+        by_attribute = self._by_attribute
+        for descendant in elem.iter():
+            by_tag.setdefault(descendant.tag, {})[descendant] = None
+            for name, value in self._indexed_attributes(descendant):
+                key = (descendant.tag, name, value)
+                by_attribute.setdefault(key, {})[descendant] = None
+            for child in descendant:
+                self._parents[child] = descendant
+
+    def _discard(self, elem: ET.Element) -> None:
+        """Drop `elem` and its descendants from the index."""
+        self._parents.pop(elem, None)
+        for descendant in elem.iter():
+            self._discard_from(self._by_tag, descendant.tag, descendant)
+            for name, value in self._indexed_attributes(descendant):
+                key = (descendant.tag, name, value)
+                self._discard_from(self._by_attribute, key, descendant)
+            for child in descendant:
+                self._parents.pop(child, None)
+
+    @staticmethod
+    def _discard_from(
+        mapping: Dict[Any, Dict[ET.Element, None]], key: Hashable, elem: ET.Element
+    ) -> None:
+        elements = mapping.get(key)
+        if elements is not None:
+            elements.pop(elem, None)
+            if not elements:
+                del mapping[key]
+
+    def __contains__(self, elem: ET.Element) -> bool:
+        return elem in self._by_tag.get(elem.tag, {})
+
+    def __len__(self) -> int:
+        return sum(map(len, self._by_tag.values()))
+
+    def findall(self, tag: str) -> List[ET.Element]:
+        """Return the elements with `tag`."""
+        return list(self._by_tag.get(tag, ()))
+
+    def findall_by_attribute(self, tag: str, name: str, value: str) -> List[ET.Element]:
+        """Return the `tag` elements whose attribute `name` is `value`."""
+        return list(self._by_attribute.get((tag, name, value), ()))
+
+    def find_by_attribute(
+        self, tag: str, name: str, value: str
+    ) -> Optional[ET.Element]:
+        """Return the first `tag` element whose attribute `name` is `value`, if any."""
+        return next(iter(self._by_attribute.get((tag, name, value), ())), None)
+
+    def parent(self, elem: ET.Element) -> Optional[ET.Element]:
+        """Return the parent of `elem`, or `None` for the root."""
+        if elem not in self:
+            raise ValueError(f"{elem!r} is not in the index")
+        return self._parents.get(elem)
+
+    def append(self, parent: ET.Element, elem: ET.Element) -> None:
+        """Add `elem` to the end of the children of `parent`."""
+        self.insert(parent, len(parent), elem)
+
+    def insert(self, parent: ET.Element, index: int, elem: ET.Element) -> None:
+        """Insert `elem` at position `index` among the children of `parent`."""
+        if parent not in self:
+            raise ValueError(f"{parent!r} is not in the index")
+        parent.insert(index, elem)
+        self._add(elem, parent)
+
+    def remove(self, elem: ET.Element) -> None:
+        """Remove `elem`, and its descendants, from the tree."""
+        parent = self.parent(elem)
+        if parent is None:
+            raise ValueError("cannot remove the root element")
+        parent.remove(elem)
+        self._discard(elem)
+
+    def set(self, elem: ET.Element, name: str, value: str) -> None:
+        """Set the attribute `name` of `elem` to `value`."""
+        if elem not in self:
+            raise ValueError(f"{elem!r} is not in the index")
+        if self.attributes is None or name in self.attributes:
+            old_value = elem.get(name)
+            if old_value is not None:
+                old_key = (elem.tag, name, old_value)
+                self._discard_from(self._by_attribute, old_key, elem)
+            self._by_attribute.setdefault((elem.tag, name, value), {})[elem] = None
+        elem.set(name, value)
+
+
+def remove_neighbors(index: ElementIndex) -> None:
+    """Remove `neighbor` elements from the indexed tree."""
+    for neighbor in index.findall("neighbor"):
+        index.remove(neighbor)
+
+
+def insert_country(index: ElementIndex, position: int, country: ET.Element) -> None:
+    """Insert a `country` element at `position` in the root of the indexed tree."""
+    index.insert(index.root, position, country)
+
+
+def append_country(index: ElementIndex, country: ET.Element) -> None:
+    """Append a `country` element to the root of the indexed tree."""
+    index.append(index.root, country)
+
+
+def build_countries(elements: int) -> ET.Element:
+    """Build a `data` tree of about `elements` elements, 6 per `country`."""
+    root = ET.Element("data")
+    for i in range(max(elements // 6, 1)):
+        country = ET.SubElement(root, "country", name=f"Country {i}")
+        ET.SubElement(country, "rank").text = str(i + 1)
+        ET.SubElement(country, "year").text = "2008"
+        ET.SubElement(country, "gdppc").text = str(141100 - i % 1000)
+        ET.SubElement(country, "neighbor", name=f"Country {i - 1}", direction="W")
+        ET.SubElement(country, "neighbor", name=f"Country {i + 1}", direction="E")
+    return root
+
+
+def benchmark(elements: int, lookups: int = 100) -> Dict[str, float]:
+    """Look up `country` elements by name in a tree of `elements` elements.
+
+    Report the seconds taken to build the index, and the microseconds per lookup with
+    `find()` and with the index.
+    """
+    root = build_countries(elements)
+    countries = len(root)
+    names = [f"Country {i * countries // lookups}" for i in range(lookups)]
+
+    start = time.perf_counter()
+    index = ElementIndex(root, attributes=["name"])
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [root.find(f"country[@name='{name}']") for name in names]
+    find_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.find_by_attribute("country", "name", name) for name in names]
+    index_seconds = time.perf_counter() - start
+
+    if found != indexed:
+        raise AssertionError("lookups differ")
+
+    return {
+        "elements": len(index),
+        "build_seconds": build_seconds,
+        "find_us": find_seconds / lookups * 1e6,
+        "index_us": index_seconds / lookups * 1e6,
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="xml_index", description="Compare ElementIndex lookups with find()"
+    )
+    parser.add_argument("-e", "--elements", type=int, default=1_000_000)
+    parser.add_argument("-l", "--lookups", type=int, default=100)
+    args = parser.parse_args()
+
+    results = benchmark(args.elements, args.lookups)
+    print(f"{results['elements']} elements")
+    print(f"index built in {results['build_seconds']:.3f}s")
+    print(f"find(): {results['find_us']:.1f}us per lookup")
+    print(f"ElementIndex: {results['index_us']:.1f}us per lookup")
+
+
+if __name__ == "__main__":
+    main()
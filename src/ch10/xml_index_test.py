@@ -0,0 +1,109 @@
+"""Indexing elements of an XML tree with `xml_index`."""
+
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from xml_index import (
+    ElementIndex,
+    append_country,
+    benchmark,
+    insert_country,
+    remove_neighbors,
+)
+
+SAMPLE_PATH = Path(__file__).parent.joinpath("elementtree_sample1.xml")
+
+
+@pytest.fixture(name="tree")
+def fixture_tree() -> ET.ElementTree:
+    """Parse `elementtree_sample1.xml`."""
+    return ET.parse(SAMPLE_PATH)
+
+
+def test_lookups(tree: ET.ElementTree) -> None:
+    """Find elements by tag, and by tag and attribute."""
+    index = ElementIndex(tree)
+
+    assert index.findall("country") == tree.findall("country")
+    assert index.findall("neighbor") == tree.findall(".//neighbor")
+    assert index.findall("continent") == []
+    assert len(index) == len(list(tree.iter()))
+
+    panama = index.find_by_attribute("country", "name", "Panama")
+    assert panama is tree.find("country[@name='Panama']")
+    assert index.find_by_attribute("country", "name", "Monaco") is None
+    assert [
+        neighbor.get("name")
+        for neighbor in index.findall_by_attribute("neighbor", "direction", "W")
+    ] == ["Switzerland", "Costa Rica"]
+
+
+def test_parent(tree: ET.ElementTree) -> None:
+    """Find the parent of an element."""
+    index = ElementIndex(tree)
+    colombia = index.find_by_attribute("neighbor", "name", "Colombia")
+    assert colombia is not None
+
+    panama = index.parent(colombia)
+    assert panama is not None and panama.get("name") == "Panama"
+    assert index.parent(panama) is tree.getroot()
+    assert index.parent(tree.getroot()) is None
+
+    with pytest.raises(ValueError):
+        index.parent(ET.Element("country"))
+
+
+def test_selected_attributes(tree: ET.ElementTree) -> None:
+    """Index only some attributes."""
+    index = ElementIndex(tree, attributes=["name"])
+
+    assert index.find_by_attribute("neighbor", "name", "Austria") is not None
+    assert index.findall_by_attribute("neighbor", "direction", "E") == []
+
+
+def test_modify(tree: ET.ElementTree) -> None:
+    """Modify the tree through the index, keeping the index up to date."""
+    index = ElementIndex(tree)
+
+    remove_neighbors(index)
+    assert tree.findall(".//neighbor") == []
+    assert index.findall("neighbor") == []
+    assert index.find_by_attribute("neighbor", "name", "Austria") is None
+
+    monaco = ET.XML('<country name="Monaco"><rank>2</rank></country>')
+    insert_country(index, 1, monaco)
+    malaysia = ET.XML('<country name="Malaysia"><rank>69</rank></country>')
+    append_country(index, malaysia)
+
+    assert [country.get("name") for country in tree.findall("country")] == [
+        "Liechtenstein",
+        "Monaco",
+        "Panama",
+        "Malaysia",
+    ]
+    assert index.find_by_attribute("country", "name", "Monaco") is monaco
+    rank = monaco.find("rank")
+    assert rank is not None and index.parent(rank) is monaco
+    assert len(index.findall("rank")) == 4
+
+    index.set(monaco, "name", "Monaco-Ville")
+    assert monaco.get("name") == "Monaco-Ville"
+    assert index.find_by_attribute("country", "name", "Monaco") is None
+    assert index.find_by_attribute("country", "name", "Monaco-Ville") is monaco
+
+    index.remove(monaco)
+    assert monaco not in index
+    assert rank not in index
+    assert len(index) == len(list(tree.iter()))
+
+    with pytest.raises(ValueError):
+        index.remove(tree.getroot())
+
+
+def test_benchmark() -> None:
+    """Index lookups return the same elements as `find()`."""
+    results = benchmark(6000, lookups=10)
+
+    assert results["elements"] == 6001
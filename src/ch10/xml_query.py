@@ -0,0 +1,409 @@
+"""Compile `ElementTree` path expressions once, and evaluate many in a single walk.
+
+`find()` and `findall()` take a path such as `"country/rank"` or `"people:actor"` and a
+namespace map on every call. `compile_path()` parses the path and resolves its
+prefixes once, into a `Query` that can be reused; compiled queries are kept in an LRU
+cache.
+
+Each query is matched as a small state machine: for every element visited, the state
+is the set of steps of the path matched so far by its ancestors. This lets
+`QueryBatch` evaluate several queries during one depth-first walk of the tree, instead
+of one traversal per query. Parts of the tree that no query can match are not visited.
+
+Supported syntax: `tag`, `*`, `{uri}tag`, `{*}tag`, `{uri}*`, `{}*`, `{*}*`,
+`prefix:tag`, `.`, `//` as the last step, and the predicates `[@attrib]`,
+`[@attrib='value']`, `[tag]`, `[tag='text']` and `[.='text']`. Other paths, such as
+`.//a/b`, for which `findall()` returns the matches of `b` grouped by `a` ancestor,
+rather than in document order, are passed on to `Element.findall()`, and are evaluated
+separately from the walk.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+Namespaces = Optional[Mapping[str, str]]
+Context = Union[ET.Element, ET.ElementTree]
+Predicate = Callable[[ET.Element], bool]
+
+DEFAULT_CACHE_SIZE = 256
+
+# A "/" that is not inside a "{uri}".
+_SPLIT_RE = re.compile(r"/(?![^{]*\})")
+_STEP_RE = re.compile(
+    r"""
+    (?P<tag>\{[^}]*\}[^/\[]+|[^/\[]+)     # tag, with an optional {uri} prefix
+    (?P<predicates>(?:\[[^\]]*\])*)       # any number of [...] predicates
+    """,
+    re.VERBOSE,
+)
+_PREDICATE_RE = re.compile(
+    r"""
+    \[(?:
+        @(?P<attrib>[\w:{}.-]+)(?:=(?P<aquote>['"])(?P<avalue>.*?)(?P=aquote))?
+        |
+        (?P<child>(?!-?\d)[\w:{}.*-]+)(?:=(?P<cquote>['"])(?P<cvalue>.*?)(?P=cquote))?
+    )\]
+    """,
+    re.VERBOSE,
+)
+
+
+class UnsupportedPath(ValueError):
+    """Raised for paths that the query engine does not handle itself."""
+
+
+class Step(NamedTuple):
+    """One step of a path: which elements it matches, and where to look for them."""
+
+    descendant: bool
+    tag_matches: Callable[[object], bool]
+    predicates: Tuple[Predicate, ...]
+
+    def matches(self, elem: ET.Element) -> bool:
+        """Tell whether `elem` matches this step."""
+        return self.tag_matches(elem.tag) and all(
+            predicate(elem) for predicate in self.predicates
+        )
+
+
+def _resolve(name: str, namespaces: Mapping[str, str], attrib: bool = False) -> str:
+    """Expand a `prefix:name`, or an unprefixed tag in the default namespace."""
+    if name.startswith("{") or name == "*":
+        return name
+    if ":" in name:
+        if not namespaces:
+            # As with `findall()`, the name is then compared as is.
+            return name
+        prefix, local = name.split(":", 1)
+        try:
+            return f"{{{namespaces[prefix]}}}{local}"
+        except KeyError:
+            raise SyntaxError(f"prefix {prefix!r} not found in prefix map") from None
+    if namespaces.get("") and not attrib:
+        return f"{{{namespaces['']}}}{name}"
+    return name
+
+
+def _tag_matcher(tag: str) -> Callable[[object], bool]:
+    """Return a function that tells whether an element tag matches `tag`."""
+    if tag == "*":
+        # As with `findall()`, this includes comments and processing instructions.
+        return lambda elem_tag: True
+    if tag == "{*}*":
+        return lambda elem_tag: isinstance(elem_tag, str)
+    if tag == "{}*":
+        # Any tag not in a namespace.
+        return lambda elem_tag: isinstance(elem_tag, str) and elem_tag[:1] != "{"
+    if tag.startswith("{*}"):
+        local = tag[3:]
+        return lambda elem_tag: isinstance(elem_tag, str) and (
+            elem_tag == local or elem_tag.endswith("}" + local)
+        )
+    if tag.startswith("{") and tag.endswith("}*"):
+        # Any tag in the namespace.
+        namespace = tag[:-1]
+        return lambda elem_tag: isinstance(elem_tag, str) and elem_tag.startswith(
+            namespace
+        )
+    if tag.startswith("{}"):
+        tag = tag[2:]
+    return lambda elem_tag: elem_tag == tag
+
+
+def _predicate(match: "re.Match[str]", namespaces: Mapping[str, str]) -> Predicate:
+    """Build a predicate function from a `_PREDICATE_RE` match."""
+    if match["attrib"]:
+        key = _resolve(match["attrib"], namespaces, attrib=True)
+        value = match["avalue"]
+        if value is None:
+            return lambda elem: elem.get(key) is not None
+        return lambda elem: elem.get(key) == value
+
+    text = match["cvalue"]
+    if match["child"] == "." and text is not None:
+        return lambda elem: "".join(elem.itertext()) == text
+    if match["child"].startswith("."):
+        # Not a tag, e.g. `[.]` or `[..]`.
+        raise UnsupportedPath(match[0])
+
+    child_matches = _tag_matcher(_resolve(match["child"], namespaces))
+    if text is None:
+        return lambda elem: any(child_matches(child.tag) for child in elem)
+    return lambda elem: any(
+        child_matches(child.tag) and "".join(child.itertext()) == text
+        for child in elem
+    )
+
+
+def _parse(path: str, namespaces: Mapping[str, str]) -> Tuple[Step, ...]:
+    """Parse `path` into steps, or raise `UnsupportedPath`."""
+    if not path or path.startswith("/") or path.endswith("/"):
+        raise UnsupportedPath(path)
+
+    steps: List[Step] = []
+    descendant = False
+    for part in _SPLIT_RE.split(path):
+        if part == "":
+            if descendant:
+                raise UnsupportedPath(path)
+            descendant = True
+            continue
+        if part == ".":
+            if descendant:
+                raise UnsupportedPath(path)
+            continue
+
+        match = _STEP_RE.fullmatch(part)
+        if match is None or match["tag"] == "..":
+            raise UnsupportedPath(path)
+
+        tag_matches = _tag_matcher(_resolve(match["tag"], namespaces))
+        predicates: List[Predicate] = []
+        predicates_text = match["predicates"]
+        pos = 0
+        while pos < len(predicates_text):
+            predicate_match = _PREDICATE_RE.match(predicates_text, pos)
+            if predicate_match is None:
+                raise UnsupportedPath(path)
+            predicates.append(_predicate(predicate_match, namespaces))
+            pos = predicate_match.end()
+
+        steps.append(Step(descendant, tag_matches, tuple(predicates)))
+        descendant = False
+
+    if descendant or not steps:
+        raise UnsupportedPath(path)
+    # The matches of a `//` step can be nested: `findall()` then returns those of the
+    # following steps grouped by match, possibly more than once, not in document order.
+    if any(step.descendant for step in steps[:-1]):
+        raise UnsupportedPath(path)
+
+    return tuple(steps)
+
+
+class Query:
+    """A compiled path expression."""
+
+    def __init__(self, path: str, namespaces: Namespaces = None) -> None:
+        self.path = path
+        self.namespaces = dict(namespaces or {})
+        try:
+            self.steps: Optional[Tuple[Step, ...]] = _parse(path, self.namespaces)
+        except UnsupportedPath:
+            self.steps = None
+        self._automaton = _Automaton([self.steps]) if self.steps else None
+
+    def iterfind(self, context: Context) -> Iterator[ET.Element]:
+        """Yield the elements matching the query, in document order."""
+        root = context.getroot() if isinstance(context, ET.ElementTree) else context
+        if self._automaton is None:
+            yield from root.iterfind(self.path, self.namespaces)
+            return
+
+        for _, elem in self._automaton.walk(root):
+            yield elem
+
+    def findall(self, context: Context) -> List[ET.Element]:
+        """Return all elements matching the query."""
+        return list(self.iterfind(context))
+
+    def find(self, context: Context) -> Optional[ET.Element]:
+        """Return the first element matching the query, or `None`."""
+        return next(self.iterfind(context), None)
+
+    def findtext(
+        self, context: Context, default: Optional[str] = None
+    ) -> Optional[str]:
+        """Return the text of the first element matching the query, or `default`."""
+        elem = self.find(context)
+        if elem is None:
+            return default
+        return elem.text or ""
+
+    def __repr__(self) -> str:
+        return f"Query({self.path!r}, {self.namespaces!r})"
+
+
+Pair = Tuple[int, int]
+Transition = Tuple[
+    "State", Tuple[int, ...], Tuple[Tuple[Pair, Tuple[Predicate, ...]], ...]
+]
+
+
+class State:
+    """A state of `_Automaton`: what the children of an element must still match.
+
+    States are interned by `_Automaton`, so they compare by identity.
+    """
+
+    __slots__ = ("pairs", "transitions")
+
+    def __init__(self, pairs: FrozenSet[Pair]) -> None:
+        # `(query index, step index)` pairs, for the next step to match in each query.
+        self.pairs = pairs
+        # Memoised transitions, by element tag.
+        self.transitions: Dict[object, Transition] = {}
+
+
+class _Automaton:
+    """Match several queries at once while walking a tree.
+
+    Apart from predicates, the transition from a state on an element depends only on
+    the element tag. Transitions are worked out the first time they are needed, then
+    memoised, so the cost per element is about one `dict` lookup. Predicates are only
+    evaluated for the elements whose tag matches their step.
+    """
+
+    def __init__(self, queries: Sequence[Tuple[Step, ...]]) -> None:
+        self.queries = queries
+        self._states: Dict[FrozenSet[Pair], State] = {}
+        self.start = self._state(
+            frozenset((query_index, 0) for query_index in range(len(queries)))
+        )
+
+    def _state(self, pairs: FrozenSet[Pair]) -> State:
+        """Return the interned state for `pairs`."""
+        state = self._states.get(pairs)
+        if state is None:
+            state = self._states[pairs] = State(pairs)
+        return state
+
+    def _advance(self, pair: Pair, next_pairs: Set[Pair], matched: List[int]) -> None:
+        """Record that the step of `pair` has matched an element."""
+        query_index, step_index = pair
+        if step_index + 1 < len(self.queries[query_index]):
+            next_pairs.add((query_index, step_index + 1))
+        elif query_index not in matched:
+            matched.append(query_index)
+
+    def _transition(self, state: State, tag: object) -> Transition:
+        """Work out, and memoise, the transition from `state` on an element `tag`.
+
+        Pairs whose step matches `tag` but has predicates are returned separately, to
+        be checked against each element.
+        """
+        next_pairs: Set[Pair] = set()
+        matched: List[int] = []
+        checks: List[Tuple[Pair, Tuple[Predicate, ...]]] = []
+        for pair in sorted(state.pairs):
+            step = self.queries[pair[0]][pair[1]]
+            if step.descendant:
+                next_pairs.add(pair)
+            if step.tag_matches(tag):
+                if step.predicates:
+                    checks.append((pair, step.predicates))
+                else:
+                    self._advance(pair, next_pairs, matched)
+
+        transition = (self._state(frozenset(next_pairs)), tuple(matched), tuple(checks))
+        state.transitions[tag] = transition
+        return transition
+
+    def _checked(
+        self, state: State, tag: object, passed: Tuple[Pair, ...]
+    ) -> Tuple[State, Tuple[int, ...]]:
+        """Work out, and memoise, the transition from `state` on an element `tag`
+        for which the predicates of the steps of `passed` hold.
+        """
+        key = (tag, passed)
+        transition = state.transitions.get(key)
+        if transition is None:
+            next_state, matched, _ = state.transitions[tag]
+            next_pairs = set(next_state.pairs)
+            all_matched = list(matched)
+            for pair in passed:
+                self._advance(pair, next_pairs, all_matched)
+            transition = (self._state(frozenset(next_pairs)), tuple(all_matched), ())
+            state.transitions[key] = transition
+        return transition[0], transition[1]
+
+    def walk(self, root: ET.Element) -> Iterator[Tuple[int, ET.Element]]:
+        """Yield `(query index, element)` for each element matching each query.
+
+        Elements are visited depth first; a subtree is skipped when no query can match
+        anything inside it.
+        """
+        stack: List[Tuple[Iterator[ET.Element], State]] = [(iter(root), self.start)]
+        while stack:
+            children, state = stack[-1]
+            transitions = state.transitions
+            for elem in children:
+                transition = transitions.get(elem.tag)
+                if transition is None:
+                    transition = self._transition(state, elem.tag)
+                next_state, matched, checks = transition
+                if checks:
+                    passed = tuple(
+                        pair
+                        for pair, predicates in checks
+                        if all(predicate(elem) for predicate in predicates)
+                    )
+                    if passed:
+                        next_state, matched = self._checked(state, elem.tag, passed)
+
+                for query_index in matched:
+                    yield query_index, elem
+                if next_state.pairs and len(elem):
+                    stack.append((iter(elem), next_state))
+                    break
+            else:
+                stack.pop()
+
+
+@lru_cache(maxsize=DEFAULT_CACHE_SIZE)
+def _compile(path: str, namespace_items: Tuple[Tuple[str, str], ...]) -> Query:
+    return Query(path, dict(namespace_items))
+
+
+def compile_path(path: str, namespaces: Namespaces = None) -> Query:
+    """Return the compiled `Query` for `path` and `namespaces`, from the LRU cache."""
+    return _compile(path, tuple(sorted((namespaces or {}).items())))
+
+
+compile_cache_info = _compile.cache_info
+compile_cache_clear = _compile.cache_clear
+
+
+class QueryBatch:
+    """Several named queries, evaluated together in one walk of the tree."""
+
+    def __init__(self, paths: Mapping[str, str], namespaces: Namespaces = None) -> None:
+        self.queries: Dict[str, Query] = {
+            name: compile_path(path, namespaces) for name, path in paths.items()
+        }
+        self._walked: List[Tuple[str, Tuple[Step, ...]]] = [
+            (name, query.steps)
+            for name, query in self.queries.items()
+            if query.steps is not None
+        ]
+        self._automaton = _Automaton([steps for _, steps in self._walked])
+
+    def findall(self, context: Context) -> Dict[str, List[ET.Element]]:
+        """Return the elements matching each query, by query name."""
+        root = context.getroot() if isinstance(context, ET.ElementTree) else context
+        results: Dict[str, List[ET.Element]] = {name: [] for name in self.queries}
+
+        appends = [results[name].append for name, _ in self._walked]
+        for query_index, elem in self._automaton.walk(root):
+            appends[query_index](elem)
+
+        for name, query in self.queries.items():
+            if query.steps is None:
+                results[name] = query.findall(root)
+
+        return results
@@ -0,0 +1,208 @@
+"""Compiled and batched `ElementTree` queries with `xml_query`."""
+
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Optional
+
+import pytest
+
+from xml_query import (
+    Query,
+    QueryBatch,
+    compile_cache_clear,
+    compile_cache_info,
+    compile_path,
+)
+
+SAMPLE1_PATH = Path(__file__).parent.joinpath("elementtree_sample1.xml")
+SAMPLE2_PATH = Path(__file__).parent.joinpath("elementtree_sample2.xml")
+
+NAMESPACES = {
+    "people": "http://people.example.com",
+    "role": "http://characters.example.com",
+}
+
+
+@pytest.fixture(name="tree1")
+def fixture_tree1() -> ET.ElementTree:
+    """Parse `elementtree_sample1.xml`, with a comment added."""
+    with open(SAMPLE1_PATH) as xml_file:
+        tree = ET.parse(xml_file)
+    tree.getroot().insert(0, ET.Comment("GDP per capita ranking"))
+    return tree
+
+
+@pytest.fixture(name="tree2")
+def fixture_tree2() -> ET.ElementTree:
+    """Parse `elementtree_sample2.xml`."""
+    with open(SAMPLE2_PATH) as xml_file:
+        return ET.parse(xml_file)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "country",
+        "country/rank",
+        ".//neighbor",
+        "./country/neighbor",
+        "*",
+        "*/*",
+        ".//*",
+        "country//neighbor",
+        "country[@name]",
+        "country[@name='Panama']/gdppc",
+        "country/neighbor[@direction='W']",
+        ".//neighbor[@name][@direction='E']",
+        "country[year]",
+        "country[year='2011']",
+        "country[rank='1']/year",
+        "missing",
+        ".",
+        "country[1]",
+        "country/..",
+        "{}*",
+        "{*}*",
+        "{urn:a}*",
+        "country/year[.='2008']",
+        "country/*[.='2008']",
+        "country[year][.='2008']",
+        ".//country//neighbor",
+    ],
+)
+def test_same_as_findall(path: str, tree1: ET.ElementTree) -> None:
+    """Queries return the same elements as `findall()`."""
+    query = Query(path)
+
+    assert query.findall(tree1) == tree1.findall(path)
+    assert query.find(tree1) is tree1.find(path)
+
+    country = tree1.getroot()[1]
+    assert query.findall(country) == country.findall(path)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "people:actor",
+        "people:actor/people:name",
+        "people:actor/role:character",
+        ".//role:character",
+        "{http://people.example.com}actor",
+        ".//{http://characters.example.com}character",
+        "{*}actor/{*}name",
+        "people:*",
+        "{http://people.example.com}*",
+        "{*}*",
+        "{}*",
+        "*/{*}*",
+        "people:actor[people:name='Eric Idle']/role:character",
+    ],
+)
+def test_same_as_findall_namespaces(path: str, tree2: ET.ElementTree) -> None:
+    """Queries with namespaces return the same elements as `findall()`."""
+    query = compile_path(path, NAMESPACES)
+
+    assert query.steps is not None
+    assert query.findall(tree2) == tree2.findall(path, NAMESPACES)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        ".//x/y",
+        ".//x//y",
+        "x//y",
+        "{urn:a}*",
+        "{}*",
+        "*/{urn:a}*",
+        ".//z[.='hello']",
+        "x[z='hello']",
+    ],
+)
+def test_same_as_findall_nested(path: str) -> None:
+    """Paths are evaluated as by `findall()` with nested and namespaced elements.
+
+    `findall()` returns the matches of the steps after a `//` step grouped by its
+    matches, and repeated if they are nested: such paths are passed on to it.
+    """
+    root = ET.fromstring(
+        "<r><x><x><y>1</y></x><y>2</y><z>hello</z></x><a xmlns='urn:a'><b/></a></r>"
+    )
+    query = Query(path)
+
+    assert query.findall(root) == root.findall(path)
+    assert (query.steps is None) == (path in {".//x/y", ".//x//y"})
+
+
+def test_default_namespace(tree2: ET.ElementTree) -> None:
+    """Unprefixed tags are in the default namespace, if there is one."""
+    namespaces = {"": "http://people.example.com"}
+
+    assert Query("actor/name", namespaces).findall(tree2) == tree2.findall(
+        "actor/name", namespaces
+    )
+
+
+def test_unknown_prefix() -> None:
+    """A prefix missing from the namespaces is an error."""
+    with pytest.raises(SyntaxError):
+        Query("people:actor", {"role": "http://characters.example.com"})
+
+
+@pytest.mark.parametrize("namespaces", [None, {}])
+def test_prefix_without_namespaces(
+    tree2: ET.ElementTree, namespaces: Optional[Dict[str, str]]
+) -> None:
+    """Without namespaces, prefixed tags are compared as is, as by `findall()`."""
+    assert Query("people:actor", namespaces).findall(tree2) == []
+
+    root = ET.Element("root")
+    elem = ET.SubElement(root, "people:actor")
+    assert Query("people:actor", namespaces).findall(root) == [elem]
+    assert root.findall("people:actor") == [elem]
+
+
+def test_findtext(tree1: ET.ElementTree) -> None:
+    """Get the text of the first matching element."""
+    country = tree1.getroot()[1]
+
+    assert Query("rank").findtext(country) == "1"
+    assert Query("missing").findtext(country, "none") == "none"
+
+
+def test_compile_cache() -> None:
+    """Compiled queries are reused from the cache."""
+    compile_cache_clear()
+
+    query = compile_path("people:actor", NAMESPACES)
+    assert compile_path("people:actor", dict(reversed(NAMESPACES.items()))) is query
+    assert compile_path("people:actor", {"people": "urn:other"}) is not query
+
+    cache_info = compile_cache_info()
+    assert (cache_info.hits, cache_info.misses) == (1, 2)
+
+
+def test_batch(tree1: ET.ElementTree) -> None:
+    """Evaluate several queries in one walk."""
+    paths = {
+        "countries": "country",
+        "ranks": "country/rank",
+        "neighbors": ".//neighbor",
+        "west": "country/neighbor[@direction='W']",
+        "first": "country[1]",
+    }
+
+    results = QueryBatch(paths).findall(tree1)
+
+    assert results == {name: tree1.findall(path) for name, path in paths.items()}
+
+
+def test_batch_namespaces(tree2: ET.ElementTree) -> None:
+    """Evaluate several queries with namespaces in one walk."""
+    results = QueryBatch(
+        {"names": "people:actor/people:name", "roles": ".//role:character"}, NAMESPACES
+    ).findall(tree2)
+
+    assert [name.text for name in results["names"]] == ["John Cleese", "Eric Idle"]
+    assert len(results["roles"]) == 5
@@ -0,0 +1,195 @@
+"""Extract records from large XML documents without building the whole tree.
+
+`ET.parse()` and `ET.fromstring()` build a tree of the whole document in memory.
+`ET.iterparse()` and `ET.XMLPullParser` instead report each element as soon as it has
+been parsed. Once a record element has been turned into a record, it is removed from
+its parent, so only the record being parsed is held in memory.
+
+The records here are the `country` elements of documents like
+`elementtree_sample1.xml`.
+
+Run as a script to compare with `tree.findall(".//neighbor")` on a generated document:
+
+    python xml_stream.py --countries 5000000
+"""
+
+import argparse
+import resource
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    IO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+    cast,
+)
+
+Source = Union[str, Path, IO[bytes]]
+
+
+class Neighbor(NamedTuple):
+    """A `neighbor` element."""
+
+    name: Optional[str]
+    direction: Optional[str]
+
+
+class Country(NamedTuple):
+    """A `country` element, with the text of its child elements."""
+
+    name: Optional[str]
+    rank: Optional[str]
+    year: Optional[str]
+    gdppc: Optional[str]
+    neighbors: List[Neighbor]
+
+
+def to_country(elem: ET.Element) -> Country:
+    """Convert a `country` element to a `Country`."""
+    return Country(
+        name=elem.get("name"),
+        rank=elem.findtext("rank"),
+        year=elem.findtext("year"),
+        gdppc=elem.findtext("gdppc"),
+        neighbors=[
+            Neighbor(neighbor.get("name"), neighbor.get("direction"))
+            for neighbor in elem.iterfind("neighbor")
+        ],
+    )
+
+
+class _ChunkReader:
+    """A file-like object reading the chunks of an iterable, one per `read()`."""
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]]) -> None:
+        self._chunks = iter(chunks)
+
+    def read(self, size: int = -1) -> Union[bytes, str]:
+        # An empty chunk would be taken for the end of the document.
+        for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b""
+
+
+def iter_elements(source: Source, tag: str) -> Iterator[ET.Element]:
+    """Yield each complete `tag` element of the XML document in `source`.
+
+    A yielded element is only valid until the next one is requested: it is then
+    cleared and removed from its parent to free memory. Other children of the root
+    element are also cleared and removed once complete. `tag` elements must not be
+    nested inside each other.
+    """
+    parents: List[ET.Element] = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if elem.tag == tag:
+            yield elem
+        elif len(parents) != 1:
+            # Part of a `tag` element, or of a child of the root still being parsed.
+            continue
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+
+def iter_countries(source: Source) -> Iterator[Country]:
+    """Yield each `country` in the XML document in `source`."""
+    return map(to_country, iter_elements(source, "country"))
+
+
+def iter_countries_from_chunks(
+    chunks: Iterable[Union[bytes, str]]
+) -> Iterator[Country]:
+    """Yield each `country` in an XML document received in pieces.
+
+    `iterparse()` feeds its `ET.XMLPullParser` with what `read()` returns: each chunk,
+    as it arrives, e.g. from a socket.
+    """
+    return iter_countries(cast(IO[bytes], _ChunkReader(chunks)))
+
+
+def write_countries(path: Union[str, Path], countries: int) -> None:
+    """Write an XML document with `countries` `country` elements."""
+    with open(path, "w", encoding="utf-8") as xml_file:
+        xml_file.write('<?xml version="1.0"?>\n<data>\n')
+        for i in range(countries):
+            xml_file.write(
+                f"""\
+    <country name="Country {i}">
+        <rank>{i + 1}</rank>
+        <year>2008</year>
+        <gdppc>{141100 - i % 1000}</gdppc>
+        <neighbor name="Country {i - 1}" direction="W" />
+        <neighbor name="Country {i + 1}" direction="E" />
+    </country>
+"""
+            )
+        xml_file.write("</data>\n")
+
+
+def _count_neighbors_tree(path: str) -> int:
+    return len(ET.parse(path).findall(".//neighbor"))
+
+
+def _count_neighbors_stream(path: str) -> int:
+    return sum(len(country.neighbors) for country in iter_countries(path))
+
+
+_COUNTERS = {"tree": _count_neighbors_tree, "stream": _count_neighbors_stream}
+
+
+def _measure(counter: str, path: str) -> Dict[str, float]:
+    """Count neighbors using `counter`, and report the time taken and peak RSS."""
+    start = time.perf_counter()
+    neighbors = _COUNTERS[counter](path)
+    return {
+        "neighbors": neighbors,
+        "seconds": time.perf_counter() - start,
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def benchmark(path: Union[str, Path]) -> Dict[str, Dict[str, float]]:
+    """Count the `neighbor` elements at `path` with `findall()` and by streaming.
+
+    Each approach runs in a fresh process, so that its peak RSS is its own.
+    """
+    results = {}
+    for counter in _COUNTERS:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results[counter] = executor.submit(_measure, counter, str(path)).result()
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="xml_stream", description="Compare streaming XML parsing with ET.parse"
+    )
+    parser.add_argument("-c", "--countries", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        xml_path = Path(tmp_dir).joinpath("countries.xml")
+        write_countries(xml_path, args.countries)
+        print(f"{xml_path.stat().st_size} bytes")
+        for counter, result in benchmark(xml_path).items():
+            print(counter, result)
+
+
+if __name__ == "__main__":
+    main()
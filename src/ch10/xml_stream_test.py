@@ -0,0 +1,93 @@
+"""Streaming records out of XML documents with `xml_stream`."""
+
+import tracemalloc
+from pathlib import Path
+
+from xml_stream import (
+    Country,
+    Neighbor,
+    benchmark,
+    iter_countries,
+    iter_countries_from_chunks,
+    iter_elements,
+    write_countries,
+)
+
+SAMPLE_PATH = Path(__file__).parent.joinpath("elementtree_sample1.xml")
+
+SAMPLE_COUNTRIES = [
+    Country(
+        "Liechtenstein",
+        "1",
+        "2008",
+        "141100",
+        [Neighbor("Austria", "E"), Neighbor("Switzerland", "W")],
+    ),
+    Country(
+        "Panama",
+        "68",
+        "2011",
+        "13600",
+        [Neighbor("Costa Rica", "W"), Neighbor("Colombia", "E")],
+    ),
+]
+
+
+def test_iter_countries() -> None:
+    """Stream `country` records from a file."""
+    assert list(iter_countries(SAMPLE_PATH)) == SAMPLE_COUNTRIES
+
+    with open(SAMPLE_PATH, "rb") as xml_file:
+        assert list(iter_countries(xml_file)) == SAMPLE_COUNTRIES
+
+
+def test_iter_countries_from_chunks() -> None:
+    """Stream `country` records from a document fed in small pieces."""
+    data = SAMPLE_PATH.read_bytes()
+    chunks = (data[i:i + 10] for i in range(0, len(data), 10))
+
+    assert list(iter_countries_from_chunks(chunks)) == SAMPLE_COUNTRIES
+
+    text = data.decode()
+    chunks_text = ["", *(text[i:i + 10] for i in range(0, len(text), 10))]
+    assert list(iter_countries_from_chunks(chunks_text)) == SAMPLE_COUNTRIES
+
+
+def test_iter_elements_removes_processed() -> None:
+    """Processed elements are cleared and removed from their parent."""
+    root = None
+    for elem in iter_elements(SAMPLE_PATH, "neighbor"):
+        assert elem.get("name")
+        root = elem
+
+    # The last yielded element was cleared after the generator resumed.
+    assert root is not None
+    assert root.attrib == {}
+
+
+def test_bounded_memory(tmp_path: Path) -> None:
+    """Peak memory use does not grow with the number of countries."""
+
+    def peak_memory(countries: int, tag: str) -> int:
+        xml_path = tmp_path.joinpath(f"countries{countries}.xml")
+        write_countries(xml_path, countries)
+
+        tracemalloc.start()
+        try:
+            assert sum(1 for _ in iter_elements(xml_path, tag)) == countries
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak_memory(2000, "country") < 2 * peak_memory(200, "country")
+    # The `country` elements are removed once complete, though they are not yielded.
+    assert peak_memory(2000, "rank") < 2 * peak_memory(200, "rank")
+
+
+def test_benchmark(tmp_path: Path) -> None:
+    """Both approaches count the same number of neighbors."""
+    xml_path = tmp_path.joinpath("countries.xml")
+    write_countries(xml_path, 50)
+
+    results = benchmark(xml_path)
+    assert results["tree"]["neighbors"] == results["stream"]["neighbors"] == 100
@@ -0,0 +1,368 @@
+"""Write large XML documents incrementally, without building a tree.
+
+`ET.ElementTree.write()` serialises a complete tree, so every element of the document
+must be in memory before anything is written. `XMLWriter` writes start tags, text and
+end tags as they are produced, and only remembers the elements that are still open.
+Its output is collected in a buffer and written to the file in large pieces.
+
+Without indentation or namespaces, the output is the same as `ET.ElementTree.write()`.
+
+Run as a script to compare with `ET.ElementTree.write()`:
+
+    python xml_writer.py --countries 1000000
+"""
+
+import argparse
+import filecmp
+import resource
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import TracebackType
+from typing import Dict, List, Mapping, Optional, TextIO, Tuple, Type
+
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+def _escape_text(text: str) -> str:
+    """Escape text content, as `ElementTree` does."""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _escape_attribute(value: str) -> str:
+    """Escape an attribute value, as `ElementTree` does."""
+    value = _escape_text(value)
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    if "\r" in value:
+        value = value.replace("\r", "&#13;")
+    if "\n" in value:
+        value = value.replace("\n", "&#10;")
+    if "\t" in value:
+        value = value.replace("\t", "&#09;")
+    return value
+
+
+class _Open:
+    """An element that has been started but not ended."""
+
+    __slots__ = ("tag", "name", "declared", "has_children", "has_text")
+
+    def __init__(self, tag: str, name: str, declared: List[Tuple[str, Optional[str]]]):
+        self.tag = tag
+        self.name = name
+        # `(URI, previous prefix)` for each namespace declared on this element.
+        self.declared = declared
+        self.has_children = False
+        self.has_text = False
+
+
+class XMLWriter:
+    """Write an XML document to a text file, one piece at a time.
+
+    Tags and attribute names in a namespace are given as `{uri}local`, as in
+    `ElementTree`. `namespaces` maps prefixes to the URIs to declare on the root
+    element; the prefix `""` is for the default namespace. Other namespaces are
+    declared where they are first used, with generated prefixes.
+
+    With `indent`, each child element is written on a new line, indented by `indent`
+    per level, except in elements that contain text.
+    """
+
+    def __init__(
+        self,
+        file: TextIO,
+        xml_declaration: bool = True,
+        indent: Optional[str] = None,
+        namespaces: Optional[Mapping[str, str]] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ) -> None:
+        self.file = file
+        self.indent = indent
+        self.buffer_size = buffer_size
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._open: List[_Open] = []
+        # Whether the last start tag still lacks its closing `>`.
+        self._start_pending = False
+        self._root_written = False
+        self._root_namespaces = dict(namespaces or {})
+        # The prefix currently bound to each namespace URI.
+        self._prefixes: Dict[str, str] = {}
+        self._generated = 0
+
+        if xml_declaration:
+            encoding = getattr(file, "encoding", None) or "utf-8"
+            self._write(f"<?xml version='1.0' encoding='{encoding}'?>\n")
+
+    def _write(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def _declare(
+        self, uri: str, prefix: str, declared: List[Tuple[str, Optional[str]]]
+    ) -> None:
+        declared.append((uri, self._prefixes.get(uri)))
+        self._prefixes[uri] = prefix
+
+    def _qualify(
+        self, name: str, attribute: bool, declared: List[Tuple[str, Optional[str]]]
+    ) -> str:
+        """Return the qualified name for `name`, declaring its namespace if needed."""
+        if name[:1] != "{":
+            if not attribute and "" in self._prefixes.values():
+                raise ValueError(f"{name!r} is not in the default namespace")
+            return name
+
+        uri, local = name[1:].split("}", 1)
+        prefix = self._prefixes.get(uri)
+        # Unprefixed attributes are in no namespace, rather than the default one.
+        if prefix is None or (attribute and prefix == ""):
+            in_use = set(self._prefixes.values())
+            while prefix is None or prefix in in_use:
+                prefix = f"ns{self._generated}"
+                self._generated += 1
+            self._declare(uri, prefix, declared)
+        return f"{prefix}:{local}" if prefix else local
+
+    def _close_start(self) -> None:
+        if self._start_pending:
+            self._write(">")
+            self._start_pending = False
+
+    def _child_indent(self) -> None:
+        """Prepare to write a child of the innermost open element."""
+        self._close_start()
+        if self._open:
+            parent = self._open[-1]
+            parent.has_children = True
+            if self.indent is not None and not parent.has_text:
+                self._write("\n" + self.indent * len(self._open))
+
+    def _start_tag(
+        self, tag: str, attrib: Mapping[str, str]
+    ) -> Tuple[str, str, List[Tuple[str, Optional[str]]]]:
+        """Return the qualified name, the start tag without its closing `>`, and the
+        namespaces declared, for a `tag` element.
+        """
+        if not self._open and self._root_written:
+            raise ValueError("a document has only one root element")
+
+        declared: List[Tuple[str, Optional[str]]] = []
+        if not self._root_written:
+            self._root_written = True
+            for prefix, uri in self._root_namespaces.items():
+                self._declare(uri, prefix, declared)
+        name = self._qualify(tag, False, declared)
+        attributes = [
+            (self._qualify(key, True, declared), value)
+            for key, value in attrib.items()
+        ]
+
+        parts = ["<", name]
+        for uri, _ in declared:
+            prefix = self._prefixes[uri]
+            parts.append(f' xmlns:{prefix}="' if prefix else ' xmlns="')
+            parts.extend((_escape_attribute(uri), '"'))
+        for key, value in attributes:
+            parts.extend((" ", key, '="', _escape_attribute(value), '"'))
+        return name, "".join(parts), declared
+
+    def _undeclare(self, declared: List[Tuple[str, Optional[str]]]) -> None:
+        """Restore the prefixes in use before `declared` were declared."""
+        for uri, prefix in reversed(declared):
+            if prefix is None:
+                del self._prefixes[uri]
+            else:
+                self._prefixes[uri] = prefix
+
+    def start(
+        self, tag: str, attrib: Optional[Mapping[str, str]] = None, **extra: str
+    ) -> None:
+        """Write the start tag of a `tag` element, with attributes `attrib`, `extra`."""
+        self._child_indent()
+        name, start_tag, declared = self._start_tag(tag, {**(attrib or {}), **extra})
+        self._write(start_tag)
+        self._start_pending = True
+        self._open.append(_Open(tag, name, declared))
+
+    def data(self, text: str) -> None:
+        """Write `text` as the content of the innermost open element."""
+        if not text:
+            return
+        if not self._open:
+            raise ValueError("text must be inside the root element")
+        self._close_start()
+        self._open[-1].has_text = True
+        self._write(_escape_text(text))
+
+    def end(self, tag: Optional[str] = None) -> None:
+        """Write the end tag of the innermost open element, which must be `tag`."""
+        if not self._open:
+            raise ValueError("no element to end")
+        elem = self._open[-1]
+        if tag is not None and tag != elem.tag:
+            raise ValueError(f"end tag {tag!r} does not match {elem.tag!r}")
+        self._open.pop()
+
+        if self._start_pending:
+            self._write(" />")
+            self._start_pending = False
+        else:
+            if self.indent is not None and elem.has_children and not elem.has_text:
+                self._write("\n" + self.indent * len(self._open))
+            self._write(f"</{elem.name}>")
+        self._undeclare(elem.declared)
+
+    def element(
+        self,
+        tag: str,
+        text: Optional[str] = None,
+        attrib: Optional[Mapping[str, str]] = None,
+        **extra: str,
+    ) -> None:
+        """Write a complete `tag` element, containing `text` only."""
+        self._child_indent()
+        name, start_tag, declared = self._start_tag(tag, {**(attrib or {}), **extra})
+        if text:
+            self._write(f"{start_tag}>{_escape_text(text)}</{name}>")
+        else:
+            self._write(start_tag + " />")
+        self._undeclare(declared)
+
+    def comment(self, text: str) -> None:
+        """Write a comment."""
+        self._child_indent()
+        self._write(f"<!--{text}-->")
+
+    def write_element(self, elem: ET.Element) -> None:
+        """Write `elem`, an `ElementTree` element, and its subtree, except its tail."""
+        # The factories of comments and processing instructions are their tags.
+        tag: object = elem.tag
+        if tag is ET.Comment:
+            self.comment(elem.text or "")
+        elif tag is ET.ProcessingInstruction:
+            self._child_indent()
+            self._write(f"<?{elem.text}?>")
+        else:
+            self.start(elem.tag, elem.attrib)
+            if elem.text:
+                self.data(elem.text)
+            for child in elem:
+                self.write_element(child)
+                if child.tail:
+                    self.data(child.tail)
+            self.end()
+
+    def flush(self) -> None:
+        """Write the buffer out to the file."""
+        if self._buffer:
+            self.file.write("".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+    def close(self) -> None:
+        """End all open elements, and write the buffer out to the file."""
+        while self._open:
+            self.end()
+        self.flush()
+
+    def __enter__(self) -> "XMLWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.flush()
+
+
+def _write_tree(path: str, countries: int) -> None:
+    root = ET.Element("data")
+    for i in range(countries):
+        country = ET.SubElement(root, "country", name=f"Country {i}")
+        ET.SubElement(country, "rank").text = str(i + 1)
+        ET.SubElement(country, "year").text = "2008"
+        ET.SubElement(country, "gdppc").text = str(141100 - i % 1000)
+        ET.SubElement(country, "neighbor", name=f"Country {i - 1}", direction="W")
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def _write_stream(path: str, countries: int) -> None:
+    with open(path, "w", encoding="utf-8") as xml_file:
+        with XMLWriter(xml_file) as writer:
+            writer.start("data")
+            for i in range(countries):
+                writer.start("country", name=f"Country {i}")
+                writer.element("rank", str(i + 1))
+                writer.element("year", "2008")
+                writer.element("gdppc", str(141100 - i % 1000))
+                writer.element("neighbor", name=f"Country {i - 1}", direction="W")
+                writer.end()
+
+
+_WRITERS = {"ElementTree.write": _write_tree, "XMLWriter": _write_stream}
+
+
+def _measure(writer: str, path: str, countries: int) -> Dict[str, float]:
+    """Write with `writer`, and report the time taken and peak RSS."""
+    start = time.perf_counter()
+    _WRITERS[writer](path, countries)
+    return {
+        "seconds": time.perf_counter() - start,
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def benchmark(countries: int) -> Dict[str, Dict[str, float]]:
+    """Write a document of `countries` `country` elements with each writer.
+
+    Each writer runs in a fresh process, so that its peak RSS is its own. Raise
+    `AssertionError` if the documents are not identical.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths: List[str] = []
+        for writer in _WRITERS:
+            path = str(Path(tmp_dir).joinpath(f"{len(paths)}.xml"))
+            paths.append(path)
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(_measure, writer, path, countries).result()
+            result["countries_per_second"] = countries / result["seconds"]
+            results[writer] = result
+
+        if not filecmp.cmp(paths[0], paths[1], shallow=False):
+            raise AssertionError("documents differ")
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="xml_writer", description="Compare XMLWriter with ElementTree.write"
+    )
+    parser.add_argument("-c", "--countries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    for writer, result in benchmark(args.countries).items():
+        print(writer, result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Writing XML documents incrementally with `xml_writer`."""
+
+import io
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+from xml_compare import find_difference
+from xml_writer import XMLWriter, benchmark
+
+
+def test_write(tmp_path: Path) -> None:
+    """Write the same document as `ET.ElementTree.write()`."""
+    root = ET.fromstring(
+        '<data><country name="Liechtenstein"><rank>1</rank><year/>'
+        '<note a="&quot;1&quot; &lt; 2">Fish &amp; chips</note>tail</country></data>'
+    )
+    expected_path = tmp_path.joinpath("expected.xml")
+    ET.ElementTree(root).write(expected_path, "UTF-8", True)
+
+    written_path = tmp_path.joinpath("written.xml")
+    with open(written_path, "w", encoding="UTF-8") as xml_file:
+        with XMLWriter(xml_file) as writer:
+            writer.start("data")
+            writer.start("country", {"name": "Liechtenstein"})
+            writer.element("rank", "1")
+            writer.element("year")
+            writer.element("note", "Fish & chips", a='"1" < 2')
+            writer.data("tail")
+
+    assert written_path.read_text() == expected_path.read_text()
+
+    # Subtrees can be written from existing elements.
+    output = io.StringIO()
+    with XMLWriter(output) as writer:
+        writer.write_element(root)
+    assert output.getvalue().endswith(ET.tostring(root, encoding="unicode"))
+
+
+def test_indent() -> None:
+    """Write each child element on a new line."""
+    output = io.StringIO()
+    with XMLWriter(output, xml_declaration=False, indent="  ") as writer:
+        writer.start("data")
+        writer.comment(" GDP per capita ranking ")
+        writer.start("country", name="Liechtenstein")
+        writer.element("rank", "1")
+        writer.start("note")
+        writer.data("Mixed ")
+        writer.element("b", "content")
+        writer.end("note")
+
+    assert (
+        output.getvalue()
+        == """\
+<data>
+  <!-- GDP per capita ranking -->
+  <country name="Liechtenstein">
+    <rank>1</rank>
+    <note>Mixed <b>content</b></note>
+  </country>
+</data>"""
+    )
+
+
+def test_namespaces() -> None:
+    """Declare namespaces on the root element, or where they are first used."""
+    people = "http://people.example.com"
+    role = "http://characters.example.com"
+    output = io.StringIO()
+    with XMLWriter(output, xml_declaration=False, namespaces={"": people}) as writer:
+        writer.start(f"{{{people}}}actors")
+        for _ in range(2):
+            writer.start(f"{{{people}}}actor", {f"{{{people}}}id": "1"})
+            writer.element(f"{{{people}}}name", "John Cleese")
+            writer.element(f"{{{role}}}character", "Lancelot")
+            writer.end()
+
+    xml_data = output.getvalue()
+    assert xml_data.startswith(
+        '<actors xmlns="http://people.example.com">'
+        '<actor xmlns:ns0="http://people.example.com" ns0:id="1"><ns0:name>John'
+        ' Cleese</ns0:name><ns1:character xmlns:ns1="http://characters.example.com">'
+        "Lancelot</ns1:character></actor>"
+    )
+
+    expected = ET.Element(f"{{{people}}}actors")
+    for _ in range(2):
+        actor = ET.SubElement(expected, f"{{{people}}}actor", {f"{{{people}}}id": "1"})
+        ET.SubElement(actor, f"{{{people}}}name").text = "John Cleese"
+        ET.SubElement(actor, f"{{{role}}}character").text = "Lancelot"
+    assert find_difference(xml_data, expected) is None
+
+
+def test_errors() -> None:
+    """Reject documents that are not well formed."""
+    writer = XMLWriter(io.StringIO(), namespaces={"": "http://people.example.com"})
+    with pytest.raises(ValueError):
+        writer.data("text")
+    with pytest.raises(ValueError):
+        writer.start("actors")
+
+    writer = XMLWriter(io.StringIO())
+    writer.start("data")
+    with pytest.raises(ValueError):
+        writer.end("country")
+    writer.end("data")
+    with pytest.raises(ValueError):
+        writer.start("data")
+    with pytest.raises(ValueError):
+        writer.end()
+
+
+def test_bounded_buffer() -> None:
+    """Output is written to the file once the buffer is full."""
+    output = io.StringIO()
+    writer = XMLWriter(output, buffer_size=1024)
+    writer.start("data")
+    for i in range(1000):
+        writer.element("country", name=f"Country {i}")
+        assert len(output.getvalue()) > i * 25 - 1024
+
+    writer.close()
+    assert ET.fromstring(output.getvalue()).findall("country")[-1].get("name") == (
+        "Country 999"
+    )
+
+
+def test_benchmark() -> None:
+    """Both writers produce the same document."""
+    results = benchmark(100)
+
+    assert set(results) == {"ElementTree.write", "XMLWriter"}
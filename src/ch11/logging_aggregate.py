@@ -0,0 +1,351 @@
+"""Aggregate the records of several processes into one rotating file.
+
+`logging_config.json` configures logging per process: worker processes each writing
+to `logging_config.log` would rotate the file under each other. Instead:
+
+- a `LogListener` process receives records on a local TCP socket, one thread per
+  connection, and writes them to a `BatchingRotatingFileHandler`, formatted by a
+  `CompiledFormatter`
+- worker processes log through a `BatchingSocketHandler`, which sends the records as
+  `logging.handlers.SocketHandler` does, pickled and prefixed by their length, but
+  `batch_size` at a time, in a single `send()`, or as soon as a record at
+  `flush_level` or higher is logged
+
+Workers must close their handler, or call `logging.shutdown()`, before exiting, since
+`multiprocessing` does not, so that their last records are sent.
+
+Records are unpickled by the listener: it only listens on the loopback interface, and
+must only be reachable by trusted processes.
+
+Run as a script to compare with a file per process:
+
+    python logging_aggregate.py --processes 4 --records 50000
+"""
+
+import argparse
+import logging
+import logging.handlers
+import multiprocessing
+import pickle
+import selectors
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from functools import partial
+from multiprocessing.connection import Connection
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from logging_formatter import CompiledFormatter
+from logging_rotating import BatchingRotatingFileHandler
+
+DEFAULT_FORMAT = (
+    "%(asctime)s %(levelname)-8s %(processName)s %(module)s [%(thread)d]: %(message)s"
+)
+DEFAULT_DATEFMT = "%d/%m/%Y %H:%M:%S"
+DEFAULT_BATCH_SIZE = 100
+
+_LENGTH = struct.Struct(">L")
+
+
+class BatchingSocketHandler(logging.handlers.SocketHandler):
+    """Send records to a socket as `SocketHandler` does, `batch_size` at a time.
+
+    Records are buffered until `batch_size` of them are, or one at `flush_level` or
+    higher is handled, or the handler is flushed or closed.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        flush_level: int = logging.ERROR,
+    ) -> None:
+        super().__init__(host, port)
+        self.batch_size = batch_size
+        self.flush_level = flush_level
+        self.buffer: List[bytes] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Buffer the pickled `record`, and send the buffer when it is full."""
+        try:
+            self.buffer.append(self.makePickle(record))
+            if (
+                len(self.buffer) >= self.batch_size
+                or record.levelno >= self.flush_level
+            ):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        """Send the buffered records."""
+        self.acquire()
+        try:
+            if self.buffer:
+                self.send(b"".join(self.buffer))
+                self.buffer = []
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """Send the buffered records, and close the socket."""
+        self.acquire()
+        try:
+            self.flush()
+        finally:
+            self.release()
+        super().close()
+
+
+class _RecordStreamHandler(socketserver.StreamRequestHandler):
+    """Handle the records sent by a `SocketHandler`, until it disconnects."""
+
+    server: "_RecordServer"
+
+    def handle(self) -> None:
+        read = self.rfile.read
+        target = self.server.target
+        while True:
+            header = read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                return
+            length = _LENGTH.unpack(header)[0]
+            data = read(length)
+            if len(data) < length:
+                return
+            target.handle(logging.makeLogRecord(pickle.loads(data)))
+
+
+class _RecordServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    # `server_close()` waits for the connections to be closed by the workers.
+    block_on_close = True
+
+    def __init__(self, address: Tuple[str, int], target: logging.Handler) -> None:
+        super().__init__(address, _RecordStreamHandler)
+        self.target = target
+
+
+def _serve(
+    connection: Connection,
+    host: str,
+    port: int,
+    create_handler: Callable[[], logging.Handler],
+    fmt: str,
+    datefmt: Optional[str],
+) -> None:
+    """Write the records received on `(host, port)`, until told to stop."""
+    handler = create_handler()
+    handler.setFormatter(CompiledFormatter(fmt, datefmt))
+    server = _RecordServer((host, port), handler)
+    serving = threading.Thread(target=server.serve_forever)
+    serving.start()
+    try:
+        connection.send(server.server_address)
+        # Any message, or the parent exiting, stops the server.
+        try:
+            connection.recv()
+        except EOFError:
+            pass
+    finally:
+        server.shutdown()
+        serving.join()
+        # Connections of workers that closed their handlers before the message, but
+        # not accepted yet.
+        server.timeout = 0
+        with selectors.DefaultSelector() as selector:
+            selector.register(server, selectors.EVENT_READ)
+            while selector.select(0):
+                server.handle_request()
+        server.server_close()
+        handler.close()
+        connection.close()
+
+
+class LogListener:
+    """Write the records sent by other processes to a rotating file.
+
+    The records are received by a separate process, on `(host, port)`, by default on
+    a free port of the loopback interface: `address` is where workers send them with a
+    `BatchingSocketHandler`. The other arguments are those of
+    `BatchingRotatingFileHandler`, and of the formatter.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        maxBytes: int = 0,
+        backupCount: int = 0,
+        fmt: str = DEFAULT_FORMAT,
+        datefmt: Optional[str] = DEFAULT_DATEFMT,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        **kwargs: Any,
+    ) -> None:
+        self.create_handler = partial(
+            BatchingRotatingFileHandler, filename, maxBytes, backupCount, **kwargs
+        )
+        self.fmt = fmt
+        self.datefmt = datefmt
+        self.host = host
+        self.port = port
+        self.address: Optional[Tuple[str, int]] = None
+        self._process: Optional[multiprocessing.Process] = None
+        self._connection: Optional[Connection] = None
+
+    def start(self) -> None:
+        """Start the listener process, and wait for it to listen."""
+        if self._process is not None:
+            raise RuntimeError("already started")
+        self._connection, child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve,
+            args=(
+                child_connection,
+                self.host,
+                self.port,
+                self.create_handler,
+                self.fmt,
+                self.datefmt,
+            ),
+            name="LogListener",
+        )
+        self._process.start()
+        child_connection.close()
+        self.address = self._connection.recv()
+
+    def stop(self) -> None:
+        """Write the records received, and stop the listener process.
+
+        The workers must have closed their handlers.
+        """
+        if self._process is None or self._connection is None:
+            return
+        self._connection.send(None)
+        self._process.join()
+        self._connection.close()
+        self._process = None
+        self._connection = None
+
+    def __enter__(self) -> "LogListener":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.stop()
+
+
+def _work(
+    create_handler: Callable[[], logging.Handler],
+    records: int,
+    barrier: Any,
+) -> None:
+    """Log `records` records through a handler, once all workers are ready."""
+    handler = create_handler()
+    handler.setFormatter(logging.Formatter(DEFAULT_FORMAT, DEFAULT_DATEFMT))
+    logger = logging.getLogger("logging_aggregate.worker")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        barrier.wait()
+        for i in range(records):
+            logger.info("Record %d of the benchmark", i)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def _run_workers(
+    create_handlers: List[Callable[[], logging.Handler]], records: int
+) -> float:
+    """Run a worker per handler, logging `records` records each.
+
+    Return the seconds from the time all workers are ready until they exit.
+    """
+    barrier = multiprocessing.Barrier(len(create_handlers) + 1)
+    workers = [
+        multiprocessing.Process(target=_work, args=(create_handler, records, barrier))
+        for create_handler in create_handlers
+    ]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def benchmark(
+    processes: int, records: int, max_bytes: int = 10485760, backup_count: int = 3
+) -> Dict[str, float]:
+    """Log `records` records from each of `processes` processes, in different ways.
+
+    Log to a `RotatingFileHandler` per process, and to a `LogListener`, with
+    `SocketHandler` and `BatchingSocketHandler`. Report the records written per
+    second, until the files are closed.
+    """
+    total = processes * records
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        seconds = _run_workers(
+            [
+                partial(
+                    logging.handlers.RotatingFileHandler,
+                    str(Path(tmp_dir).joinpath(f"worker{i}.log")),
+                    maxBytes=max_bytes,
+                    backupCount=backup_count,
+                )
+                for i in range(processes)
+            ],
+            records,
+        )
+        results["RotatingFileHandler per process"] = total / seconds
+
+    handler_classes: List[Type[logging.handlers.SocketHandler]] = [
+        logging.handlers.SocketHandler,
+        BatchingSocketHandler,
+    ]
+    for handler_class in handler_classes:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            listener = LogListener(
+                str(Path(tmp_dir).joinpath("aggregate.log")), max_bytes, backup_count
+            )
+            with listener:
+                assert listener.address is not None
+                create_handler = partial(handler_class, *listener.address)
+                seconds = _run_workers([create_handler] * processes, records)
+                start = time.perf_counter()
+            seconds += time.perf_counter() - start
+        results[f"LogListener, {handler_class.__name__}"] = total / seconds
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="logging_aggregate",
+        description="Compare logging from processes to one file and to a file each",
+    )
+    parser.add_argument("-p", "--processes", type=int, default=4)
+    parser.add_argument("-r", "--records", type=int, default=50_000)
+    args = parser.parse_args()
+
+    for name, records_per_second in benchmark(args.processes, args.records).items():
+        print(f"{name}: {records_per_second:.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Aggregating the records of several processes with `logging_aggregate`."""
+
+import gzip
+import logging
+import multiprocessing
+import re
+import socket
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from logging_aggregate import BatchingSocketHandler, LogListener, benchmark
+
+
+def log_records(address: Tuple[str, int], records: int) -> None:
+    """Log `records` records to the listener at `address`, in batches of 10."""
+    handler = BatchingSocketHandler(*address, batch_size=10)
+    logger = logging.getLogger("logging_aggregate_test.worker")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    try:
+        for i in range(records):
+            logger.info("Record %d", i)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def read_lines(tmp_path: Path) -> List[str]:
+    """Return the lines of all the files in `tmp_path`, decompressing backups."""
+    lines = []
+    for path in tmp_path.iterdir():
+        if path.suffix == ".gz":
+            with gzip.open(path, "rt") as log_file:
+                lines.extend(log_file.read().splitlines())
+        else:
+            lines.extend(path.read_text().splitlines())
+    return lines
+
+
+def test_aggregate(tmp_path: Path) -> None:
+    """Write the records of several processes to one rotating file."""
+    with LogListener(
+        str(tmp_path.joinpath("aggregate.log")),
+        maxBytes=1000,
+        backupCount=20,
+        batch_size=10,
+        fmt="%(processName)s %(message)s",
+    ) as listener:
+        workers = [
+            multiprocessing.Process(
+                target=log_records, args=(listener.address, 100), name=f"Worker{i}"
+            )
+            for i in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    lines = read_lines(tmp_path)
+    assert len(lines) == 400
+    assert len(list(tmp_path.iterdir())) > 2
+    for i in range(4):
+        records = [line for line in lines if line.startswith(f"Worker{i} ")]
+        assert sorted(records) == sorted(f"Worker{i} Record {j}" for j in range(100))
+
+
+def test_flush_level(tmp_path: Path) -> None:
+    """Send the buffered records as soon as an error is logged."""
+    path = tmp_path.joinpath("flush.log")
+    with LogListener(str(path), fmt="%(message)s", flush_interval=0.01) as listener:
+        assert listener.address is not None
+        handler = BatchingSocketHandler(*listener.address)
+        try:
+            info = {"msg": "Info", "levelno": logging.INFO}
+            handler.handle(logging.makeLogRecord(info))
+            time.sleep(0.1)
+            assert not path.exists()
+
+            error = {"msg": "Error", "levelno": logging.ERROR}
+            handler.handle(logging.makeLogRecord(error))
+            for _ in range(100):
+                if path.exists() and len(path.read_text().splitlines()) == 2:
+                    break
+                time.sleep(0.01)
+            assert path.read_text().splitlines() == ["Info", "Error"]
+        finally:
+            handler.close()
+
+
+def test_truncated(tmp_path: Path, capfd: pytest.CaptureFixture[str]) -> None:
+    """Drop a record cut short by its process exiting, and keep listening."""
+    path = tmp_path.joinpath("truncated.log")
+    with LogListener(str(path), fmt="%(message)s") as listener:
+        assert listener.address is not None
+        data = BatchingSocketHandler(*listener.address).makePickle(
+            logging.makeLogRecord({"msg": "Truncated"})
+        )
+        with socket.create_connection(listener.address) as sock:
+            sock.sendall(data[:-1])
+        log_records(listener.address, 1)
+
+    assert path.read_text().splitlines() == ["Record 0"]
+    assert "Traceback" not in capfd.readouterr().err
+
+
+def test_default_format(tmp_path: Path) -> None:
+    """Format records as in `logging_config.json`, with the name of the process."""
+    path = tmp_path.joinpath("format.log")
+    with LogListener(str(path)) as listener:
+        assert listener.address is not None
+        log_records(listener.address, 1)
+
+    assert re.fullmatch(
+        r"\d\d/\d\d/\d{4} [\d:]{8} INFO     MainProcess logging_aggregate_test "
+        r"\[\d+\]: Record 0",
+        path.read_text().rstrip("\n"),
+    )
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few processes and records."""
+    results = benchmark(2, 100)
+
+    assert set(results) == {
+        "RotatingFileHandler per process",
+        "LogListener, SocketHandler",
+        "LogListener, BatchingSocketHandler",
+    }
@@ -0,0 +1,260 @@
+"""Keep the latest log records in a ring buffer, and output them on errors.
+
+`BoundedMemoryHandler` in `logging_test.py` stores each `LogRecord` in a `deque`, under
+the handler lock. `FlightRecorderHandler` does the same job with less work per record:
+
+- records are stored as tuples of the attributes that cannot be derived from others,
+  in a list preallocated with `capacity` slots, overwritten in turn; the record
+  objects, and their `__dict__`s, can then be freed
+- the message is not formatted when the record is stored, but only if it is output:
+  arguments changed after the logging call are output as changed
+- the slot of a record is taken from an `itertools.cycle()`, which is atomic, so
+  storing a record needs no lock: only outputting the buffer, on a record at
+  `flush_level` or higher, takes the handler lock
+
+Records logged by other threads while the buffer is being output may be lost.
+
+Run as a script to compare with a `deque` under a lock:
+
+    python logging_flight_recorder.py --records 1000000 --capacity 10000
+"""
+
+import argparse
+import logging
+import os
+import time
+import tracemalloc
+from collections import deque
+from itertools import cycle
+from operator import itemgetter
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# The attributes derived from others, or, unless there is exception or stack
+# information, `None`.
+_DERIVED = ("levelname", "filename", "module", "exc_info", "exc_text", "stack_info")
+# The attributes stored for each record: those set by `LogRecord()` in this version of
+# Python, e.g. with `taskName` from Python 3.12, except the derived ones.
+FIELDS = tuple(
+    name for name in logging.makeLogRecord({}).__dict__ if name not in _DERIVED
+)
+_RECORD_ATTRIBUTES = frozenset(FIELDS + _DERIVED)
+_RECORD_ATTRIBUTE_COUNT = len(_RECORD_ATTRIBUTES)
+_LEVELNO = FIELDS.index("levelno")
+_PATHNAME = FIELDS.index("pathname")
+_get_fields = itemgetter(*FIELDS)
+_exception_formatter = logging.Formatter()
+
+# The fields of a record, followed, for records with other attributes, e.g. from
+# `extra`, by a dict of them.
+Entry = Tuple[Any, ...]
+
+
+def _rebuild(entry: Entry) -> logging.LogRecord:
+    record = logging.LogRecord.__new__(logging.LogRecord)
+    attributes = record.__dict__
+    attributes.update(zip(FIELDS, entry))
+    attributes["levelname"] = logging.getLevelName(entry[_LEVELNO])
+    attributes["filename"] = os.path.basename(entry[_PATHNAME] or "")
+    attributes["module"] = os.path.splitext(attributes["filename"])[0]
+    attributes["exc_info"] = attributes["exc_text"] = attributes["stack_info"] = None
+    if len(entry) > len(FIELDS):
+        attributes.update(entry[-1])
+    return record
+
+
+class FlightRecorderHandler(logging.Handler):
+    """Keep the latest `capacity` records, and send them to `target` on errors.
+
+    When a record at `flush_level` or higher is handled, the buffered records,
+    including it, are passed to `target`, oldest first, and the buffer is cleared.
+    Exception information is rendered as text when a record is stored.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        flush_level: int = logging.ERROR,
+        target: Optional[logging.Handler] = None,
+        flush_on_close: bool = False,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        super().__init__()
+        self.capacity = capacity
+        self.flush_level = flush_level
+        self.target = target
+        self.flush_on_close = flush_on_close
+        self._slots: List[Optional[Entry]] = [None] * capacity
+        # Atomic, as `next()` on it is a single call into C.
+        self._positions = cycle(range(capacity))
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        """Filter and store `record`, without taking the handler lock."""
+        if self.filters and not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Store `record`, and output the buffer if it is an error."""
+        attributes = record.__dict__
+        try:
+            if (
+                len(attributes) == _RECORD_ATTRIBUTE_COUNT
+                and attributes["exc_info"] is None
+                and attributes["exc_text"] is None
+                and attributes["stack_info"] is None
+            ):
+                entry: Entry = _get_fields(attributes)
+            else:
+                entry = self._entry(record)
+        except KeyError:
+            # An attribute is missing, e.g. from a record created by another version.
+            entry = self._entry(record)
+        self._slots[next(self._positions)] = entry
+        if record.levelno >= self.flush_level:
+            self.flush()
+
+    def _entry(self, record: logging.LogRecord) -> Entry:
+        attributes = record.__dict__
+        others = {
+            key: attributes[key]
+            for key in attributes.keys() - FIELDS
+            if key not in _RECORD_ATTRIBUTES or key in ("exc_text", "stack_info")
+        }
+        if record.exc_info and not record.exc_text:
+            # The traceback would keep all its frames alive.
+            others["exc_text"] = _exception_formatter.formatException(record.exc_info)
+        return tuple(attributes.get(name) for name in FIELDS) + (others,)
+
+    def _records(
+        self, slots: List[Optional[Entry]], start: int
+    ) -> List[logging.LogRecord]:
+        # `start` is the next position: that of the oldest record, or an empty slot.
+        return [
+            _rebuild(entry)
+            for entry in slots[start:] + slots[:start]
+            if entry is not None
+        ]
+
+    def flush(self) -> None:
+        """Send the buffered records to the target, and clear the buffer."""
+        self.acquire()
+        try:
+            # Storing records carries on in the new slots; the next position is
+            # skipped, and left empty.
+            slots, self._slots = self._slots, [None] * self.capacity
+            records = self._records(slots, next(self._positions))
+            if self.target:
+                for record in records:
+                    self.target.handle(record)
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        """Output the buffer if `flush_on_close`, and clear it."""
+        try:
+            if self.flush_on_close:
+                self.flush()
+            else:
+                self._slots = [None] * self.capacity
+        finally:
+            super().close()
+
+
+class _DequeHandler(logging.Handler):
+    """Buffer records in a `deque` under the handler lock, as `BoundedMemoryHandler`."""
+
+    def __init__(self, capacity: int) -> None:
+        super().__init__()
+        self.buffer: Deque[logging.LogRecord] = deque([], capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.buffer.append(record)
+
+
+def _measure(
+    create_handler: Callable[[], logging.Handler], records: int, capacity: int
+) -> Dict[str, float]:
+    logger = logging.getLogger("logging_flight_recorder.benchmark")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    try:
+        handler = create_handler()
+        logger.addHandler(handler)
+        start = time.perf_counter()
+        for i in range(records):
+            logger.info("Record %d of %s", i, "benchmark")
+        seconds = time.perf_counter() - start
+
+        # The handler alone, without creating records.
+        record = logger.makeRecord(
+            logger.name, logging.INFO, __file__, 0, "Record %d", (0,), None
+        )
+        start = time.perf_counter()
+        for _ in range(records):
+            handler.handle(record)
+        handle_seconds = time.perf_counter() - start
+        logger.removeHandler(handler)
+        handler.close()
+
+        # Memory of a full buffer, records included.
+        tracemalloc.start()
+        try:
+            handler = create_handler()
+            logger.addHandler(handler)
+            start_size = tracemalloc.get_traced_memory()[0]
+            for i in range(capacity):
+                logger.info("Record %d of %s", i, "benchmark")
+            size = tracemalloc.get_traced_memory()[0] - start_size
+        finally:
+            tracemalloc.stop()
+            logger.removeHandler(handler)
+            handler.close()
+    finally:
+        logger.propagate = True
+        logger.setLevel(logging.NOTSET)
+
+    return {
+        "records/s": records / seconds,
+        "ns/handle": handle_seconds / records * 1e9,
+        "bytes/record": size / capacity,
+    }
+
+
+def benchmark(records: int, capacity: int) -> Dict[str, Dict[str, float]]:
+    """Buffer `records` records in a buffer of `capacity` records.
+
+    Report the records logged per second, the duration of `Handler.handle()`, and
+    the memory per buffered record.
+    """
+    return {
+        "deque": _measure(lambda: _DequeHandler(capacity), records, capacity),
+        "FlightRecorderHandler": _measure(
+            lambda: FlightRecorderHandler(capacity, logging.CRITICAL),
+            records,
+            capacity,
+        ),
+    }
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="logging_flight_recorder",
+        description="Compare ways to buffer log records in memory",
+    )
+    parser.add_argument("-r", "--records", type=int, default=1_000_000)
+    parser.add_argument("-c", "--capacity", type=int, default=10_000)
+    args = parser.parse_args()
+
+    for name, result in benchmark(args.records, args.capacity).items():
+        print(
+            f"{name}: {result['records/s']:.0f} records/s,"
+            f" {result['ns/handle']:.0f} ns/handle,"
+            f" {result['bytes/record']:.0f} bytes/record"
+        )
+
+
+if __name__ == "__main__":
+    main()
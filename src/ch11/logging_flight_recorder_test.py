@@ -0,0 +1,144 @@
+"""Buffering log records in a ring buffer with `logging_flight_recorder`."""
+
+import logging
+from io import StringIO
+from typing import Generator, Tuple
+
+import pytest
+
+from logging_flight_recorder import FlightRecorderHandler, benchmark
+
+Recorder = Tuple[logging.Logger, FlightRecorderHandler, StringIO]
+
+
+@pytest.fixture(name="recorder")
+def fixture_recorder() -> Generator[Recorder, None, None]:
+    """Return a logger with a `FlightRecorderHandler` of 3 records, and its output."""
+    output = StringIO()
+    target = logging.StreamHandler(output)
+    target.setFormatter(logging.Formatter("%(levelname)s: %(message)s"))
+    handler = FlightRecorderHandler(3, target=target)
+
+    logger = logging.getLogger("logging_flight_recorder_test")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    yield logger, handler, output
+
+    logger.removeHandler(handler)
+    handler.close()
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+
+
+def test_flush_on_error(recorder: Recorder) -> None:
+    """Output the latest records on errors, as in `test_log_buffering()`."""
+    logger, _, output = recorder
+
+    logger.info("1")
+    logger.info("2")
+    logger.info("3")
+    logger.info("4")
+    assert output.getvalue() == ""
+
+    logger.error("5")
+    assert output.getvalue() == "INFO: 3\nINFO: 4\nERROR: 5\n"
+
+    logger.info("6")
+    logger.critical("7")
+    assert output.getvalue() == "INFO: 3\nINFO: 4\nERROR: 5\nINFO: 6\nCRITICAL: 7\n"
+
+    for i in range(8, 13):
+        logger.info("%d", i)
+    logger.error("13")
+    assert output.getvalue().endswith("CRITICAL: 7\nINFO: 11\nINFO: 12\nERROR: 13\n")
+
+
+def test_records(recorder: Recorder) -> None:
+    """Records are output as they would have been without buffering."""
+    logger, handler, output = recorder
+    fmt = (
+        "%(asctime)s %(msecs)d %(relativeCreated)d %(name)s %(levelname)s %(module)s"
+        " %(filename)s:%(lineno)d %(funcName)s [%(thread)d %(threadName)s"
+        " %(process)d %(processName)s]: %(message)s"
+    )
+    assert handler.target is not None
+    handler.target.setFormatter(logging.Formatter(fmt))
+    expected = StringIO()
+    direct = logging.StreamHandler(expected)
+    direct.setFormatter(logging.Formatter(fmt))
+    logger.addHandler(direct)
+
+    logger.info("Info %s", "message")
+    logger.warning("The message", extra={"user": "Some User"})
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("Calculation error")
+
+    assert output.getvalue() == expected.getvalue()
+    assert "ZeroDivisionError" in output.getvalue()
+    logger.removeHandler(direct)
+
+
+def test_record_attributes(recorder: Recorder) -> None:
+    """Keep all the attributes of `LogRecord`, and handle records missing some."""
+    _, handler, output = recorder
+    assert handler.target is not None
+    handler.target.setFormatter(logging.Formatter("%(message)s %(processName)s"))
+
+    record = logging.makeLogRecord({"msg": "Full", "levelno": logging.INFO})
+    handler.handle(record)
+    # As if created by another version of Python, without one of the attributes.
+    record = logging.makeLogRecord({"msg": "Missing", "levelno": logging.ERROR})
+    del record.processName
+    record.user = "Some User"
+    handler.handle(record)
+
+    assert output.getvalue() == "Full MainProcess\nMissing None\n"
+
+
+def test_lazy_formatting(recorder: Recorder) -> None:
+    """Messages are formatted when output, with the arguments as they are then."""
+    logger, handler, output = recorder
+    assert handler.target is not None
+    handler.target.setFormatter(logging.Formatter("%(message)s [%(user)s]"))
+
+    data = ["a"]
+    logger.info("Data: %s", data, extra={"user": "Some User"})
+    data.append("b")
+    logger.error("Error", extra={"user": "Other User"})
+
+    assert output.getvalue() == "Data: ['a', 'b'] [Some User]\nError [Other User]\n"
+
+
+def test_filters_and_close(recorder: Recorder) -> None:
+    """Filters apply before buffering, and closing drops the buffer by default."""
+    logger, handler, output = recorder
+    handler.addFilter(lambda record: record.msg != "skipped")
+
+    logger.info("skipped")
+    logger.info("kept")
+    handler.close()
+    logger.error("error")
+    assert output.getvalue() == "ERROR: error\n"
+
+    logger.info("flushed")
+    handler.flush_on_close = True
+    handler.close()
+    assert output.getvalue() == "ERROR: error\nINFO: flushed\n"
+
+    with pytest.raises(ValueError):
+        FlightRecorderHandler(0)
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few records."""
+    results = benchmark(100, 10)
+
+    assert set(results) == {"deque", "FlightRecorderHandler"}
+    assert (
+        results["FlightRecorderHandler"]["bytes/record"]
+        < results["deque"]["bytes/record"]
+    )
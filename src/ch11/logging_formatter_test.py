@@ -0,0 +1,170 @@
+"""Formatting log records with `logging_formatter`."""
+
+import logging
+import logging.config
+import sys
+import time
+from io import StringIO
+from typing import Any, List, Optional
+
+import pytest
+
+from logging_formatter import BENCHMARK_FORMATS, CompiledFormatter, benchmark
+
+
+def make_records() -> List[logging.LogRecord]:
+    """Return records with arguments, extra fields, exception and stack information."""
+    logger = logging.getLogger("logging_formatter_test")
+    records = [
+        logger.makeRecord(logger.name, logging.INFO, __file__, 1, "Message", (), None),
+        logger.makeRecord(
+            logger.name,
+            logging.WARNING,
+            __file__,
+            2,
+            "Data: %s %d%%",
+            ({"a": "b"}, 100),
+            None,
+            "make_records",
+            {"user": "Some User"},
+            "Stack (most recent call last):\n  File ...",
+        ),
+    ]
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        records.append(
+            logger.makeRecord(
+                logger.name, logging.ERROR, __file__, 3, "Error", (), sys.exc_info()
+            )
+        )
+    # In the next second.
+    records.append(logging.makeLogRecord({"created": records[0].created + 1}))
+    return records
+
+
+@pytest.mark.parametrize(
+    "fmt,datefmt,style",
+    [
+        *BENCHMARK_FORMATS.values(),
+        (None, None, "%"),
+        ("%(asctime)s %(message)s", None, "%"),
+        ("%(asctime)s %(message)s", "%d/%m/%Y %H:%M:%S", "%"),
+        ("%(levelname)-8s %(lineno)4d %(created)f %% %(message)r", None, "%"),
+        ("%%(name)s %(name)s", None, "%"),
+        ("{asctime} {levelname:<8} {lineno:>4} {message!r} {{}}", None, "{"),
+        ("{levelname}", "%H:%M:%S", "{"),
+        ("${asctime} $levelname $$ 100% $message", "%H:%M", "$"),
+    ],
+)
+def test_same_output(fmt: Optional[str], datefmt: Optional[str], style: str) -> None:
+    """Output the same text as `logging.Formatter`."""
+    records = make_records()
+    expected = [
+        logging.Formatter(fmt, datefmt, style).format(record)  # type: ignore
+        for record in records
+    ]
+    formatter = CompiledFormatter(fmt, datefmt, style)
+    # Twice, with the time from the cache the second time.
+    for _ in range(2):
+        assert [formatter.format(record) for record in records] == expected
+
+
+def test_converter() -> None:
+    """Use other converters, and fall back for non-standard ones."""
+    record = make_records()[0]
+
+    for converter in (time.gmtime, lambda secs: time.localtime(secs + 3600)):
+        formatter = CompiledFormatter("%(asctime)s")
+        formatter.converter = converter
+        expected = logging.Formatter("%(asctime)s")
+        expected.converter = converter
+        assert formatter.format(record) == expected.format(record)
+
+
+def test_converter_change(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Do not reuse times cached with another converter."""
+    monkeypatch.setenv("TZ", "EET-2")
+    time.tzset()
+    try:
+        record = make_records()[0]
+        formatter = CompiledFormatter("%(asctime)s")
+        local_time = formatter.format(record)
+        formatter.converter = time.gmtime
+
+        assert formatter.format(record) != local_time
+        expected = logging.Formatter("%(asctime)s")
+        expected.converter = time.gmtime
+        assert formatter.format(record) == expected.format(record)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_fallback() -> None:
+    """Formats that are not compiled are applied by `logging.Formatter`."""
+    record = make_records()[1]
+    formatter = CompiledFormatter("{args[1]} {message:{width}}", style="{")
+    record.width = 12
+
+    assert formatter.format(record).startswith("100 Data: {'a': 'b'} 100%")
+
+
+def test_missing_field() -> None:
+    """Fail as `logging.Formatter` does on missing fields."""
+    record = make_records()[0]
+    for style, fmt in [("%", "%(user)s"), ("{", "{user}"), ("$", "$user")]:
+        with pytest.raises(ValueError, match="Formatting field not found in record"):
+            CompiledFormatter(fmt, style=style).format(record)
+
+
+def test_dict_config() -> None:
+    """Configure the formatter with `dictConfig()`."""
+    output = StringIO()
+    config: Any = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "formatters": {
+            "verbose": {
+                "class": "logging_formatter.CompiledFormatter",
+                "format": "{levelname:<8} {message}",
+                "style": "{",
+            }
+        },
+        "handlers": {
+            "stream": {
+                "class": "logging.StreamHandler",
+                "formatter": "verbose",
+                "stream": output,
+            }
+        },
+        "loggers": {
+            "logging_formatter_test": {
+                "handlers": ["stream"],
+                "level": "INFO",
+                "propagate": False,
+            }
+        },
+    }
+    logging.config.dictConfig(config)
+    logger = logging.getLogger("logging_formatter_test")
+    try:
+        logger.info("The message")
+        assert output.getvalue() == "INFO     The message\n"
+        assert isinstance(logger.handlers[0].formatter, CompiledFormatter)
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        logger.setLevel(logging.NOTSET)
+        logger.propagate = True
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few records."""
+    results = benchmark(100)
+
+    assert set(results) == set(BENCHMARK_FORMATS)
+    assert all(
+        set(result) == {"Formatter", "CompiledFormatter"} for result in results.values()
+    )
@@ -0,0 +1,182 @@
+"""Logging records as JSON lines with `logging_json`."""
+
+import json
+import logging
+import logging.config
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+from logging_json import JsonFormatter, JsonLinesHandler, benchmark
+
+
+def make_record(**extra: Any) -> logging.LogRecord:
+    """Return a record with arguments, and `extra` fields."""
+    logger = logging.getLogger("logging_json_test")
+    return logger.makeRecord(
+        logger.name,
+        logging.WARNING,
+        __file__,
+        1,
+        "Data: %s %d%%",
+        ("é", 100),
+        None,
+        "make_record",
+        extra,
+    )
+
+
+def test_format() -> None:
+    """Output the default fields, then the extra ones."""
+    record = make_record(user="Some User", data={"a": [1, 2]}, path=Path("a"))
+    output = JsonFormatter().format(record)
+
+    assert "\n" not in output
+    assert "\\u00e9" in output
+    assert json.loads(output) == {
+        "time": record.created,
+        "level": "WARNING",
+        "logger": "logging_json_test",
+        "message": "Data: é 100%",
+        "user": "Some User",
+        "data": {"a": [1, 2]},
+        "path": "a",
+    }
+    # Formatting again does not output `message` as an extra field.
+    assert JsonFormatter().format(record) == output
+
+
+def test_fields() -> None:
+    """Output chosen fields, as `null` if missing."""
+    record = make_record()
+    formatter = JsonFormatter(
+        {"when": "asctime", "line": "lineno", "user": "user"},
+        datefmt="%Y",
+        ensure_ascii=False,
+    )
+
+    assert json.loads(formatter.format(record)) == {
+        "when": record.asctime,
+        "line": 1,
+        "user": None,
+    }
+    assert len(record.asctime) == 4
+    assert json.loads(formatter.format(make_record(user="Some User")))["user"] == (
+        "Some User"
+    )
+    assert "é" in JsonFormatter(ensure_ascii=False).format(record)
+
+
+def test_extra_keys() -> None:
+    """Extra fields named as other fields are prefixed, rather than replacing them."""
+    record = make_record(level="Extra level", time=1)
+
+    assert json.loads(JsonFormatter().format(record)) == {
+        "time": record.created,
+        "level": "WARNING",
+        "logger": "logging_json_test",
+        "message": "Data: é 100%",
+        "extra_level": "Extra level",
+        "extra_time": 1,
+    }
+
+
+def test_extra_keys_made_record() -> None:
+    """Output extra fields of records made from a dictionary, e.g. unpickled ones."""
+    record = logging.makeLogRecord({"msg": "The message", "user": "Some User"})
+    record.taskName = None
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["user"] == "Some User"
+    assert "taskName" not in data
+    assert "msg" not in data
+
+
+def test_exception() -> None:
+    """Output exception and stack information."""
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        record = logging.makeLogRecord({"exc_info": sys.exc_info(), "stack_info": "S"})
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["exc_info"].endswith("ZeroDivisionError: division by zero")
+    assert data["stack_info"] == "S"
+
+
+def test_handler(tmp_path: Path) -> None:
+    """Write records in batches, and on errors."""
+    path = tmp_path.joinpath("records.jsonl")
+    handler = JsonLinesHandler(str(path), batch_size=3)
+    logger = logging.getLogger("logging_json_test.handler")
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("One")
+        logger.warning("Two")
+        assert path.read_text() == ""
+        logger.warning("Three")
+        assert len(path.read_text().splitlines()) == 3
+
+        logger.warning("Four")
+        logger.error("Five")
+        assert len(path.read_text().splitlines()) == 5
+        logger.warning("Six")
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+        handler.close()
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["message"] for line in lines] == [
+        "One",
+        "Two",
+        "Three",
+        "Four",
+        "Five",
+        "Six",
+    ]
+
+
+def test_dict_config(tmp_path: Path) -> None:
+    """Configure the formatter and the handler from `logging_json_config.json`."""
+    config: Dict[str, Any] = json.loads(
+        Path(__file__).parent.joinpath("logging_json_config.json").read_text()
+    )
+    config["handlers"]["json_file"]["filename"] = str(
+        tmp_path.joinpath("logging_json_config.jsonl")
+    )
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    level = root.level
+    logging.config.dictConfig(config)
+    try:
+        logging.getLogger("logging_test.dictconfig").info(
+            "The message", extra={"user": "Some User"}
+        )
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+        logging.getLogger("logging_test.dictconfig").setLevel(logging.NOTSET)
+
+    data = json.loads(tmp_path.joinpath("logging_json_config.jsonl").read_text())
+    assert data["message"] == "The message"
+    assert data["user"] == "Some User"
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few records."""
+    results = benchmark(100)
+
+    assert set(results) == {
+        "json.dumps(record.__dict__)",
+        "JsonFormatter",
+        "JsonFormatter (all fields)",
+    }
@@ -0,0 +1,151 @@
+"""The cost of disabled and enabled logging calls, and lazy arguments.
+
+A logging call below the level of its logger, such as `logger.debug()` in
+`test_set_level()`, returns as soon as `Logger.isEnabledFor()` finds the level in the
+cache of the logger, whatever its depth in the hierarchy. But its arguments are still
+evaluated, and the method looked up and called:
+
+- `if logger.isEnabledFor(logging.DEBUG):` skips the whole call, and the arguments
+- a `Lazy` argument is only computed when the message is formatted, which disabled
+  calls never do
+- `log_lazy()` checks the level, then computes the `Lazy` arguments at the time of the
+  call, so that handlers formatting records later, such as those behind a queue, see
+  plain values
+
+Run as a script to report the ns per call of each way, for the loggers of
+`logging_test.py`:
+
+    python logging_lazy.py --calls 100000
+"""
+
+import argparse
+import logging
+import timeit
+from typing import Any, Callable, Dict, List, Mapping
+
+_MISSING = object()
+
+LOGGERS = ("", "logging_test", "logging_test.dictconfig")
+
+# Statements run for each logger, with the root logger at `WARNING`.
+SCENARIOS: Mapping[str, str] = {
+    "disabled": "logger.debug('Record %s', value)",
+    "disabled, evaluated argument": "logger.debug('Record %s', expensive())",
+    "disabled, guarded": (
+        "if logger.isEnabledFor(DEBUG): logger.debug('Record %s', expensive())"
+    ),
+    "disabled, Lazy": "logger.debug('Record %s', Lazy(expensive))",
+    "disabled, log_lazy": "log_lazy(logger, DEBUG, 'Record %s', Lazy(expensive))",
+    "enabled": "logger.warning('Record %s', expensive())",
+    "enabled, log_lazy": "log_lazy(logger, WARNING, 'Record %s', Lazy(expensive))",
+}
+
+
+class Lazy:
+    """An argument computed by `function(*args)` only when needed, at most once.
+
+    Formatted with `%s` or `%r`, the value is computed when the message is formatted.
+    """
+
+    __slots__ = ("function", "args", "_value")
+
+    def __init__(self, function: Callable[..., Any], *args: Any) -> None:
+        self.function = function
+        self.args = args
+        self._value = _MISSING
+
+    def value(self) -> Any:
+        """Return the value, computing it on the first call."""
+        if self._value is _MISSING:
+            self._value = self.function(*self.args)
+        return self._value
+
+    def __str__(self) -> str:
+        return str(self.value())
+
+    def __repr__(self) -> str:
+        return repr(self.value())
+
+
+def log_lazy(
+    logger: logging.Logger, level: int, msg: str, *args: Any, **kwargs: Any
+) -> None:
+    """Log as `logger.log()`, computing `Lazy` arguments if `level` is enabled.
+
+    The location of the record is that of the caller.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    kwargs["stacklevel"] = kwargs.get("stacklevel", 1) + 1
+    logger.log(
+        level,
+        msg,
+        *[arg.value() if isinstance(arg, Lazy) else arg for arg in args],
+        **kwargs,
+    )
+
+
+def _expensive() -> str:
+    return ", ".join(map(str, range(20)))
+
+
+def benchmark(calls: int) -> Dict[str, Dict[str, float]]:
+    """Run each of `SCENARIOS` `calls` times, for each of `LOGGERS`.
+
+    The root logger is set to `WARNING`, with a `NullHandler`, and the others to
+    `NOTSET`. Report the ns per call.
+    """
+    root = logging.getLogger()
+    handlers: List[logging.Handler] = list(root.handlers)
+    levels = {name: logging.getLogger(name).level for name in LOGGERS}
+    for handler in handlers:
+        root.removeHandler(handler)
+    null_handler = logging.NullHandler()
+    root.addHandler(null_handler)
+    for name in LOGGERS:
+        logging.getLogger(name).setLevel(logging.NOTSET if name else logging.WARNING)
+
+    results = {}
+    try:
+        for name in LOGGERS:
+            namespace = {
+                "logger": logging.getLogger(name),
+                "value": 1,
+                "expensive": _expensive,
+                "Lazy": Lazy,
+                "log_lazy": log_lazy,
+                "DEBUG": logging.DEBUG,
+                "WARNING": logging.WARNING,
+            }
+            results[name or "root"] = {
+                scenario: timeit.timeit(statement, number=calls, globals=namespace)
+                / calls
+                * 1e9
+                for scenario, statement in SCENARIOS.items()
+            }
+    finally:
+        root.removeHandler(null_handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        for name, level in levels.items():
+            logging.getLogger(name).setLevel(level)
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="logging_lazy", description="Measure the cost of logging calls"
+    )
+    parser.add_argument("-c", "--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    for name, result in benchmark(args.calls).items():
+        print(f"{name}:")
+        for scenario, nanoseconds in result.items():
+            print(f"  {scenario}: {nanoseconds:.0f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Logging with lazy arguments with `logging_lazy`."""
+
+import logging
+from io import StringIO
+from typing import Generator, List, Tuple
+
+import pytest
+
+from logging_lazy import LOGGERS, SCENARIOS, Lazy, benchmark, log_lazy
+
+Output = Tuple[logging.Logger, StringIO]
+
+
+@pytest.fixture(name="output")
+def fixture_output() -> Generator[Output, None, None]:
+    """Return a logger at `INFO`, writing its records to a `StringIO`."""
+    stream = StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(funcName)s %(levelname)s %(message)s"))
+    logger = logging.getLogger("logging_lazy_test")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    yield logger, stream
+
+    logger.removeHandler(handler)
+    handler.close()
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+
+
+def counted() -> Tuple[List[int], Lazy]:
+    """Return a list of the calls of a `Lazy` argument, and the argument."""
+    calls: List[int] = []
+
+    def compute(value: int) -> int:
+        calls.append(value)
+        return value
+
+    return calls, Lazy(compute, 42)
+
+
+def test_lazy(output: Output) -> None:
+    """Compute `Lazy` arguments only when formatting messages, once."""
+    logger, stream = output
+    calls, argument = counted()
+
+    logger.debug("Value %s", argument)
+    assert not calls
+    logger.info("Value %s %r", argument, argument)
+    assert calls == [42]
+    assert stream.getvalue() == "test_lazy INFO Value 42 42\n"
+
+
+def test_log_lazy(output: Output) -> None:
+    """Compute `Lazy` arguments when the level is enabled, at the time of the call."""
+    logger, stream = output
+    calls, argument = counted()
+
+    log_lazy(logger, logging.DEBUG, "Value %d", argument)
+    assert not calls
+    log_lazy(logger, logging.INFO, "Value %d %s", argument, "plain")
+    assert calls == [42]
+    assert stream.getvalue() == "test_log_lazy INFO Value 42 plain\n"
+
+
+def test_log_lazy_kwargs(output: Output) -> None:
+    """Pass keyword arguments on to `Logger.log()`."""
+    logger, stream = output
+    records: List[logging.LogRecord] = []
+
+    def keep(record: logging.LogRecord) -> bool:
+        records.append(record)
+        return True
+
+    logger.addFilter(keep)
+    try:
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            log_lazy(
+                logger, logging.ERROR, "Failed", exc_info=True, extra={"user": "Some"}
+            )
+    finally:
+        logger.removeFilter(keep)
+
+    assert records[0].user == "Some"  # type: ignore
+    assert records[0].funcName == "test_log_lazy_kwargs"
+    assert stream.getvalue().endswith("ZeroDivisionError: division by zero\n")
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few calls, leaving the loggers as they were."""
+    levels = [logging.getLogger(name).level for name in LOGGERS]
+    handlers = list(logging.getLogger().handlers)
+
+    results = benchmark(100)
+
+    assert set(results) == {"root", "logging_test", "logging_test.dictconfig"}
+    assert all(set(result) == set(SCENARIOS) for result in results.values())
+    assert [logging.getLogger(name).level for name in LOGGERS] == levels
+    assert logging.getLogger().handlers == handlers
@@ -0,0 +1,298 @@
+"""Log through a bounded queue, handled by a background thread.
+
+With handlers such as `StreamHandler` and `RotatingFileHandler` attached to loggers,
+as in `logging_config.json`, each logging call formats the record and writes it on the
+caller's thread, holding the handler lock: threads logging at the same time wait for
+each other's I/O.
+
+`QueueLogging` moves the handlers of a logger behind a queue:
+
+- the logger gets a single `BoundedQueueHandler`, which only merges the message with
+  its arguments (which may change after the call) and puts the record in the queue
+- a `logging.handlers.QueueListener` thread takes records from the queue, and passes
+  them to the original handlers, respecting their levels
+- the queue is bounded: when it is full, the `overflow` policy either blocks the
+  caller (`BLOCK`), or drops the oldest queued record (`DROP_OLDEST`) or the new one
+  (`DROP_NEW`), counting the dropped records
+
+Run as a script to compare the latency of `logger.info()` with 16 threads:
+
+    python logging_queue.py --threads 16 --records 2000 --pause 0.001
+"""
+
+import argparse
+import copy
+import logging
+import logging.handlers
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Protocol, Type
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+DROP_NEW = "drop_new"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEW)
+
+DEFAULT_MAXSIZE = 10_000
+
+_exception_formatter = logging.Formatter()
+
+
+class _Queue(Protocol):
+    """The methods of `queue.Queue` used by the handler and the listener."""
+
+    def put(
+        self, item: Any, block: bool = True, timeout: Optional[float] = None
+    ) -> None:
+        ...
+
+    def put_nowait(self, item: Any) -> None:
+        ...
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        ...
+
+    def get_nowait(self) -> Any:
+        ...
+
+    def task_done(self) -> None:
+        ...
+
+    def join(self) -> None:
+        ...
+
+    def qsize(self) -> int:
+        ...
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Put records in a bounded queue, applying `overflow` when it is full.
+
+    Exception information is rendered with a default `Formatter` when the record is
+    queued, since the traceback can change once the exception has been handled.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, overflow: str = BLOCK) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {overflow!r}")
+        self.queue: _Queue
+        super().__init__(queue.Queue(maxsize))
+        self.overflow = overflow
+        # Updated in `emit()`, which holds the handler lock.
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Return a copy of `record`, with its message merged with its arguments.
+
+        Unlike `QueueHandler.prepare()`, the record is not formatted, and keeps its
+        stack information: it stays in this process.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(
+                    record.exc_info
+                )
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Put `record` in the queue, or drop a record if the queue is full."""
+        if self.overflow == BLOCK:
+            self.queue.put(record)
+            return
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.overflow == DROP_NEW:
+                    return
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                # Emptied by the listener in the meantime.
+                self.dropped -= 1
+            else:
+                self.queue.task_done()
+
+
+class _Listener(logging.handlers.QueueListener):
+    queue: _Queue
+
+    def enqueue_sentinel(self) -> None:
+        # Wait for the queued records to be handled, rather than fail, when the queue
+        # is full.
+        while True:
+            try:
+                super().enqueue_sentinel()
+                return
+            except queue.Full:
+                self.queue.join()
+
+
+class QueueLogging:
+    """Route the records of `logger` (by default the root logger) through a queue.
+
+    While started, the handlers of the logger are replaced by a `BoundedQueueHandler`,
+    and run by a `QueueListener` thread. `stop()` handles the queued records, then
+    puts the handlers back.
+    """
+
+    def __init__(
+        self,
+        logger: Optional[logging.Logger] = None,
+        maxsize: int = DEFAULT_MAXSIZE,
+        overflow: str = BLOCK,
+    ) -> None:
+        self.logger = logger or logging.getLogger()
+        self.handler = BoundedQueueHandler(maxsize, overflow)
+        self._handlers: List[logging.Handler] = []
+        self._listener: Optional[_Listener] = None
+
+    @property
+    def dropped(self) -> int:
+        """The number of records dropped as the queue was full."""
+        return self.handler.dropped
+
+    def start(self) -> None:
+        """Start handling records in the background."""
+        if self._listener is not None:
+            raise RuntimeError("already started")
+        self._handlers = list(self.logger.handlers)
+        self._listener = _Listener(
+            self.handler.queue, *self._handlers, respect_handler_level=True
+        )
+        self._listener.start()
+        for handler in self._handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.handler)
+
+    def stop(self) -> None:
+        """Handle the queued records, and put the original handlers back."""
+        if self._listener is None:
+            return
+        self.logger.removeHandler(self.handler)
+        for handler in self._handlers:
+            self.logger.addHandler(handler)
+        self._listener.stop()
+        self._listener = None
+
+    def __enter__(self) -> "QueueLogging":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.stop()
+
+
+def _latencies(
+    logger: logging.Logger, threads: int, records: int, pause: float
+) -> List[int]:
+    """Log `records` records from each of `threads` threads, `pause` seconds apart.
+
+    Return the duration of each call, in nanoseconds.
+    """
+    latencies: List[List[int]] = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def run(durations: List[int]) -> None:
+        barrier.wait()
+        for i in range(records):
+            start = time.perf_counter_ns()
+            logger.info("Record %d", i)
+            durations.append(time.perf_counter_ns() - start)
+            # Other work, releasing the GIL, between records.
+            time.sleep(pause)
+
+    workers = [threading.Thread(target=run, args=(lat,)) for lat in latencies]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [duration for durations in latencies for duration in durations]
+
+
+def benchmark(
+    threads: int, records: int, pause: float = 0.001
+) -> Dict[str, Dict[str, float]]:
+    """Log to a file from `threads` threads, directly and through a queue.
+
+    Each thread pauses `pause` seconds between records, as if doing other work.
+
+    Report the median and 99th percentile latency of `logger.info()`, in µs, and the
+    records dropped.
+    """
+    logger = logging.getLogger("logging_queue.benchmark")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        handler = logging.handlers.RotatingFileHandler(
+            Path(tmp_dir).joinpath("benchmark.log"), maxBytes=10485760, backupCount=3
+        )
+        handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s %(levelname)-8s %(module)s [%(thread)d]: %(message)s",
+                "%d/%m/%Y %H:%M:%S",
+            )
+        )
+        logger.addHandler(handler)
+        try:
+            for name in ("direct",) + OVERFLOW_POLICIES:
+                queue_logging: Optional[QueueLogging] = None
+                if name != "direct":
+                    queue_logging = QueueLogging(logger, overflow=name)
+                    queue_logging.start()
+                try:
+                    latencies = _latencies(logger, threads, records, pause)
+                finally:
+                    if queue_logging is not None:
+                        queue_logging.stop()
+                percentiles = statistics.quantiles(latencies, n=100)
+                results[name] = {
+                    "p50": percentiles[49] / 1000,
+                    "p99": percentiles[98] / 1000,
+                    "dropped": queue_logging.dropped if queue_logging else 0,
+                }
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+            logger.propagate = True
+            logger.setLevel(logging.NOTSET)
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(
+        prog="logging_queue", description="Compare direct and queued logging latency"
+    )
+    parser.add_argument("-t", "--threads", type=int, default=16)
+    parser.add_argument("-r", "--records", type=int, default=2000)
+    parser.add_argument("-p", "--pause", type=float, default=0.001)
+    args = parser.parse_args()
+
+    for name, result in benchmark(args.threads, args.records, args.pause).items():
+        print(
+            f"{name}: p50 {result['p50']:.1f}µs, p99 {result['p99']:.1f}µs,"
+            f" {result['dropped']:.0f} dropped"
+        )
+
+
+if __name__ == "__main__":
+    main()
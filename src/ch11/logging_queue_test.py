@@ -0,0 +1,135 @@
+"""Logging through a bounded queue with `logging_queue`."""
+
+import logging
+from io import StringIO
+from typing import Generator, List
+
+import pytest
+
+from logging_queue import (
+    BLOCK,
+    DROP_NEW,
+    DROP_OLDEST,
+    BoundedQueueHandler,
+    QueueLogging,
+    benchmark,
+)
+
+
+@pytest.fixture(name="logger")
+def fixture_logger() -> Generator[logging.Logger, None, None]:
+    """Return a logger that does not propagate to the root logger."""
+    logger = logging.getLogger("logging_queue_test")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    yield logger
+
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+
+
+def add_handler(logger: logging.Logger, level: int = logging.NOTSET) -> StringIO:
+    """Add a handler writing to a `StringIO`, and return it."""
+    output = StringIO()
+    handler = logging.StreamHandler(output)
+    handler.setLevel(level)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(funcName)s: %(message)s"))
+    logger.addHandler(handler)
+    return output
+
+
+def test_queue_logging(logger: logging.Logger) -> None:
+    """Records reach the original handlers, at their levels, from the listener."""
+    everything = add_handler(logger)
+    warnings = add_handler(logger, logging.WARNING)
+    handlers = list(logger.handlers)
+
+    with QueueLogging(logger) as queue_logging:
+        assert logger.handlers == [queue_logging.handler]
+        data = ["a"]
+        logger.info("Data: %s", data)
+        # Changed after the call: not in the message.
+        data.append("b")
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("Calculation error")
+
+    assert logger.handlers == handlers
+    assert everything.getvalue().startswith(
+        "INFO test_queue_logging: Data: ['a']\n"
+        "ERROR test_queue_logging: Calculation error\nTraceback"
+    )
+    assert warnings.getvalue().startswith("ERROR test_queue_logging")
+    assert "ZeroDivisionError" in warnings.getvalue()
+
+    for handler in handlers:
+        logger.removeHandler(handler)
+
+
+def messages(handler: BoundedQueueHandler) -> List[str]:
+    """Return the messages of the queued records."""
+    return [handler.queue.get_nowait().msg for _ in range(handler.queue.qsize())]
+
+
+@pytest.mark.parametrize(
+    "overflow,expected", [(DROP_NEW, ["1", "2"]), (DROP_OLDEST, ["3", "4"])]
+)
+def test_drop(logger: logging.Logger, overflow: str, expected: List[str]) -> None:
+    """Drop the new or the oldest records when the queue is full."""
+    handler = BoundedQueueHandler(2, overflow)
+    logger.addHandler(handler)
+
+    for i in range(1, 5):
+        logger.info("%d", i)
+    assert handler.dropped == 2
+    assert messages(handler) == expected
+
+    logger.removeHandler(handler)
+
+
+def test_block(logger: logging.Logger) -> None:
+    """Wait for room in the queue."""
+    output = add_handler(logger)
+    handler = logger.handlers[0]
+
+    with QueueLogging(logger, maxsize=1, overflow=BLOCK) as queue_logging:
+        for i in range(100):
+            logger.info("%d", i)
+
+    assert queue_logging.dropped == 0
+    assert output.getvalue().count("\n") == 100
+    logger.removeHandler(handler)
+
+
+@pytest.mark.parametrize("overflow", [DROP_NEW, DROP_OLDEST])
+def test_stop_full(logger: logging.Logger, overflow: str) -> None:
+    """Stop while the queue is full, once the queued records are handled."""
+    output = add_handler(logger)
+    handler = logger.handlers[0]
+
+    with QueueLogging(logger, maxsize=1, overflow=overflow) as queue_logging:
+        for i in range(100):
+            logger.info("%d", i)
+
+    assert output.getvalue().count("\n") + queue_logging.dropped == 100
+    logger.removeHandler(handler)
+
+
+def test_errors(logger: logging.Logger) -> None:
+    """Reject unknown policies, and starting twice."""
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(overflow="drop")
+
+    with QueueLogging(logger) as queue_logging:
+        with pytest.raises(RuntimeError):
+            queue_logging.start()
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few records."""
+    results = benchmark(4, 10, pause=0)
+
+    assert set(results) == {"direct", BLOCK, DROP_OLDEST, DROP_NEW}
+    assert all(result["p99"] >= result["p50"] for result in results.values())
@@ -0,0 +1,253 @@
+"""Rate-limiting and sampling log records with `logging_ratelimit`."""
+
+import json
+import logging
+import logging.config
+import os
+import subprocess
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, Generator, Tuple
+
+import pytest
+
+from logging_ratelimit import RateLimitFilter, RateLimitStats, benchmark
+
+Output = Tuple[logging.Logger, StringIO]
+
+
+@pytest.fixture(name="output")
+def fixture_output() -> Generator[Output, None, None]:
+    """Return a logger writing its records' messages to a `StringIO`."""
+    stream = StringIO()
+    handler = logging.StreamHandler(stream)
+    logger = logging.getLogger("logging_ratelimit_test")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    yield logger, stream
+
+    logger.removeHandler(handler)
+    handler.close()
+    logger.filters.clear()
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+
+
+def test_burst(output: Output) -> None:
+    """Let `burst` records of each template pass, whatever their arguments."""
+    logger, stream = output
+    rate_filter = RateLimitFilter(rate=0, burst=2)
+    logger.handlers[0].addFilter(rate_filter)
+
+    for i in range(4):
+        logger.info("Record %d", i)
+        logger.warning("Warning %d", i)
+    logging.getLogger("logging_ratelimit_test.other").warning("Record %d", 0)
+
+    assert stream.getvalue().splitlines() == [
+        "Record 0",
+        "Warning 0",
+        "Record 1",
+        "Warning 1",
+        "Record 0",
+    ]
+    assert rate_filter.stats() == RateLimitStats(5, 4, 0, 3)
+
+
+def test_rate(output: Output) -> None:
+    """Refill the buckets at `rate` tokens per second."""
+    logger, stream = output
+    logger.addFilter(RateLimitFilter(rate=20, burst=1))
+
+    for _ in range(3):
+        logger.info("Record")
+    time.sleep(0.1)
+    for _ in range(3):
+        logger.info("Record")
+
+    assert stream.getvalue().splitlines() == ["Record", "Record"]
+
+
+def test_sample(output: Output) -> None:
+    """Keep a ratio of the records."""
+    logger, stream = output
+    rate_filter = RateLimitFilter(rate=0, burst=10_000, sample=0.25)
+    logger.addFilter(rate_filter)
+
+    for i in range(1000):
+        logger.info("Record %d", i)
+
+    passed = len(stream.getvalue().splitlines())
+    assert 150 < passed < 350
+    assert rate_filter.stats().passed == passed
+    assert rate_filter.stats().suppressed == 1000 - passed
+
+
+def test_name(output: Output) -> None:
+    """Only limit the records of the logger `name` and its children."""
+    logger, stream = output
+    logger.handlers[0].addFilter(
+        RateLimitFilter("logging_ratelimit_test.limited", rate=0, burst=1)
+    )
+
+    for _ in range(2):
+        logger.info("Record")
+        logging.getLogger("logging_ratelimit_test.limited").info("Limited")
+
+    assert stream.getvalue().splitlines() == ["Record", "Limited", "Record"]
+
+
+def test_eviction(output: Output) -> None:
+    """Evict the least recently used buckets beyond `max_keys`."""
+    logger, stream = output
+    rate_filter = RateLimitFilter(logger.name, rate=0, burst=1, max_keys=2)
+    logger.addFilter(rate_filter)
+
+    logger.info("One")
+    logger.info("Two")
+    logger.info("One")
+    logger.info("Three")
+    assert rate_filter.stats() == RateLimitStats(3, 1, 1, 2)
+    # A new bucket, full, evicting that of "One".
+    logger.info("Two")
+    logger.info("Three")
+    assert rate_filter.stats() == RateLimitStats(4, 2, 2, 2)
+
+    assert stream.getvalue().splitlines() == ["One", "Two", "Three", "Two"]
+
+    # The records suppressed under the evicted bucket of "One" are counted apart.
+    rate_filter.close()
+    assert stream.getvalue().splitlines()[4:] == [
+        "Suppressed 1 records like 'Three'",
+        "Suppressed 1 records of evicted templates",
+    ]
+
+
+def test_summary(output: Output) -> None:
+    """Log the number of suppressed records of each template periodically."""
+    logger, stream = output
+    rate_filter = RateLimitFilter(rate=0, burst=1, summary_interval=0.1)
+    logger.handlers[0].addFilter(rate_filter)
+
+    for i in range(5):
+        logger.info("Record %d", i)
+    logger.info("Other")
+    time.sleep(0.2)
+    logger.info("Other")
+    rate_filter.summarize()
+
+    assert stream.getvalue().splitlines() == [
+        "Record 0",
+        "Other",
+        "Suppressed 4 records like 'Record %d'",
+        "Suppressed 1 records like 'Other'",
+    ]
+
+
+def test_summary_without_records(output: Output) -> None:
+    """Log summaries periodically, even if no more records are filtered."""
+    logger, stream = output
+    rate_filter = RateLimitFilter(rate=0, burst=1, summary_interval=0.05)
+    logger.handlers[0].addFilter(rate_filter)
+
+    for _ in range(3):
+        logger.info("Record")
+    for _ in range(100):
+        if len(stream.getvalue().splitlines()) == 2:
+            break
+        time.sleep(0.01)
+
+    assert stream.getvalue().splitlines() == [
+        "Record",
+        "Suppressed 2 records like 'Record'",
+    ]
+    rate_filter.close()
+
+
+def test_close(output: Output) -> None:
+    """Log the last summaries when closed."""
+    logger, stream = output
+    rate_filter = RateLimitFilter(rate=0, burst=1)
+    logger.handlers[0].addFilter(rate_filter)
+
+    for _ in range(3):
+        logger.info("Record")
+    rate_filter.close()
+
+    assert stream.getvalue().splitlines() == [
+        "Record",
+        "Suppressed 2 records like 'Record'",
+    ]
+
+
+def test_exit(tmp_path: Path) -> None:
+    """Log the last summaries at interpreter exit."""
+    script = """\
+import logging
+from logging_ratelimit import RateLimitFilter
+
+logging.basicConfig(format="%(message)s")
+logging.getLogger().handlers[0].addFilter(RateLimitFilter(rate=0, burst=1))
+for _ in range(3):
+    logging.warning("Record")
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parent)},
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.stderr.splitlines() == [
+        "Record",
+        "Suppressed 2 records like 'Record'",
+    ]
+
+
+def test_dict_config(tmp_path: Path) -> None:
+    """Configure the filter declared in `logging_config.json`."""
+    config: Dict[str, Any] = json.loads(
+        Path(__file__).parent.joinpath("logging_config.json").read_text()
+    )
+    config["disable_existing_loggers"] = False
+    # Only the rotating file handler, with the filter.
+    config["handlers"] = {"file": config["handlers"]["file"]}
+    config["handlers"]["file"]["filename"] = str(tmp_path.joinpath("config.log"))
+    config["handlers"]["file"]["formatter"] = "simple"
+    config["handlers"]["file"]["filters"] = ["rate_limit"]
+    config["root"]["handlers"] = ["file"]
+
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    level = root.level
+    logging.config.dictConfig(config)
+    try:
+        for i in range(20):
+            logging.getLogger("logging_test.dictconfig").info("Record %d", i)
+        assert isinstance(root.handlers[0].filters[0], RateLimitFilter)
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+        logging.getLogger("logging_test.dictconfig").setLevel(logging.NOTSET)
+
+    assert len(tmp_path.joinpath("config.log").read_text().splitlines()) == 10
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few records and templates."""
+    results = benchmark(1000, 1000, max_keys=100)
+
+    assert len(results) == 5
+    assert results["1000 templates, 100 keys"]["MiB"] < (
+        results["1000 templates, no eviction"]["MiB"]
+    )
@@ -0,0 +1,226 @@
+"""Writing log records in batches, and rotating files, with `logging_rotating`."""
+
+import gzip
+import logging
+import logging.config
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Generator, List
+
+import pytest
+
+from logging_rotating import BatchingRotatingFileHandler, benchmark
+
+
+@pytest.fixture(name="logger")
+def fixture_logger() -> Generator[logging.Logger, None, None]:
+    """Return a logger that does not propagate, and remove its handlers afterwards."""
+    logger = logging.getLogger("logging_rotating_test")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    yield logger
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(logging.NOTSET)
+    logger.propagate = True
+
+
+def read_lines(path: Path) -> List[str]:
+    """Return the lines of `path`, decompressing it if it ends with `.gz`."""
+    if path.suffix == ".gz":
+        with gzip.open(path, "rt") as log_file:
+            return log_file.read().splitlines()
+    return path.read_text().splitlines()
+
+
+def wait_for_lines(path: Path, count: int) -> List[str]:
+    """Return the lines of `path`, once it has `count` of them, or after a second."""
+    for _ in range(100):
+        if path.exists() and len(read_lines(path)) >= count:
+            break
+        time.sleep(0.01)
+    return read_lines(path)
+
+
+def test_batches(logger: logging.Logger, tmp_path: Path) -> None:
+    """Write records once `batch_size` are buffered."""
+    path = tmp_path.joinpath("batches.log")
+    handler = BatchingRotatingFileHandler(str(path), batch_size=3, flush_interval=60)
+    logger.addHandler(handler)
+
+    logger.info("One")
+    logger.info("Two")
+    time.sleep(0.1)
+    assert not path.exists()
+    logger.info("Three")
+    assert wait_for_lines(path, 3) == ["One", "Two", "Three"]
+
+
+def test_flush_interval(logger: logging.Logger, tmp_path: Path) -> None:
+    """Write records every `flush_interval` seconds."""
+    path = tmp_path.joinpath("interval.log")
+    handler = BatchingRotatingFileHandler(str(path), flush_interval=0.02)
+    logger.addHandler(handler)
+
+    logger.info("One")
+    assert wait_for_lines(path, 1) == ["One"]
+    logger.info("Two")
+    assert wait_for_lines(path, 2) == ["One", "Two"]
+
+
+def test_flush_and_close(logger: logging.Logger, tmp_path: Path) -> None:
+    """Write the buffered records when flushed or closed."""
+    path = tmp_path.joinpath("close.log")
+    handler = BatchingRotatingFileHandler(str(path), flush_interval=60)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    logger.addHandler(handler)
+
+    logger.info("One")
+    handler.flush()
+    assert read_lines(path) == ["INFO One"]
+    logger.warning("Two")
+    logger.removeHandler(handler)
+    handler.close()
+    assert read_lines(path) == ["INFO One", "WARNING Two"]
+
+
+def test_rotate_size(logger: logging.Logger, tmp_path: Path) -> None:
+    """Rotate before a batch exceeds `maxBytes`, keeping `backupCount` backups."""
+    path = tmp_path.joinpath("size.log")
+    handler = BatchingRotatingFileHandler(
+        str(path), maxBytes=10, backupCount=2, flush_interval=60
+    )
+    logger.addHandler(handler)
+
+    for i in range(5):
+        logger.info("Record %d", i)
+        handler.flush()
+    logger.removeHandler(handler)
+    handler.close()
+
+    assert handler.rotations == 4
+    assert sorted(file.name for file in tmp_path.iterdir()) == [
+        "size.log",
+        "size.log.1.gz",
+        "size.log.2.gz",
+    ]
+    assert read_lines(path) == ["Record 4"]
+    assert read_lines(tmp_path.joinpath("size.log.1.gz")) == ["Record 3"]
+    assert read_lines(tmp_path.joinpath("size.log.2.gz")) == ["Record 2"]
+
+
+def test_rotate_interval(logger: logging.Logger, tmp_path: Path) -> None:
+    """Rotate files open for `interval` seconds, without compressing them."""
+    path = tmp_path.joinpath("interval.log")
+    handler = BatchingRotatingFileHandler(
+        str(path), backupCount=5, interval=0.05, flush_interval=60, compress=False
+    )
+    logger.addHandler(handler)
+
+    logger.info("One")
+    logger.info("Two")
+    handler.flush()
+    time.sleep(0.1)
+    logger.info("Three")
+    logger.removeHandler(handler)
+    handler.close()
+
+    assert handler.rotations == 1
+    assert read_lines(tmp_path.joinpath("interval.log.1")) == ["One", "Two"]
+    assert read_lines(path) == ["Three"]
+
+
+def test_exit_without_close(tmp_path: Path) -> None:
+    """Write the last batch, and archive the rotated files, at interpreter exit."""
+    script = """\
+import logging
+import time
+from logging_rotating import BatchingRotatingFileHandler
+
+handler = BatchingRotatingFileHandler(
+    "exit.log", maxBytes=200, backupCount=5, batch_size=10, flush_interval=60
+)
+logger = logging.getLogger("logging_rotating_test")
+logger.setLevel(logging.INFO)
+logger.addHandler(handler)
+for i in range(25):
+    logger.info("Record %d of the test", i)
+    time.sleep(0.01)
+"""
+    subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parent)},
+        check=True,
+    )
+
+    names = sorted(file.name for file in tmp_path.iterdir())
+    assert names[0] == "exit.log"
+    assert all(name.endswith(".gz") for name in names[1:])
+    lines = [line for name in names for line in read_lines(tmp_path.joinpath(name))]
+    assert sorted(lines) == sorted(f"Record {i} of the test" for i in range(25))
+
+
+def test_leftover_rotated(tmp_path: Path) -> None:
+    """Archive files rotated, but not archived, by a process that was killed."""
+    path = tmp_path.joinpath("leftover.log")
+    tmp_path.joinpath("leftover.log.rotated0").write_text("Older\n")
+    tmp_path.joinpath("leftover.log.rotated.1.0").write_text("Old\n")
+    time.sleep(0.01)
+    tmp_path.joinpath("leftover.log.rotated.1.1").write_text("Recent\n")
+    handler = BatchingRotatingFileHandler(str(path), backupCount=5)
+    handler.close()
+
+    assert sorted(file.name for file in tmp_path.iterdir()) == [
+        "leftover.log.1.gz",
+        "leftover.log.2.gz",
+        "leftover.log.3.gz",
+    ]
+    assert read_lines(tmp_path.joinpath("leftover.log.1.gz")) == ["Recent"]
+    assert read_lines(tmp_path.joinpath("leftover.log.3.gz")) == ["Older"]
+
+
+def test_dict_config(tmp_path: Path) -> None:
+    """Configure the handler as a `RotatingFileHandler` in `dictConfig()`."""
+    path = tmp_path.joinpath("config.log")
+    config: Any = {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "handlers": {
+            "file": {
+                "class": "logging_rotating.BatchingRotatingFileHandler",
+                "filename": str(path),
+                "maxBytes": 10485760,
+                "backupCount": 3,
+                "batch_size": 10,
+            }
+        },
+        "loggers": {
+            "logging_rotating_test.config": {"handlers": ["file"], "level": "INFO"}
+        },
+    }
+    logging.config.dictConfig(config)
+    logger = logging.getLogger("logging_rotating_test.config")
+    try:
+        logger.info("The message")
+        assert isinstance(logger.handlers[0], BatchingRotatingFileHandler)
+    finally:
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        logger.setLevel(logging.NOTSET)
+
+    assert read_lines(path) == ["The message"]
+
+
+def test_benchmark() -> None:
+    """Run the benchmark with few records."""
+    results = benchmark(1000, 100_000, max_bytes=10_000)
+
+    assert set(results) == {"RotatingFileHandler", "BatchingRotatingFileHandler"}